@@ -0,0 +1,8 @@
+"""
+Бенчмарки бота.
+
+Запускаются из корня проекта как модули, например:
+    python -m benchmarks.dispatcher_load --help
+
+Результаты сохраняются в benchmarks/results/ в формате JSON.
+"""
@@ -0,0 +1,195 @@
+"""
+Общие части бенчмарков.
+
+Подготовка окружения (отдельная БД, путь к проекту), поддельная
+HTTP-сессия бота без обращений к Telegram, генерация синтетических
+обновлений, расчёт перцентилей и сохранение результатов в JSON.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+"""Корень проекта."""
+
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+"""Каталог для JSON с результатами по умолчанию."""
+
+
+def prepare_environment(db_path: str | None = None) -> str:
+    """
+    Готовит окружение до импорта модулей бота.
+
+    database/engine.py читает DB_PATH при импорте, поэтому функцию нужно
+    вызвать раньше любого импорта из database, handlers и main.
+
+    Args:
+        db_path (str | None): Путь к БД. По умолчанию — новый файл во временном каталоге.
+
+    Returns:
+        str: Путь к БД бенчмарка.
+    """
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="aquatrack-bench-"), "bench.db")
+    os.environ["DB_PATH"] = db_path
+    os.environ.setdefault("BOT_TOKEN", "42:BENCHMARK")
+    # Бенчмарк не должен дописывать заглушки в файлы локалей
+    os.environ["I18N_AUTO_GENERATE"] = "0"
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    # Локали загружаются по относительному пути locales/
+    os.chdir(ROOT)
+    return db_path
+
+
+def create_fake_session(api_latency: float = 0.0):
+    """
+    Создаёт сессию бота, которая отвечает на запросы без сети.
+
+    Args:
+        api_latency (float): Искусственная задержка ответа Bot API, секунды.
+
+    Returns:
+        BaseSession: Сессия для Bot(session=...).
+    """
+    import asyncio
+
+    from aiogram.client.session.base import BaseSession
+    from aiogram.methods import EditMessageText, SendMessage, SendPhoto
+    from aiogram.types import Chat, Message
+
+    class FakeSession(BaseSession):
+        """Сессия, имитирующая успешные ответы Bot API."""
+
+        def __init__(self):
+            super().__init__()
+            self.requests = 0
+
+        async def make_request(self, bot, method, timeout=None):
+            self.requests += 1
+            if api_latency:
+                await asyncio.sleep(api_latency)
+            if isinstance(method, (SendMessage, SendPhoto, EditMessageText)):
+                return Message(
+                    message_id=self.requests,
+                    date=datetime.now(),
+                    chat=Chat(id=method.chat_id or 1, type="private"),
+                    text=getattr(method, "text", None),
+                )
+            return True
+
+        async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+            yield b""
+
+        async def close(self):
+            pass
+
+    return FakeSession()
+
+
+def _user(user_id: int) -> Dict[str, Any]:
+    return {"id": user_id, "is_bot": False, "first_name": "Bench", "language_code": "en"}
+
+
+def message_update(update_id: int, user_id: int, text: str) -> Dict[str, Any]:
+    """Сырое обновление с текстовым сообщением пользователя."""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": _user(user_id),
+            "text": text,
+        },
+    }
+
+
+def callback_update(update_id: int, user_id: int, data: str) -> Dict[str, Any]:
+    """Сырое обновление с нажатием inline-кнопки."""
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "chat_instance": "bench",
+            "data": data,
+            "from": _user(user_id),
+            "message": {
+                "message_id": 1,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "text": "bench",
+            },
+        },
+    }
+
+
+def percentiles(values: Sequence[float]) -> Dict[str, float]:
+    """
+    Сводка распределения (в миллисекундах для значений в секундах).
+
+    Args:
+        values (Sequence[float]): Длительности в секундах.
+
+    Returns:
+        dict: count, mean, p50, p95, p99, max.
+    """
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(int(len(ordered) * q), len(ordered) - 1)] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": round(ordered[-1] * 1000, 3),
+    }
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(name: str, results: Dict[str, Any], output: str | None = None) -> Path:
+    """
+    Сохраняет результаты вместе с описанием окружения.
+
+    Args:
+        name (str): Имя бенчмарка (префикс файла).
+        results (dict): Параметры запуска и измерения.
+        output (str | None): Путь к файлу. По умолчанию — benchmarks/results/<name>_<время>.json.
+
+    Returns:
+        Path: Путь к сохранённому файлу.
+    """
+    started = datetime.now()
+    path = Path(output) if output else RESULTS_DIR / f"{name}_{started:%Y%m%d-%H%M%S}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    document = {
+        "benchmark": name,
+        "timestamp": started.isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        **results,
+    }
+    path.write_text(json.dumps(document, ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
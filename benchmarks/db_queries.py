@@ -0,0 +1,185 @@
+"""
+Бенчмарк запросов к базе данных на синтетических данных разного объёма.
+
+Для каждого размера генерирует базу (benchmarks/seed_data.py) и замеряет
+каждую функцию database/queries.py и handlers/drink.get_today_total через
+рабочий движок приложения (database/engine.py). Рядом с задержками
+сохраняются SQL-запросы, которые выполнила функция, и их планы
+(EXPLAIN QUERY PLAN) — так изменения индексов и схемы сравниваются объективно.
+
+Пример:
+    python -m benchmarks.db_queries --sizes 1000:50000,10000:500000 --repeat 200
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from benchmarks._common import percentiles, prepare_environment, save_results
+
+DEFAULT_SIZES = "1000:20000,10000:200000,50000:1000000"
+"""Размеры данных по умолчанию: пользователи:записи."""
+
+BULK_REPEAT_DIVISOR = 20
+"""Во сколько раз реже повторять запросы по всем пользователям."""
+
+
+def parse_sizes(sizes: str) -> List[Tuple[int, int]]:
+    """Разбирает размеры вида '1000:20000,10000:200000'."""
+    result = []
+    for part in sizes.split(","):
+        users, _, intakes = part.partition(":")
+        result.append((int(users), int(intakes)))
+    return result
+
+
+def build_cases() -> Dict[str, Tuple[bool, Callable[[int], Awaitable[Any]]]]:
+    """
+    Описывает замеряемые вызовы.
+
+    Returns:
+        dict: имя → (запрос по всем пользователям, функция от user_id).
+    """
+    from database import queries
+    from handlers.drink import get_today_total
+    from utils.timezones import offsets_in_reminder_window
+
+    async def reminder_recipients(user_id: int):
+        # Выборка получателей так, как её делает services/scheduler
+        now = datetime.now(timezone.utc)
+        offsets = offsets_in_reminder_window(await queries.get_active_timezone_offsets(), now)
+        return await queries.get_all_active_users(timezone_offsets=offsets, idle_since=now - timedelta(minutes=100))
+
+    return {
+        "get_user": (False, queries.get_user),
+        "create_or_update_user": (False, lambda user_id: queries.create_or_update_user(user_id, weight_kg=70)),
+        "set_user_language": (False, lambda user_id: queries.set_user_language(user_id, "ru")),
+        "add_intake": (False, lambda user_id: queries.add_intake(user_id, 250)),
+        "get_today_intakes": (False, queries.get_today_intakes),
+        "get_weekly_totals": (False, queries.get_weekly_totals),
+        "get_analyze_snapshot": (False, queries.get_analyze_snapshot),
+        "get_daily_totals[365]": (False, lambda user_id: queries.get_daily_totals(user_id, 365)),
+        "toggle_notifications": (False, lambda user_id: queries.toggle_notifications(user_id, True)),
+        "set_user_goal": (False, lambda user_id: queries.set_user_goal(user_id, 2000)),
+        "drink.get_today_total": (False, get_today_total),
+        "get_active_timezone_offsets": (True, lambda user_id: queries.get_active_timezone_offsets()),
+        "get_all_active_users": (True, lambda user_id: queries.get_all_active_users()),
+        "get_all_active_users[scheduler]": (True, reminder_recipients),
+    }
+
+
+async def explain(engine, statements: List[Tuple[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Получает планы выполнения для перехваченных запросов.
+
+    Args:
+        engine: AsyncEngine приложения.
+        statements (list): Пары (SQL, параметры).
+
+    Returns:
+        list[dict]: SQL и строки плана с отступами по вложенности.
+    """
+    plans = []
+    seen = set()
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            if statement in seen:
+                continue
+            seen.add(statement)
+            rows = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).fetchall()
+            depth = {0: -1}
+            plan = []
+            for node_id, parent, _, detail in rows:
+                depth[node_id] = depth.get(parent, -1) + 1
+                plan.append("  " * depth[node_id] + detail)
+            plans.append({"sql": " ".join(statement.split()), "plan": plan})
+        await conn.rollback()
+    return plans
+
+
+async def run_size(users: int, intakes: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """Генерирует базу заданного размера и замеряет все запросы."""
+    from sqlalchemy import event
+
+    from benchmarks.seed_data import generate
+    from database.engine import DB_PATH, engine, init_db
+
+    # Рабочий движок привязан к DB_PATH: закрываем соединение и подменяем файл
+    await engine.dispose()
+    seed_info = generate(DB_PATH, users, intakes, days=args.days, seed=args.seed)
+    await init_db()
+
+    rng = random.Random(args.seed)
+    user_ids = [100_000_000 + index for index in range(users)]
+    captured: List[Tuple[str, Any]] = []
+    capturing = False
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if capturing:
+            captured.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    results = {}
+    try:
+        for name, (bulk, call) in build_cases().items():
+            repeat = max(args.repeat // BULK_REPEAT_DIVISOR, 3) if bulk else args.repeat
+            for _ in range(min(5, repeat)):  # прогрев кэша страниц SQLite
+                await call(rng.choice(user_ids))
+
+            timings = []
+            for _ in range(repeat):
+                user_id = rng.choice(user_ids)
+                started = time.perf_counter()
+                await call(user_id)
+                timings.append(time.perf_counter() - started)
+
+            captured.clear()
+            capturing = True
+            await call(rng.choice(user_ids))
+            capturing = False
+
+            results[name] = {"latency_ms": percentiles(timings), "queries": await explain(engine, captured)}
+            print(f"  {name:<34} p50 {results[name]['latency_ms']['p50']:>9} мс  "
+                  f"p95 {results[name]['latency_ms']['p95']:>9} мс")
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    return {"data": seed_info, "functions": results}
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Прогоняет бенчмарк для всех размеров."""
+    from database.engine import engine
+
+    sizes: Dict[str, Any] = {}
+    for users, intakes in parse_sizes(args.sizes):
+        print(f"Размер: {users} пользователей, {intakes} записей")
+        sizes[f"{users}:{intakes}"] = await run_size(users, intakes, args)
+    await engine.dispose()
+    return {
+        "parameters": {"sizes": args.sizes, "repeat": args.repeat, "days": args.days, "seed": args.seed},
+        "sizes": sizes,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Размеры: пользователи:записи через запятую")
+    parser.add_argument("--repeat", type=int, default=200, help="Повторов каждого запроса по пользователю")
+    parser.add_argument("--days", type=int, default=90, help="Глубина истории в днях")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", help="Файл базы (перезаписывается; по умолчанию — временный)")
+    parser.add_argument("--output", help="Файл для JSON с результатами")
+    args = parser.parse_args()
+
+    db_path = prepare_environment(args.db)
+    results = asyncio.run(run(args))
+    results["parameters"]["db_path"] = db_path
+    print(f"Результаты: {save_results('db_queries', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
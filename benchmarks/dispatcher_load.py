@@ -0,0 +1,202 @@
+"""
+Нагрузочный тест диспетчера.
+
+Собирает настоящий диспетчер (main.create_dispatcher: роутеры, I18nMiddleware,
+FSM-хранилище, очереди пользователей), подменяет HTTP-сессию бота поддельной
+и прогоняет через dp.feed_update синтетические обновления с заданной
+параллельностью. Измеряет пропускную способность (обновлений в секунду)
+и задержку обработки (p50/p95/p99) в целом и по сценариям.
+
+Сценарии:
+    drink     — /drink 250
+    number    — число без команды (200)
+    callback  — нажатие кнопки drink_250
+    analyze   — /analyze (с генерацией графика)
+    start     — настройка профиля: /start → пол → вес → активность
+
+Пример:
+    python -m benchmarks.dispatcher_load --updates 5000 --concurrency 64 \\
+        --mix drink=3,number=3,callback=3,analyze=1,start=1
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+from benchmarks._common import (
+    callback_update,
+    create_fake_session,
+    message_update,
+    percentiles,
+    prepare_environment,
+    save_results,
+)
+
+DEFAULT_MIX = "drink=3,number=3,callback=3,analyze=1,start=1"
+
+PROFILE = {"gender": 0, "weight_kg": 70, "activity_level": 1, "daily_goal_ml": 2100}
+"""Профиль заранее созданных пользователей."""
+
+
+SCENARIOS = {
+    "drink": lambda user_id: [("message", "/drink 250")],
+    "number": lambda user_id: [("message", "200")],
+    "callback": lambda user_id: [("callback", "drink_250")],
+    "analyze": lambda user_id: [("message", "/analyze")],
+    "start": lambda user_id: [
+        ("message", "/start"),
+        ("callback", "male"),
+        ("message", "70"),
+        ("callback", "medium"),
+    ],
+}
+"""Сценарии: имя → последовательность обновлений (тип, текст или data) для user_id."""
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    """Разбирает веса сценариев вида 'drink=3,analyze=1'."""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = int(weight or 1)
+    unknown = set(weights) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Неизвестные сценарии: {', '.join(sorted(unknown))}")
+    return weights
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Выполняет нагрузочный тест и возвращает результаты."""
+    db_path = prepare_environment(args.db)
+
+    from aiogram import Bot
+    from aiogram.types import Update
+
+    from config import Settings
+    from database.engine import engine, init_db
+    from database.queries import add_intake, create_or_update_user
+    from main import create_dispatcher
+    from middlewares.throttling import THROTTLE_RULES
+    from services.reminder_manager import cancel_reminder
+    from utils.i18n import load_locales
+
+    # Журнал каждого обновления искажает измерение
+    logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+    load_locales()
+    await init_db()
+
+    # Лимиты запросов искажают измерение потолка пропускной способности
+    throttle_rules = None if args.throttling else {name: (1e9, 10**9) for name in THROTTLE_RULES}
+    dp = create_dispatcher(Settings(bot_token="42:BENCHMARK"), throttle_rules)
+    session = create_fake_session(args.api_latency_ms / 1000)
+    bot = Bot(token="42:BENCHMARK", session=session)
+
+    rng = random.Random(args.seed)
+    users = list(range(1_000_000, 1_000_000 + args.users))
+    for user_id in users:
+        await create_or_update_user(user_id, **PROFILE)
+        for _ in range(args.seed_intakes):
+            await add_intake(user_id, rng.choice((150, 200, 250, 300, 500)))
+
+    weights = parse_mix(args.mix)
+    names = list(weights)
+    next_new_user = 2_000_000
+    update_id = 0
+
+    # Заранее строим план: (сценарий, список Update) — вне измеряемого участка
+    plan: List[Tuple[str, List[Update]]] = []
+    planned = 0
+    while planned < args.updates:
+        name = rng.choices(names, weights=list(weights.values()))[0]
+        if name == "start":
+            user_id, next_new_user = next_new_user, next_new_user + 1
+        else:
+            user_id = rng.choice(users)
+        updates = []
+        for kind, payload in SCENARIOS[name](user_id):
+            update_id += 1
+            raw = (message_update if kind == "message" else callback_update)(update_id, user_id, payload)
+            updates.append(Update.model_validate(raw, context={"bot": bot}))
+        plan.append((name, updates))
+        planned += len(updates)
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def execute(name: str, updates: List[Update]) -> None:
+        async with semaphore:
+            # Обновления одного сценария идут по порядку, как от живого пользователя
+            for update in updates:
+                started = time.perf_counter()
+                try:
+                    await dp.feed_update(bot, update)
+                except Exception as exc:
+                    if not errors[name]:
+                        logging.getLogger(__name__).exception("Ошибка в сценарии %s: %s", name, exc)
+                    errors[name] += 1
+                latencies[name].append(time.perf_counter() - started)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(execute(name, updates) for name, updates in plan))
+    elapsed = time.perf_counter() - started_at
+
+    # Уборка: отложенные напоминания, FSM-хранилище, соединение с БД
+    for user_id in set(users) | set(range(2_000_000, next_new_user)):
+        cancel_reminder(user_id)
+    await dp.storage.close()
+    await engine.dispose()
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "parameters": {
+            "updates": planned,
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "seed_intakes": args.seed_intakes,
+            "mix": weights,
+            "api_latency_ms": args.api_latency_ms,
+            "throttling": args.throttling,
+            "seed": args.seed,
+            "db_path": db_path,
+        },
+        "elapsed_seconds": round(elapsed, 3),
+        "updates_per_second": round(len(all_latencies) / elapsed, 1),
+        "bot_api_requests": session.requests,
+        "errors": dict(errors),
+        "latency_ms": percentiles(all_latencies),
+        "scenarios": {name: percentiles(values) for name, values in sorted(latencies.items())},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=2000, help="Сколько обновлений обработать")
+    parser.add_argument("--concurrency", type=int, default=32, help="Одновременно выполняемых сценариев")
+    parser.add_argument("--users", type=int, default=500, help="Пользователей с готовым профилем")
+    parser.add_argument("--seed-intakes", type=int, default=5, help="Записей воды на пользователя до теста")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Веса сценариев")
+    parser.add_argument("--api-latency-ms", type=float, default=0.0, help="Задержка ответа поддельного Bot API")
+    parser.add_argument("--throttling", action="store_true", help="Не отключать ограничение частоты")
+    parser.add_argument("--seed", type=int, default=1, help="Seed генератора сценариев")
+    parser.add_argument("--db", help="Путь к БД (по умолчанию — временный файл)")
+    parser.add_argument("--output", help="Файл для JSON с результатами")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    path = save_results("dispatcher_load", results, args.output)
+
+    print(f"Обновлений: {results['parameters']['updates']} за {results['elapsed_seconds']} с "
+          f"({results['updates_per_second']} в секунду), ошибок: {sum(results['errors'].values())}")
+    print(f"{'сценарий':<10} {'count':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  (мс)")
+    for name, stats in [("all", results["latency_ms"]), *results["scenarios"].items()]:
+        print(f"{name:<10} {stats['count']:>7} {stats['p50']:>9} {stats['p95']:>9} {stats['p99']:>9} {stats['max']:>9}")
+    print(f"Результаты: {path}")
+
+
+if __name__ == "__main__":
+    main()
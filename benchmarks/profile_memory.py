@@ -0,0 +1,126 @@
+"""
+Бенчмарк памяти профилей пользователей.
+
+Генерирует базу (benchmarks/seed_data.py), читает всех пользователей тем же
+запросом, что и get_all_active_users, и сравнивает, сколько памяти занимает
+список профилей в трёх представлениях:
+    row_mapping — строки SQLAlchemy (RowMapping), как раньше возвращала
+                  get_all_active_users;
+    dict        — dict(row) на строку, как раньше возвращала get_user;
+    profile     — UserProfile (database/profiles.py).
+
+Память считается через tracemalloc: учитывается всё, что остаётся живым
+после построения списка, — сами объекты, значения полей и служебные
+структуры строк. Отдельно, без tracemalloc, замеряется время построения
+(чтение из БД и преобразование) и чтения ключей через словарный
+интерфейс (profile["language"]).
+
+Пример:
+    python -m benchmarks.profile_memory --users 100000
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from benchmarks._common import prepare_environment, save_results
+
+READ_KEYS = ("user_id", "language", "timezone_offset", "notifications_enabled", "last_intake_at")
+"""Ключи, которые читает рассылка напоминаний (services/scheduler)."""
+
+
+def measure(build: Callable[[], List[Any]]) -> Dict[str, Any]:
+    """
+    Замеряет память и время построения списка профилей.
+
+    Args:
+        build: Функция, читающая пользователей из БД и возвращающая список.
+
+    Returns:
+        dict: bytes — удерживаемая списком память, build_ms — время построения,
+        read_ns — среднее время чтения одного ключа через profile[key].
+    """
+    gc.collect()
+    started = time.perf_counter()
+    profiles = build()
+    build_seconds = time.perf_counter() - started
+    del profiles
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    profiles = build()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for profile in profiles:
+        for key in READ_KEYS:
+            profile[key]
+    read_seconds = time.perf_counter() - started
+    return {
+        "bytes": retained,
+        "bytes_per_user": round(retained / len(profiles), 1),
+        "build_ms": round(build_seconds * 1000, 1),
+        "read_ns": round(read_seconds / (len(profiles) * len(READ_KEYS)) * 1e9, 1),
+    }
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Выполняет бенчмарк и возвращает результаты."""
+    db_path = prepare_environment(args.db)
+
+    from sqlalchemy import create_engine, select
+
+    from benchmarks.seed_data import generate
+    from database.models import users
+    from database.profiles import UserProfile
+
+    generate(db_path, args.users, args.users, days=30, seed=args.seed)
+    engine = create_engine(f"sqlite:///{db_path}")
+    query = select(users)
+
+    def fetch(mappings: bool = True):
+        with engine.connect() as conn:
+            result = conn.execute(query)
+            return (result.mappings() if mappings else result).fetchall()
+
+    # Прогрев: компиляция запроса и кэши SQLAlchemy не должны попасть в замер
+    fetch()
+    fetch(mappings=False)
+    representations = {
+        "row_mapping": fetch,
+        "dict": lambda: [dict(row) for row in fetch()],
+        "profile": lambda: [UserProfile.from_row(row) for row in fetch(mappings=False)],
+    }
+    results = {name: measure(build) for name, build in representations.items()}
+    engine.dispose()
+
+    for name, stats in results.items():
+        stats["vs_dict"] = round(stats["bytes"] / results["dict"]["bytes"], 3)
+    return {"parameters": {"users": args.users, "seed": args.seed}, "representations": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50_000, help="Количество пользователей")
+    parser.add_argument("--seed", type=int, default=1, help="Seed генератора данных")
+    parser.add_argument("--db", help="Путь к БД (по умолчанию — временный файл)")
+    parser.add_argument("--output", help="Файл для JSON с результатами")
+    args = parser.parse_args()
+
+    results = run(args)
+    path = save_results("profile_memory", results, args.output)
+
+    print(f"{'представление':<14} {'МБ':>8} {'байт/польз.':>12} {'к dict':>7} {'построение, мс':>15} {'чтение ключа, нс':>17}")
+    for name, stats in results["representations"].items():
+        print(f"{name:<14} {stats['bytes'] / 2 ** 20:>8.1f} {stats['bytes_per_user']:>12} {stats['vs_dict']:>7} "
+              f"{stats['build_ms']:>15} {stats['read_ns']:>17}")
+    print(f"Результаты: {path}")
+
+
+if __name__ == "__main__":
+    main()
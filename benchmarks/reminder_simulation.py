@@ -0,0 +1,279 @@
+"""
+Симуляция подсистемы напоминаний в виртуальном времени.
+
+Подменяет часы приложения на SimulatedClock (utils/clock.py) и проигрывает
+работу services/reminder_manager и services/scheduler для сотен тысяч
+синтетических пользователей без Telegram и без реальных ожиданий:
+    1. планирует напоминание каждому пользователю, перепланирует всех
+       и отменяет часть — замеряет стоимость операций и память на напоминание;
+    2. двигает виртуальное время: пользователи пьют воду (напоминание
+       перепланируется), иногда отключают напоминания, раз в интервал
+       срабатывает периодическая рассылка.
+
+Вместо бота используется SimulatedBot: он моделирует пропускную способность
+Bot API (--send-rate сообщений в секунду), поэтому опоздание отправки —
+это разница между сроком, к которому проснулась задача, и моментом,
+когда сообщение реально ушло бы из очереди. Пользователи и профили
+хранятся в настоящей SQLite (benchmarks/seed_data.py).
+
+Пример:
+    python -m benchmarks.reminder_simulation --users 100000 --hours 24
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from benchmarks._common import percentiles, prepare_environment, save_results
+
+USER_ID_BASE = 100_000_000
+"""Первый user_id синтетических пользователей (как в seed_data)."""
+
+
+def _rss_mb() -> float | None:
+    """Текущий RSS процесса в МБ (Linux), иначе None."""
+    try:
+        with open("/proc/self/statm") as file:
+            return round(int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class SimulatedBot:
+    """
+    Заменитель Bot для симуляции: считает отправки в виртуальном времени.
+
+    Args:
+        clock (SimulatedClock): Виртуальные часы.
+        rate (float): Пропускная способность Bot API, сообщений в секунду.
+    """
+
+    def __init__(self, clock, rate: float):
+        self.clock = clock
+        self.interval = timedelta(seconds=1 / rate)
+        self._next_slot: datetime | None = None
+        self.lateness: List[float] = []
+        self.delivered_per_hour: Counter = Counter()
+
+    async def send_message(self, chat_id: int, text: str, **kwargs: Any) -> None:
+        now = self.clock.now()
+        slot = max(now, self._next_slot or now)
+        self._next_slot = slot + self.interval
+        due = self.clock.wakeup_deadline() or now
+        self.lateness.append((slot - due).total_seconds())
+        self.delivered_per_hour[slot.replace(minute=0, second=0, microsecond=0)] += 1
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Выполняет симуляцию и возвращает результаты."""
+    db_path = prepare_environment(args.db)
+
+    from sqlalchemy import update
+
+    from benchmarks.seed_data import generate
+    from database.engine import AsyncSessionLocal, engine, init_db
+    from database.models import users as users_table
+    from services import reminder_manager, scheduler
+    from services.metrics import REMINDERS_SENT
+    from utils.clock import SimulatedClock, set_clock
+    from utils.i18n import load_locales
+
+    load_locales()
+    seed_info = generate(db_path, args.users, 0, days=1, seed=args.seed)
+    await init_db()
+
+    start = datetime.fromisoformat(args.start) if args.start else \
+        datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    clock = SimulatedClock(start)
+    set_clock(clock)
+    bot = SimulatedBot(clock, args.send_rate)
+    reminder_manager.set_reminder_interval(args.interval)
+    scheduler.set_bot(bot)
+    scheduler.set_interval(args.interval)
+
+    rng = random.Random(args.seed)
+    user_ids = [USER_ID_BASE + index for index in range(args.users)]
+    operations: Dict[str, Dict[str, float]] = {}
+
+    def record(name: str, started: float, count: int) -> None:
+        elapsed = time.perf_counter() - started
+        operations[name] = {"count": count, "seconds": round(elapsed, 3),
+                            "us_per_op": round(elapsed / max(count, 1) * 1e6, 2)}
+
+    # 1. Стоимость операций и память
+    rss_before = _rss_mb()
+    tracemalloc.start()
+    started = time.perf_counter()
+    for user_id in user_ids:
+        reminder_manager.schedule_next_reminder(bot, user_id)
+    await clock.advance(0)  # задачи доходят до sleep()
+    record("schedule", started, len(user_ids))
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    memory = {
+        "python_bytes_per_reminder": round(traced / len(user_ids)),
+        "python_mb_total": round(traced / 2**20, 1),
+        "rss_mb_before": rss_before,
+        "rss_mb_after_schedule": _rss_mb(),
+    }
+
+    started = time.perf_counter()
+    for user_id in user_ids:
+        reminder_manager.schedule_next_reminder(bot, user_id)
+    await clock.advance(0)
+    record("reschedule", started, len(user_ids))
+
+    cancelled = rng.sample(user_ids, len(user_ids) // 10)
+    started = time.perf_counter()
+    for user_id in cancelled:
+        reminder_manager.cancel_reminder(user_id)
+    await clock.advance(0)
+    record("cancel", started, len(cancelled))
+    for user_id in cancelled:
+        reminder_manager.schedule_next_reminder(bot, user_id)
+
+    # 2. Поведение пользователей и периодическая рассылка в виртуальном времени
+    drinks_per_minute = args.users * args.drink_rate / 60
+    disables_per_minute = args.users * args.disable_rate / 60 / 24
+    counts = Counter()
+
+    async def user_activity() -> None:
+        while True:
+            await clock.sleep(60)
+            drinkers = rng.sample(user_ids, min(len(user_ids), _poisson(rng, drinks_per_minute)))
+            disablers = rng.sample(user_ids, min(len(user_ids), _poisson(rng, disables_per_minute)))
+            now = clock.now().replace(tzinfo=None)
+            async with AsyncSessionLocal() as session:
+                for chunk in range(0, len(drinkers), 500):
+                    await session.execute(
+                        update(users_table)
+                        .where(users_table.c.user_id.in_(drinkers[chunk:chunk + 500]))
+                        .values(last_intake_at=now)
+                    )
+                if disablers:
+                    await session.execute(
+                        update(users_table)
+                        .where(users_table.c.user_id.in_(disablers))
+                        .values(notifications_enabled=False)
+                    )
+                await session.commit()
+            for user_id in drinkers:
+                reminder_manager.schedule_next_reminder(bot, user_id)
+            for user_id in disablers:
+                reminder_manager.cancel_reminder(user_id)
+            counts["drinks"] += len(drinkers)
+            counts["disabled"] += len(disablers)
+
+    async def periodic_job() -> None:
+        # Как в setup_scheduler: первый запуск через 10 секунд, дальше — по интервалу
+        await clock.sleep(10)
+        while True:
+            await scheduler.send_water_reminder()
+            counts["periodic_runs"] += 1
+            await clock.sleep(args.interval * 60)
+
+    background = [asyncio.create_task(user_activity())]
+    if args.periodic:
+        background.append(asyncio.create_task(periodic_job()))
+
+    hours = []
+    sim_started = time.perf_counter()
+    for hour in range(args.hours):
+        hour_started = time.perf_counter()
+        dynamic_before, periodic_before = REMINDERS_SENT.value("dynamic"), REMINDERS_SENT.value("periodic")
+        await clock.run_until(start + timedelta(hours=hour + 1))
+        hours.append({
+            "hour": (start + timedelta(hours=hour)).isoformat(),
+            "sent_dynamic": int(REMINDERS_SENT.value("dynamic") - dynamic_before),
+            "sent_periodic": int(REMINDERS_SENT.value("periodic") - periodic_before),
+            "delivered": bot.delivered_per_hour.get(start + timedelta(hours=hour), 0),
+            "pending_reminders": reminder_manager.pending_reminders_count(),
+            "real_seconds": round(time.perf_counter() - hour_started, 2),
+            "rss_mb": _rss_mb(),
+        })
+        print(f"  {hours[-1]['hour']}: динамических {hours[-1]['sent_dynamic']:>7}, "
+              f"периодических {hours[-1]['sent_periodic']:>7}, доставлено {hours[-1]['delivered']:>7}, "
+              f"ожидают {hours[-1]['pending_reminders']:>7}, {hours[-1]['real_seconds']} с")
+    sim_elapsed = time.perf_counter() - sim_started
+
+    for task in background:
+        task.cancel()
+    for user_id in user_ids:
+        reminder_manager.cancel_reminder(user_id)
+    await asyncio.sleep(0)
+    await engine.dispose()
+
+    lateness = percentiles(bot.lateness)
+    # percentiles() переводит секунды в мс; опоздания удобнее смотреть в секундах
+    lateness_seconds = {key: (round(value / 1000, 3) if key != "count" else value) for key, value in lateness.items()}
+    return {
+        "parameters": {
+            "users": args.users,
+            "hours": args.hours,
+            "start": start.isoformat(),
+            "interval_minutes": args.interval,
+            "drink_rate_per_user_hour": args.drink_rate,
+            "disable_rate_per_user_day": args.disable_rate,
+            "send_rate": args.send_rate,
+            "periodic": args.periodic,
+            "seed": args.seed,
+            "db_path": db_path,
+        },
+        "data": seed_info,
+        "operations": operations,
+        "memory": memory,
+        "simulation": {
+            "real_seconds": round(sim_elapsed, 2),
+            "simulated_hours_per_real_second": round(args.hours / sim_elapsed, 3) if sim_elapsed else None,
+            "clock_wakeups": clock.wakeups,
+            **counts,
+        },
+        "lateness_seconds": lateness_seconds,
+        "hours": hours,
+    }
+
+
+def _poisson(rng: random.Random, mean: float) -> int:
+    """Случайное число событий за шаг (нормальное приближение для больших средних)."""
+    if mean > 30:
+        return max(0, round(rng.gauss(mean, mean ** 0.5)))
+    count, threshold, product = 0, math.exp(-mean), rng.random()
+    while product > threshold:
+        count += 1
+        product *= rng.random()
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--hours", type=int, default=24, help="Длительность симуляции в виртуальных часах")
+    parser.add_argument("--start", help="Начало виртуального времени, ISO 8601 (по умолчанию — сегодня 00:00 UTC)")
+    parser.add_argument("--interval", type=int, default=100, help="Интервал напоминаний, минуты")
+    parser.add_argument("--drink-rate", type=float, default=0.2, help="Отметок воды на пользователя в час")
+    parser.add_argument("--disable-rate", type=float, default=0.01, help="Доля отключающих напоминания за сутки")
+    parser.add_argument("--send-rate", type=float, default=25.0, help="Пропускная способность Bot API, сообщений/с")
+    parser.add_argument("--no-periodic", dest="periodic", action="store_false", help="Без периодической рассылки")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", help="Файл базы (перезаписывается; по умолчанию — временный)")
+    parser.add_argument("--output", help="Файл для JSON с результатами")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    path = save_results("reminder_simulation", results, args.output)
+    print(f"Операции: {results['operations']}")
+    print(f"Память: {results['memory']}")
+    print(f"Опоздание отправки, с: {results['lateness_seconds']}")
+    print(f"Симуляция: {results['simulation']}")
+    print(f"Результаты: {path}")
+
+
+if __name__ == "__main__":
+    main()
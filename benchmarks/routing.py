@@ -0,0 +1,153 @@
+"""
+Микробенчмарк выбора хэндлера.
+
+Собирает настоящий диспетчер (main.create_dispatcher) и для набора типичных
+сообщений и нажатий кнопок сравнивает два способа найти хэндлер:
+    full — полная цепочка: фильтры всех хэндлеров всех роутеров по порядку,
+           как в aiogram (Router.propagate_event → observer.trigger);
+    fast — таблица FastRouteMiddleware: ключ события → кандидаты,
+           проверяются только их фильтры.
+
+Сами хэндлеры и мидлвари не вызываются — измеряется только маршрутизация.
+Перед замером проверяется, что оба способа выбирают один и тот же хэндлер.
+
+Пример:
+    python -m benchmarks.routing --iterations 20000
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks._common import callback_update, create_fake_session, message_update, prepare_environment, save_results
+
+EVENTS = [
+    ("message", "/start"),
+    ("message", "/drink"),
+    ("message", "/drink 250"),
+    ("message", "300"),
+    ("message", "/analyze"),
+    ("message", "/history 30"),
+    ("message", "/goal 2000"),
+    ("message", "/leaderboard on"),
+    ("message", "/digest"),
+    ("message", "/reminder"),
+    ("message", "/profile"),
+    ("message", "привет"),
+    ("callback", "drink_250"),
+    ("callback", "set_lang_en"),
+    ("callback", "toggle_reminders"),
+    ("callback", "open_lang_menu"),
+    ("callback", "history_90"),
+    ("callback", "unknown"),
+]
+"""События бенчмарка: (тип, текст или data)."""
+
+
+async def full_chain_handler(router, event_type: str, event, data: Dict[str, Any]):
+    """Ищет хэндлер полной цепочкой фильтров (порядок Router.propagate_event)."""
+    observer = router.observers[event_type]
+    passed, kwargs = await observer.check_root_filters(event, **data)
+    if not passed:
+        return None
+    for handler in observer.handlers:
+        passed, _ = await handler.check(event, **{**kwargs, "handler": handler})
+        if passed:
+            return handler
+    for sub_router in router.sub_routers:
+        handler = await full_chain_handler(sub_router, event_type, event, kwargs)
+        if handler is not None:
+            return handler
+    return None
+
+
+async def fast_handler(middleware, dp, event_type: str, event, data: Dict[str, Any]):
+    """Ищет хэндлер по таблице FastRouteMiddleware (с тем же запасным путём)."""
+    candidates = await middleware.candidates(event_type, event, data)
+    if candidates is None:
+        return await full_chain_handler(dp, event_type, event, data)
+    async for (handler, _, _, _), _ in middleware.matches(candidates, event, data):
+        return handler
+    return None
+
+
+def _name(handler) -> Optional[str]:
+    return handler.callback.__name__ if handler is not None else None
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Выполняет микробенчмарк и возвращает результаты."""
+    prepare_environment(args.db)
+
+    from aiogram import Bot
+    from aiogram.types import Update
+
+    from config import Settings
+    from main import create_dispatcher
+    from middlewares.fast_route import FastRouteMiddleware
+
+    logging.getLogger("middlewares.fast_route").setLevel(logging.WARNING)
+    dp = create_dispatcher(Settings(bot_token="42:BENCHMARK"))
+    bot = Bot(token="42:BENCHMARK", session=create_fake_session())
+    middleware = next(m for m in dp.message.outer_middleware if isinstance(m, FastRouteMiddleware))
+
+    results: Dict[str, Any] = {}
+    mismatches: List[str] = []
+    totals = {"full": 0.0, "fast": 0.0}
+    for index, (kind, payload) in enumerate(EVENTS, start=1):
+        raw = (message_update if kind == "message" else callback_update)(index, 1, payload)
+        update = Update.model_validate(raw, context={"bot": bot})
+        event_type = "message" if kind == "message" else "callback_query"
+        event = update.message if kind == "message" else update.callback_query
+        data = {**dp.workflow_data, "bot": bot, "raw_state": None, "event_from_user": event.from_user}
+
+        full = await full_chain_handler(dp, event_type, event, data)
+        fast = await fast_handler(middleware, dp, event_type, event, data)
+        if full is not fast:
+            mismatches.append(f"{payload}: full={_name(full)} fast={_name(fast)}")
+
+        timings = {}
+        for method, resolve in (("full", lambda: full_chain_handler(dp, event_type, event, data)),
+                                ("fast", lambda: fast_handler(middleware, dp, event_type, event, data))):
+            started = time.perf_counter()
+            for _ in range(args.iterations):
+                await resolve()
+            elapsed = time.perf_counter() - started
+            totals[method] += elapsed
+            timings[method] = round(elapsed / args.iterations * 1e6, 2)
+        results[payload] = {"handler": _name(full), "full_us": timings["full"], "fast_us": timings["fast"]}
+
+    return {
+        "parameters": {"iterations": args.iterations},
+        "mismatches": mismatches,
+        "events": results,
+        "mean_full_us": round(totals["full"] / len(EVENTS) / args.iterations * 1e6, 2),
+        "mean_fast_us": round(totals["fast"] / len(EVENTS) / args.iterations * 1e6, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000, help="Повторов выбора хэндлера на событие")
+    parser.add_argument("--db", help="Путь к БД (по умолчанию — временный файл)")
+    parser.add_argument("--output", help="Файл для JSON с результатами")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    path = save_results("routing", results, args.output)
+
+    print(f"{'событие':<18} {'хэндлер':<24} {'full, мкс':>10} {'fast, мкс':>10}")
+    for payload, stats in results["events"].items():
+        print(f"{payload:<18} {str(stats['handler']):<24} {stats['full_us']:>10} {stats['fast_us']:>10}")
+    print(f"В среднем: full {results['mean_full_us']} мкс, fast {results['mean_fast_us']} мкс")
+    for mismatch in results["mismatches"]:
+        print(f"❗ Расхождение: {mismatch}")
+    print(f"Результаты: {path}")
+    if results["mismatches"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
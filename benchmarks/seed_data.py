@@ -0,0 +1,149 @@
+"""
+Генератор воспроизводимого набора данных для бенчмарков.
+
+Создаёт N пользователей и M записей о воде с правдоподобным распределением:
+    - часовые пояса и языки — с перекосом в сторону основной аудитории;
+    - активность пользователей — логнормальная (немного «активистов»,
+      много редко отмечающих воду), у каждого своя дата регистрации;
+    - время записи — пики утром, в обед и вечером по локальному времени;
+    - объёмы — типичные порции (стакан, кружка, бутылка).
+Записи вставляются в хронологическом порядке, как в рабочей базе.
+Один и тот же seed даёт одну и ту же базу (с точностью до текущей даты).
+
+Пример:
+    python -m benchmarks.seed_data --users 10000 --intakes 1000000 --days 90 --db /tmp/bench.db
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict
+
+from benchmarks._common import ROOT, prepare_environment
+
+TIMEZONE_WEIGHTS = {180: 45, 120: 10, 60: 10, 0: 5, 300: 5, 480: 10, -300: 5, 330: 5, 240: 5}
+"""Смещения часовых поясов (минуты от UTC) и их доли."""
+
+LANGUAGE_WEIGHTS = {"ru": 50, "en": 25, "de": 10, "zh": 10, "be": 5}
+
+AMOUNT_WEIGHTS = {150: 10, 200: 25, 250: 30, 300: 15, 330: 8, 500: 10, 750: 2}
+"""Объёмы порций в мл и их доли."""
+
+DAY_PEAKS = ((8.5, 1.5, 0.35), (13.0, 1.5, 0.3), (19.0, 2.0, 0.35))
+"""Пики потребления: (час по местному времени, разброс, доля)."""
+
+CHUNK_SIZE = 50_000
+"""Строк в одном пакете вставки."""
+
+
+def _local_hour(rng: random.Random) -> float:
+    center, spread, _ = rng.choices(DAY_PEAKS, weights=[peak[2] for peak in DAY_PEAKS])[0]
+    return min(max(rng.gauss(center, spread), 6.0), 23.95)
+
+
+def generate(db_path: str, users: int, intakes: int, days: int = 90, seed: int = 1) -> Dict[str, float]:
+    """
+    Создаёт базу с синтетическими данными.
+
+    Существующий файл базы перезаписывается.
+
+    Args:
+        db_path (str): Путь к файлу SQLite.
+        users (int): Количество пользователей.
+        intakes (int): Общее количество записей о воде.
+        days (int): Глубина истории в днях (включая сегодня).
+        seed (int): Seed генератора случайных чисел.
+
+    Returns:
+        dict: Параметры и время генерации.
+    """
+    from sqlalchemy import create_engine, insert
+
+    from database.models import intakes as intakes_table, metadata, users as users_table
+
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    offsets = rng.choices(list(TIMEZONE_WEIGHTS), weights=list(TIMEZONE_WEIGHTS.values()), k=users)
+    user_ids = [100_000_000 + index for index in range(users)]
+    joined = [rng.randrange(days) for _ in range(users)]  # дней назад
+    activity = [rng.lognormvariate(0, 1) * (joined_ago + 1) for joined_ago in joined]
+
+    # Распределяем записи по пользователям пропорционально активности и стажу
+    owners = rng.choices(range(users), weights=activity, k=intakes)
+    amounts = rng.choices(list(AMOUNT_WEIGHTS), weights=list(AMOUNT_WEIGHTS.values()), k=intakes)
+    rows = []
+    last_intake: Dict[int, datetime] = {}
+    for owner, amount in zip(owners, amounts):
+        day = today - timedelta(days=rng.randint(0, joined[owner]))
+        local = day + timedelta(hours=_local_hour(rng))
+        moment = local - timedelta(minutes=offsets[owner])
+        if moment > now:
+            moment -= timedelta(days=1)
+        rows.append((moment, user_ids[owner], amount))
+        if moment > last_intake.get(owner, datetime.min):
+            last_intake[owner] = moment
+    rows.sort()
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        conn.execute(insert(users_table), [
+            {
+                "user_id": user_ids[index],
+                "gender": rng.randint(0, 1),
+                "weight_kg": rng.randint(45, 110),
+                "activity_level": rng.choices((0, 1, 2), weights=(4, 4, 2))[0],
+                "daily_goal_ml": rng.randrange(1500, 3600, 100),
+                "timezone_offset": offsets[index],
+                "language": rng.choices(list(LANGUAGE_WEIGHTS), weights=list(LANGUAGE_WEIGHTS.values()))[0],
+                "unit_preference": "ml",
+                "notifications_enabled": rng.random() < 0.85,
+                "last_intake_at": last_intake.get(index),
+            }
+            for index in range(users)
+        ])
+        for start in range(0, len(rows), CHUNK_SIZE):
+            conn.execute(insert(intakes_table), [
+                {"user_id": user_id, "amount_ml": amount, "timestamp": moment}
+                for moment, user_id, amount in rows[start:start + CHUNK_SIZE]
+            ])
+    engine.dispose()
+
+    return {
+        "users": users,
+        "intakes": intakes,
+        "days": days,
+        "seed": seed,
+        "seconds": round(time.perf_counter() - started, 2),
+        "db_size_mb": round(os.path.getsize(db_path) / 2**20, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--intakes", type=int, default=500_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", default=str(ROOT / "benchmarks" / "results" / "seed.db"))
+    args = parser.parse_args()
+
+    prepare_environment(args.db)
+    info = generate(args.db, args.users, args.intakes, args.days, args.seed)
+    print(f"База {args.db}: {info['users']} пользователей, {info['intakes']} записей, "
+          f"{info['db_size_mb']} МБ за {info['seconds']} с")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,57 @@ class Settings(BaseSettings):
     Атрибуты:
         bot_token (str): Токен Telegram-бота, полученный от @BotFather.
         db_path (str): Путь к файлу SQLite базы данных. По умолчанию — 'data/aquatrack.db'.
+        db_shards (int): Количество файлов SQLite, по которым данные пользователей
+            распределяются по хэшу user_id (1 — всё в db_path). Как и db_path,
+            читается database/engine.py из окружения при импорте; при изменении
+            перенесите данные: python -m database.reshard --shards N.
+        reminder_interval_minutes (int): Интервал напоминаний в минутах. Пользователи,
+            отметившие воду за этот интервал, напоминание не получают.
+        outbox_workers (int): Количество параллельных отправителей очереди исходящих сообщений.
+        outbox_rate_limit (float): Общий лимит запросов к Bot API в секунду.
+        workers (int): Количество процессов-обработчиков. При значении больше 1
+            обновления распределяются между процессами по хэшу user_id.
+        fsm_cache_size (int): Максимум FSM-состояний в кэше в памяти.
+        fsm_ttl_hours (int): Через сколько часов без изменений незавершённый сценарий удаляется.
+        fsm_flush_interval (float): Период пакетной записи FSM-состояний в БД, секунды.
+        mode (str): Способ получения обновлений: 'polling' или 'webhook'.
+            В режиме workers > 1 всегда используется polling.
+        webhook_url (str): Публичный адрес бота для регистрации webhook в Telegram.
+            Если пуст, сервер запускается без регистрации (для локальной проверки).
+        webhook_host (str): Адрес, на котором слушает webhook-сервер.
+        webhook_port (int): Порт webhook-сервера.
+        webhook_path (str): Путь, на который Telegram отправляет обновления.
+        webhook_secret (str): Секретный токен для заголовка X-Telegram-Bot-Api-Secret-Token.
+        webhook_max_in_flight (int): Максимум одновременно обрабатываемых обновлений.
+        lanes_max_concurrency (int): Максимум обновлений разных пользователей,
+            обрабатываемых одновременно.
+        lanes_max_queue (int): Максимум ожидающих обновлений одного пользователя.
+        metrics_host (str): Адрес HTTP-сервера метрик Prometheus.
+        metrics_port (int): Порт сервера метрик (0 — сервер не запускается).
+            В режиме workers > 1 процесс N слушает порт metrics_port + N.
+        loop_lag_interval (float): Период измерения задержки цикла событий, секунды.
+        slow_callback_threshold (float): Блокировка цикла событий дольше порога (секунды)
+            записывается в журнал со стеком виновника (0 — не отслеживать).
+        admin_ids (list[int]): Telegram ID администраторов (служебные команды, например /profile).
+        profile_sample_rate (float): Доля профилируемых обновлений (0 — выключено).
+        profile_slow_ms (int): Профилировать все обновления дольше порога, мс (0 — выключено).
+            Оба параметра можно менять на лету командой /profile.
+        profile_dir (str): Каталог для профилей в формате folded stacks.
+        profile_max_files (int): Сколько последних профилей хранить.
+        profile_hash_key (str): Секрет для хэша user_id в именах файлов профилей
+            (пусто — ключ выводится из bot_token).
+        digest_processes (int): Количество процессов для отрисовки еженедельных отчётов.
+        digest_send_hour (int): Час отправки еженедельного отчёта по местному времени пользователя.
+        http_pool_limit (int): Максимум одновременных соединений с Bot API (0 — без ограничения).
+        http_pool_limit_per_host (int): Максимум соединений с одним хостом (0 — без ограничения).
+        http_keepalive_timeout (float): Сколько секунд держать простаивающее соединение открытым.
+        http_dns_ttl (int): Время жизни записей в кэше DNS, секунды.
+        http_connect_timeout (float): Таймаут установки соединения с Bot API, секунды.
+        http_timeout (float): Общий таймаут запроса к Bot API, секунды.
+        bot_api_url (str): Адрес локального сервера Bot API (telegram-bot-api).
+            Если пуст, используется api.telegram.org.
+        drink_debounce_seconds (float): Окно объединения нажатий быстрых кнопок воды, секунды
+            (0 — каждое нажатие записывается сразу).
 
     Примечание:
         Загружает значения из файла .env в корне проекта.
@@ -22,7 +73,44 @@ class Settings(BaseSettings):
 
     bot_token: str
     db_path: str = "data/aquatrack.db"
+    db_shards: int = 1
     i18n_auto_generate: int = 0
+    reminder_interval_minutes: int = 100
+    outbox_workers: int = 4
+    outbox_rate_limit: float = 25.0
+    workers: int = 1
+    fsm_cache_size: int = 10_000
+    fsm_ttl_hours: int = 24
+    fsm_flush_interval: float = 2.0
+    mode: str = "polling"
+    webhook_url: str = ""
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_path: str = "/webhook"
+    webhook_secret: str = ""
+    webhook_max_in_flight: int = 100
+    lanes_max_concurrency: int = 32
+    lanes_max_queue: int = 20
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 0
+    loop_lag_interval: float = 0.25
+    slow_callback_threshold: float = 0.0
+    admin_ids: list[int] = []
+    profile_sample_rate: float = 0.0
+    profile_slow_ms: int = 0
+    profile_dir: str = "data/profiles"
+    profile_max_files: int = 200
+    profile_hash_key: str = ""
+    digest_processes: int = 2
+    digest_send_hour: int = 9
+    http_pool_limit: int = 100
+    http_pool_limit_per_host: int = 0
+    http_keepalive_timeout: float = 30.0
+    http_dns_ttl: int = 300
+    http_connect_timeout: float = 10.0
+    http_timeout: float = 60.0
+    bot_api_url: str = ""
+    drink_debounce_seconds: float = 1.0
 
     class Config:
         """Указывает Pydantic использовать файл .env для загрузки переменных."""
@@ -3,9 +3,21 @@
 
 Инициализирует асинхронный движок SQLAlchemy для работы с SQLite,
 создаёт таблицы при первом запуске и предоставляет фабрику сессий.
+
+При DB_SHARDS > 1 данные пользователей распределяются по нескольким
+файлам SQLite (шардам) по хэшу user_id: у каждого шарда свой движок,
+а значит и свой писатель, поэтому записи разных пользователей не ждут
+одну блокировку файла. Шард 0 — основной файл DB_PATH; в нём же живут
+общие таблицы (FSM-состояния, сводки сообщества, таблица лидеров).
+Запросы по одному пользователю идут в его шард (session_for), запросы
+по всем пользователям выполняются во всех шардах (shard_sessions).
+Перераспределение данных при смене числа шардов — database/reshard.py.
 """
 import os
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import zlib
+from typing import List
+from sqlalchemy import event, inspect, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 from .models import metadata
 
@@ -13,14 +25,74 @@ from .models import metadata
 DB_PATH = os.getenv("DB_PATH", "data/aquatrack.db")
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
-# Создаём асинхронный движок
-# Для SQLite в памяти или файле
-engine = create_async_engine(
-    f"sqlite+aiosqlite:///{DB_PATH}",
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,  # важно для SQLite в одном файле
-    echo=False,  # установите True для отладки SQL
-)
+# Количество шардов (1 — все данные в DB_PATH)
+DB_SHARDS = max(1, int(os.getenv("DB_SHARDS", "1")))
+
+
+def shard_path(index: int, base: str = DB_PATH) -> str:
+    """
+    Возвращает путь к файлу шарда.
+
+    Args:
+        index (int): Номер шарда.
+        base (str): Путь к основному файлу.
+
+    Returns:
+        str: base для шарда 0, иначе «<имя>-<index><расширение>» рядом с ним.
+    """
+    if index == 0:
+        return base
+    root, ext = os.path.splitext(base)
+    return f"{root}-{index}{ext}"
+
+
+def shard_for(user_id: int, shards: int = DB_SHARDS) -> int:
+    """
+    Возвращает номер шарда пользователя.
+
+    Хэш совпадает с services.cluster.partition_for: при workers == DB_SHARDS
+    каждый процесс-обработчик пишет только в свой файл.
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+        shards (int): Количество шардов.
+
+    Returns:
+        int: Номер шарда от 0 до shards - 1.
+    """
+    return zlib.crc32(str(user_id).encode()) % shards
+
+
+def create_sqlite_engine(path: str) -> AsyncEngine:
+    """
+    Создаёт асинхронный движок для файла SQLite с режимом WAL.
+
+    Args:
+        path (str): Путь к файлу базы данных.
+
+    Returns:
+        AsyncEngine: Движок с одним соединением (StaticPool).
+    """
+    sqlite_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}",
+        # timeout — ожидание блокировки, если файл пишет другой процесс (режим workers > 1)
+        connect_args={"check_same_thread": False, "timeout": 30},
+        poolclass=StaticPool,  # важно для SQLite в одном файле
+        echo=False,  # установите True для отладки SQL
+    )
+    event.listen(sqlite_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return sqlite_engine
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Включает WAL, чтобы чтение из других процессов не блокировалось записью."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.close()
+
+
+# Создаём асинхронный движок основного файла (шард 0)
+engine = create_sqlite_engine(DB_PATH)
 
 # Создаём фабрику сессий
 AsyncSessionLocal = async_sessionmaker(
@@ -28,15 +100,77 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False,
 )
 
+# Движки и фабрики сессий всех шардов (индекс — номер шарда)
+shard_engines: List[AsyncEngine] = [engine] + [
+    create_sqlite_engine(shard_path(index)) for index in range(1, DB_SHARDS)
+]
+shard_sessions: List[async_sessionmaker] = [AsyncSessionLocal] + [
+    async_sessionmaker(bind=shard_engine, expire_on_commit=False) for shard_engine in shard_engines[1:]
+]
+
+
+def session_for(user_id: int) -> async_sessionmaker:
+    """
+    Возвращает фабрику сессий шарда пользователя.
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+
+    Returns:
+        async_sessionmaker: Фабрика сессий (при одном шарде — AsyncSessionLocal).
+    """
+    return shard_sessions[shard_for(user_id, len(shard_sessions))]
+
+
+async def dispose_engines() -> None:
+    """Закрывает соединения всех шардов."""
+    for shard_engine in shard_engines:
+        await shard_engine.dispose()
+
+
 async def init_db():
     """
     Инициализирует базу данных.
 
     Создаёт все таблицы, определённые в metadata, если они ещё не существуют.
-    Вызывается один раз при запуске приложения.
+    Вызывается один раз при запуске приложения. Схема создаётся
+    в каждом шарде.
 
     Примечание:
         Безопасна для повторного вызова — не пересоздаёт существующие таблицы.
+        Колонки и индексы, добавленные после создания таблиц, досоздаются отдельно.
     """
-    async with engine.begin() as conn:
+    for shard_engine in shard_engines:
+        await init_schema(shard_engine)
+
+
+async def init_schema(sqlite_engine: AsyncEngine) -> None:
+    """Создаёт недостающие таблицы, колонки и индексы в одном файле."""
+    async with sqlite_engine.begin() as conn:
         await conn.run_sync(metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_create_missing_indexes)
+
+
+def _add_missing_columns(sync_conn) -> None:
+    """
+    Добавляет в существующие таблицы колонки, появившиеся в metadata позже.
+
+    Новые колонки добавляются как nullable: значения по умолчанию SQLAlchemy
+    применяются только к новым строкам.
+    """
+    inspector = inspect(sync_conn)
+    for table in metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=sync_conn.dialect)
+            sync_conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+
+def _create_missing_indexes(sync_conn) -> None:
+    """Создаёт индексы, которых нет в уже существующих таблицах."""
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
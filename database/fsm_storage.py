@@ -0,0 +1,214 @@
+"""
+Модуль хранилища FSM-состояний в базе данных.
+
+Сохраняет состояния и данные сценариев aiogram (например, мастера
+настройки профиля /start) в таблице fsm_states, чтобы пользователи
+не теряли прогресс при перезапуске бота.
+
+Горячие записи держатся в ограниченном LRU-кэше в памяти, изменения
+накапливаются и записываются в БД пакетами (write-back). Записи, которые
+не менялись дольше TTL, считаются брошенными и удаляются.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .engine import AsyncSessionLocal
+from .models import fsm_states
+
+logger = logging.getLogger(__name__)
+
+
+class _Record:
+    """Состояние и данные одного FSM-ключа."""
+
+    __slots__ = ("state", "data", "updated_at")
+
+    def __init__(self, state: Optional[str] = None, data: Optional[Dict[str, Any]] = None,
+                 updated_at: Optional[datetime] = None):
+        self.state = state
+        self.data = data or {}
+        self.updated_at = updated_at or datetime.now(timezone.utc)
+
+    @property
+    def empty(self) -> bool:
+        return self.state is None and not self.data
+
+
+class SQLStorage(BaseStorage):
+    """
+    FSM-хранилище в SQL с ограниченным кэшем и пакетной записью.
+
+    Args:
+        session_factory: Фабрика асинхронных сессий SQLAlchemy.
+        cache_size (int): Максимум записей в LRU-кэше.
+        ttl (timedelta): Через сколько после последнего изменения запись удаляется.
+        flush_interval (float): Период пакетной записи изменений в секундах.
+
+    Примечание:
+        Пустые записи (нет состояния и данных) тоже кэшируются: FSM-middleware
+        запрашивает состояние на каждое обновление, и без этого каждый апдейт
+        пользователя вне сценария читал бы БД.
+    """
+
+    def __init__(
+            self,
+            session_factory=AsyncSessionLocal,
+            cache_size: int = 10_000,
+            ttl: timedelta = timedelta(hours=24),
+            flush_interval: float = 2.0,
+    ):
+        self.session_factory = session_factory
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+
+        self._cache: "OrderedDict[str, _Record]" = OrderedDict()
+        self._dirty: Dict[str, _Record] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        return ":".join(str(part) if part is not None else "" for part in (
+            key.bot_id, key.chat_id, key.user_id, key.thread_id, key.business_connection_id, key.destiny,
+        ))
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._get_record(self._key(key))
+        new_state = state.state if isinstance(state, State) else state
+        self._put(self._key(key), _Record(new_state, record.data))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._get_record(self._key(key))).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record = await self._get_record(self._key(key))
+        self._put(self._key(key), _Record(record.state, data.copy()))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._get_record(self._key(key))).data.copy()
+
+    async def close(self) -> None:
+        """Останавливает фоновую запись и сбрасывает накопленные изменения в БД."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Записывает все накопленные изменения одной транзакцией."""
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            pending, self._dirty = self._dirty, {}
+            to_delete = [key for key, record in pending.items() if record.empty]
+            to_upsert = [
+                {"key": key, "state": record.state, "data": record.data, "updated_at": record.updated_at}
+                for key, record in pending.items() if not record.empty
+            ]
+            try:
+                async with self.session_factory() as session:
+                    if to_delete:
+                        await session.execute(delete(fsm_states).where(fsm_states.c.key.in_(to_delete)))
+                    if to_upsert:
+                        stmt = sqlite_insert(fsm_states)
+                        stmt = stmt.on_conflict_do_update(
+                            index_elements=[fsm_states.c.key],
+                            set_={
+                                "state": stmt.excluded.state,
+                                "data": stmt.excluded.data,
+                                "updated_at": stmt.excluded.updated_at,
+                            },
+                        )
+                        await session.execute(stmt, to_upsert)
+                    await session.commit()
+            except Exception:
+                # Возвращаем изменения в буфер, не затирая более новые
+                for key, record in pending.items():
+                    self._dirty.setdefault(key, record)
+                raise
+
+    async def purge_expired(self) -> int:
+        """
+        Удаляет записи, не менявшиеся дольше TTL, из кэша и из БД.
+
+        Returns:
+            int: Количество удалённых строк в БД.
+        """
+        threshold = datetime.now(timezone.utc) - self.ttl
+        # Кэш упорядочен по последнему обращению, а не по изменению: недавно
+        # прочитанная запись может быть устаревшей, поэтому проверяем весь кэш
+        expired = [key for key, record in self._cache.items() if record.updated_at < threshold]
+        for key in expired:
+            del self._cache[key]
+        async with self.session_factory() as session:
+            result = await session.execute(delete(fsm_states).where(fsm_states.c.updated_at < threshold))
+            await session.commit()
+            return result.rowcount
+
+    async def _get_record(self, key: str) -> _Record:
+        record = self._cache.get(key)
+        if record is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+        else:
+            self.misses += 1
+            record = self._dirty.get(key) or await self._load(key)
+            self._remember(key, record)
+        if not record.empty and self._is_expired(record):
+            record = _Record()
+            self._put(key, record)
+        return record
+
+    async def _load(self, key: str) -> _Record:
+        async with self.session_factory() as session:
+            result = await session.execute(select(fsm_states).where(fsm_states.c.key == key))
+            row = result.mappings().fetchone()
+        if row is None:
+            return _Record()
+        updated_at = row["updated_at"]
+        if updated_at is not None and updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        return _Record(row["state"], dict(row["data"] or {}), updated_at)
+
+    def _put(self, key: str, record: _Record) -> None:
+        self._remember(key, record)
+        self._dirty[key] = record
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    def _remember(self, key: str, record: _Record) -> None:
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        # Вытесненные изменённые записи остаются в _dirty до ближайшей записи в БД
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _is_expired(self, record: _Record) -> bool:
+        return datetime.now(timezone.utc) - record.updated_at > self.ttl
+
+    async def _flush_loop(self) -> None:
+        purge_every = max(1, int(3600 / self.flush_interval))  # примерно раз в час
+        iteration = 0
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            iteration += 1
+            try:
+                await self.flush()
+                if iteration % purge_every == 0:
+                    removed = await self.purge_expired()
+                    if removed:
+                        logger.info("🧹 Удалено устаревших FSM-состояний: %s", removed)
+            except Exception:
+                logger.exception("❌ Ошибка записи FSM-состояний")
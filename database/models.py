@@ -4,10 +4,11 @@
 Содержит определения таблиц в виде объектов SQLAlchemy Core.
 Используется для генерации схемы БД и выполнения запросов.
 """
-from sqlalchemy import MetaData, Table, Column, Integer, BigInteger, DateTime, String, Boolean
+from sqlalchemy import MetaData, Table, Column, Index, Integer, BigInteger, Date, DateTime, String, Boolean, JSON, LargeBinary
 
 metadata = MetaData()
 
+# Порядок колонок повторяют поля database/profiles.UserProfile
 users = Table(
     "users",
     metadata,
@@ -20,6 +21,11 @@ users = Table(
     Column("language", String(2), default="ru"), # ISO 639-1
     Column("unit_preference", String(10), default="ml"),  # "ml" or "cups"
     Column("notifications_enabled", Boolean, default=True),
+    Column("last_intake_at", DateTime),  # денормализовано из intakes, UTC
+    Column("leaderboard_opt_in", Boolean, default=False),  # участвует в /leaderboard
+    Column("weekly_digest_enabled", Boolean, default=False),  # получает еженедельный отчёт
+    # Выборка получателей периодических напоминаний по окну локального времени
+    Index("ix_users_notifications_tz", "notifications_enabled", "timezone_offset"),
 )
 
 intakes = Table(
@@ -29,4 +35,63 @@ intakes = Table(
     Column("user_id", BigInteger),
     Column("amount_ml", Integer),
     Column("timestamp", DateTime),
+    # Выборки по пользователю за период (история, сегодня, неделя)
+    Index("ix_intakes_user_timestamp", "user_id", "timestamp"),
+    # Суточная сводка по всем пользователям (services/scheduler)
+    Index("ix_intakes_timestamp", "timestamp"),
+)
+
+user_streaks = Table(
+    "user_streaks",
+    metadata,
+    Column("user_id", BigInteger, primary_key=True),
+    Column("current_streak", Integer, default=0),  # дней подряд с выполненной нормой
+    Column("longest_streak", Integer, default=0),
+    Column("last_goal_day", Date),  # последний локальный день с выполненной нормой
+    Column("day", Date),  # локальный день, за который накоплен day_total_ml
+    Column("day_total_ml", Integer, default=0),
+    Column("best_day", Date),  # рекорд: день с наибольшим потреблением
+    Column("best_day_ml", Integer, default=0),
+)
+
+community_stats = Table(
+    "community_stats",
+    metadata,
+    Column("day", Date, primary_key=True),  # сутки UTC
+    Column("users_count", Integer),  # пользователей, отметивших воду за сутки
+    Column("cut_points", JSON),  # 101 значение: процентили 0..100 суточных сумм, мл
+    Column("computed_at", DateTime),
+)
+
+leaderboard = Table(
+    "leaderboard",
+    metadata,
+    Column("day", Date, primary_key=True),  # сутки UTC
+    Column("rank", Integer, primary_key=True),  # 1 — больше всех
+    Column("user_id", BigInteger),
+    Column("total_ml", Integer),
+)
+
+digest_jobs = Table(
+    "digest_jobs",
+    metadata,
+    Column("week", Date, primary_key=True),  # понедельник недели отчёта (UTC)
+    Column("user_id", BigInteger, primary_key=True),
+    Column("status", String(10)),  # pending → rendered → sent | skipped | failed
+    Column("send_at", DateTime),  # утро понедельника по местному времени, в UTC
+    Column("caption", String),
+    Column("chart", LargeBinary),  # PNG; удаляется после отправки
+    Column("attempts", Integer, default=0),
+    Column("updated_at", DateTime),
+    # Выборка очередной пачки для отрисовки и для отправки
+    Index("ix_digest_jobs_status_send_at", "status", "send_at"),
+)
+
+fsm_states = Table(
+    "fsm_states",
+    metadata,
+    Column("key", String, primary_key=True),  # bot_id:chat_id:user_id:thread_id:business_id:destiny
+    Column("state", String),
+    Column("data", JSON),
+    Column("updated_at", DateTime, index=True),  # для удаления брошенных сценариев по TTL
 )
@@ -0,0 +1,163 @@
+"""
+Модуль компактного представления профиля пользователя.
+
+Профили читаются на каждое событие (I18nMiddleware кладёт их в
+data["user"]) и тысячами при рассылке напоминаний, поэтому вместо
+словаря на строку используется UserProfile — неизменяемый объект
+со __slots__: без __dict__ и хэш-таблицы ключей. Пол, уровень
+активности, язык и единицы измерения хранятся малыми целыми (IntEnum):
+члены перечислений — общие объекты, а не новые строки на каждую строку БД.
+
+UserProfile реализует Mapping: profile["language"], profile.get(...),
+"key" in profile и dict(profile) работают как со словарём и возвращают
+значения в виде колонок таблицы users (язык и единицы — строковыми
+кодами, пол и активность — int). Новый код может читать атрибуты
+напрямую: profile.language — Language, profile.gender — Gender.
+"""
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+from datetime import date, datetime
+from enum import IntEnum
+from operator import attrgetter
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+from .models import users
+
+
+class Gender(IntEnum):
+    """Пол (значение колонки users.gender)."""
+
+    MALE = 0
+    FEMALE = 1
+
+
+class ActivityLevel(IntEnum):
+    """Уровень активности (значение колонки users.activity_level)."""
+
+    LOW = 0
+    MEDIUM = 1
+    HIGH = 2
+
+
+class Language(IntEnum):
+    """
+    Язык интерфейса; в БД хранится код ISO 639-1 (Language.code).
+
+    Члены совпадают с utils.i18n.SUPPORTED_LANGUAGES (проверяется при импорте utils.i18n).
+    """
+
+    RU = 0
+    EN = 1
+    DE = 2
+    ZH = 3
+    BE = 4
+
+    @property
+    def code(self) -> str:
+        return self.name.lower()
+
+
+class Units(IntEnum):
+    """Единицы измерения; в БД хранится код (Units.code)."""
+
+    ML = 0
+    CUPS = 1
+
+    @property
+    def code(self) -> str:
+        return self.name.lower()
+
+
+# Значение колонки → член перечисления (None и неизвестные значения → None)
+_GENDERS: Dict[Optional[int], Gender] = {gender.value: gender for gender in Gender}
+_ACTIVITY_LEVELS: Dict[Optional[int], ActivityLevel] = {level.value: level for level in ActivityLevel}
+_LANGUAGES: Dict[Optional[str], Language] = {language.code: language for language in Language}
+_UNITS: Dict[Optional[str], Units] = {units.code: units for units in Units}
+
+
+def _code(member: Optional[Language | Units]) -> Optional[str]:
+    return member.code if member is not None else None
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class UserProfile(Mapping):
+    """
+    Строка таблицы users в компактном виде.
+
+    Поля совпадают с колонками users и идут в том же порядке, что
+    в database/models.py (на этом основан from_row). current_streak и last_goal_day
+    заполняет только get_all_active_users(with_streaks=True), иначе они None.
+    Неизвестные коды языка и единиц читаются как None.
+    """
+
+    user_id: int
+    gender: Optional[Gender] = None
+    weight_kg: Optional[int] = None
+    activity_level: Optional[ActivityLevel] = None
+    daily_goal_ml: Optional[int] = None
+    timezone_offset: Optional[int] = None
+    language: Optional[Language] = None
+    unit_preference: Optional[Units] = None
+    notifications_enabled: Optional[bool] = None
+    last_intake_at: Optional[datetime] = None
+    leaderboard_opt_in: Optional[bool] = None
+    weekly_digest_enabled: Optional[bool] = None
+    current_streak: Optional[int] = None
+    last_goal_day: Optional[date] = None
+
+    @classmethod
+    def from_row(cls, row: Sequence) -> "UserProfile":
+        """
+        Создаёт профиль из строки запроса select(users, ...).
+
+        Значения берутся по позиции: обращение к Row по индексу в разы
+        дешевле, чем по имени колонки, а профилей за рассылку создаются тысячи.
+
+        Args:
+            row (Sequence): Значения колонок users в порядке таблицы, за ними
+                необязательно current_streak и last_goal_day.
+
+        Returns:
+            UserProfile: Профиль.
+        """
+        (user_id, gender, weight_kg, activity_level, daily_goal_ml, timezone_offset, language, unit_preference,
+         notifications_enabled, last_intake_at, leaderboard_opt_in, weekly_digest_enabled, *streak) = row
+        return cls(
+            user_id,
+            _GENDERS.get(gender),
+            weight_kg,
+            _ACTIVITY_LEVELS.get(activity_level),
+            daily_goal_ml,
+            timezone_offset,
+            _LANGUAGES.get(language),
+            _UNITS.get(unit_preference),
+            notifications_enabled,
+            last_intake_at,
+            leaderboard_opt_in,
+            weekly_digest_enabled,
+            *streak,
+        )
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            getter = _GETTERS[key]
+        except KeyError:
+            raise KeyError(key) from None
+        return getter(self)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_GETTERS)
+
+    def __len__(self) -> int:
+        return len(_GETTERS)
+
+
+# from_row берёт значения по позиции: новая или переставленная колонка users
+# без такого же поля профиля молча попала бы в чужое поле
+if [field.name for field in fields(UserProfile)][:len(users.c)] != [column.name for column in users.c]:
+    raise RuntimeError("Поля UserProfile должны повторять колонки users в том же порядке (database/models.py)")
+
+_GETTERS: Dict[str, Any] = {field.name: attrgetter(field.name) for field in fields(UserProfile)}
+"""Ключ словаря → функция чтения значения в виде колонки users."""
+_GETTERS["language"] = lambda profile: _code(profile.language)
+_GETTERS["unit_preference"] = lambda profile: _code(profile.unit_preference)
@@ -2,12 +2,42 @@
 Модуль выполнения запросов к базе данных.
 
 Содержит функции для CRUD-операций с пользователями и записями о воде.
-Все функции асинхронны и используют AsyncSessionLocal из engine.py.
+Все функции асинхронны. Запросы по одному пользователю выполняются
+в его шарде (session_for из engine.py), запросы по всем пользователям —
+во всех шардах параллельно с объединением результатов (_fetch_all_shards),
+общие таблицы (сводки сообщества, таблица лидеров) — в основном файле
+(AsyncSessionLocal).
 """
-from datetime import datetime, timezone, timedelta
-from sqlalchemy import select, insert, update, func
-from .models import users, intakes
-from .engine import AsyncSessionLocal
+import asyncio
+import json
+from datetime import date, datetime, timezone, timedelta
+from typing import Iterable
+from sqlalchemy import select, insert, update, delete, func, or_, and_, literal, bindparam, DateTime
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from .models import users, intakes, user_streaks, community_stats, leaderboard, digest_jobs
+from .profiles import UserProfile
+from .engine import AsyncSessionLocal, session_for, shard_for, shard_sessions
+from .streaks import apply_intake, local_day
+
+
+async def _fetch_all_shards(query) -> list:
+    """
+    Выполняет запрос во всех шардах параллельно и объединяет строки.
+
+    Args:
+        query: SELECT без привязки к пользователю.
+
+    Returns:
+        list[sqlalchemy.engine.Row]: Строки шардов по порядку номеров шардов.
+    """
+    async def fetch(factory):
+        async with factory() as session:
+            result = await session.execute(query)
+            return result.fetchall()
+
+    parts = await asyncio.gather(*(fetch(factory) for factory in shard_sessions))
+    return [row for part in parts for row in part]
+
 
 async def get_user(user_id: int):
     """
@@ -17,13 +47,13 @@ async def get_user(user_id: int):
         user_id (int): Уникальный идентификатор пользователя в Telegram.
 
     Returns:
-        sqlalchemy.engine.Row | None: Строка из таблицы users или None, если не найден.
+        UserProfile | None: Профиль пользователя или None, если не найден.
     """
-    async with AsyncSessionLocal() as session:
+    async with session_for(user_id)() as session:
         query = select(users).where(users.c.user_id == user_id)
         result = await session.execute(query)
-        row = result.mappings().fetchone()
-        return dict(row) if row else None
+        row = result.fetchone()
+        return UserProfile.from_row(row) if row else None
 
 async def create_or_update_user(user_id: int, **kwargs):
     """
@@ -33,7 +63,7 @@ async def create_or_update_user(user_id: int, **kwargs):
         user_id (int): Telegram ID пользователя.
         **kwargs: Поля для сохранения (gender, weight_kg, daily_goal_ml и т.д.).
     """
-    async with AsyncSessionLocal() as session:
+    async with session_for(user_id)() as session:
         existing = await get_user(user_id)
         if existing:
             stmt = update(users).where(users.c.user_id == user_id).values(**kwargs)
@@ -44,7 +74,7 @@ async def create_or_update_user(user_id: int, **kwargs):
         await session.commit()
 
 async def set_user_language(user_id: int, lang: str):
-    async with AsyncSessionLocal() as session:
+    async with session_for(user_id)() as session:
         # Убедимся, что пользователь существует
         existing = await get_user(user_id)
         if not existing:
@@ -59,17 +89,140 @@ async def add_intake(user_id: int, amount_ml: int):
     """
     Добавляет запись о потреблении воды.
 
+    В той же транзакции обновляет серию выполнения нормы (user_streaks):
+    одна строка по первичному ключу, без чтения истории.
+
     Args:
         user_id (int): Telegram ID пользователя.
         amount_ml (int): Количество выпитой воды в миллилитрах.
     """
-    async with AsyncSessionLocal() as session:
-        stmt = insert(intakes).values(
-            user_id=user_id,
-            amount_ml=amount_ml,
-            timestamp=datetime.now(timezone.utc)
+    await add_intakes(user_id, [(datetime.now(timezone.utc), amount_ml)])
+
+async def add_intakes(user_id: int, taps: list[tuple[datetime, int]]):
+    """
+    Добавляет несколько записей о воде одной транзакцией.
+
+    Используется для серии нажатий быстрых кнопок: каждое нажатие — отдельная
+    запись со своим временем, но вставка (executemany), обновление
+    users.last_intake_at и серии user_streaks выполняются за один коммит.
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+        taps (list[tuple[datetime, int]]): Пары (время UTC, объём в мл) в порядке нажатий.
+    """
+    if not taps:
+        return
+    last_at = max(moment for moment, _ in taps)
+    async with session_for(user_id)() as session:
+        await session.execute(
+            insert(intakes),
+            [{"user_id": user_id, "amount_ml": amount_ml, "timestamp": moment} for moment, amount_ml in taps],
         )
-        await session.execute(stmt)
+        # Время последнего приёма хранится в users, чтобы напоминания
+        # могли отсеивать недавно пивших без обращения к intakes
+        await session.execute(
+            update(users).where(users.c.user_id == user_id).values(last_intake_at=last_at)
+        )
+
+        profile = (await session.execute(
+            select(users.c.daily_goal_ml, users.c.timezone_offset, user_streaks)
+            .select_from(users.outerjoin(user_streaks, user_streaks.c.user_id == users.c.user_id))
+            .where(users.c.user_id == user_id)
+        )).mappings().fetchone()
+        if profile:
+            state = profile if profile["user_id"] is not None else None
+            for moment, amount_ml in taps:
+                state = apply_intake(
+                    state,
+                    local_day(moment, profile["timezone_offset"]),
+                    amount_ml,
+                    profile["daily_goal_ml"],
+                )
+            await session.execute(
+                sqlite_insert(user_streaks)
+                .values(user_id=user_id, **state)
+                .on_conflict_do_update(index_elements=[user_streaks.c.user_id], set_=state)
+            )
+        await session.commit()
+
+async def add_intakes_bulk(user_id: int, rows: list[tuple[datetime, int]]) -> int:
+    """
+    Добавляет пачку записей о воде с явными временными метками.
+
+    Выполняется одним executemany в одной транзакции. Дубликаты не
+    проверяются: повторы в файле импорта — настоящие приёмы воды (например,
+    экспорт по дням), а с уже имевшимися записями сверяется вызывающий
+    код (services/intake_import) через count_intakes_at.
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+        rows (list[tuple[datetime, int]]): Пары (время UTC, объём в мл).
+
+    Returns:
+        int: Количество вставленных записей.
+    """
+    if not rows:
+        return 0
+    params = [
+        {"user_id": user_id, "amount_ml": amount_ml, "timestamp": moment.astimezone(timezone.utc).replace(tzinfo=None)}
+        for moment, amount_ml in rows
+    ]
+    async with session_for(user_id)() as session:
+        await session.execute(insert(intakes), params)
+        await session.commit()
+    return len(params)
+
+async def get_max_intake_id(user_id: int) -> int:
+    """
+    Возвращает наибольший id записи о воде в шарде пользователя.
+
+    Записи, добавленные позже, получают id больше него, поэтому по нему
+    импорт отличает записи, существовавшие до начала, от своих.
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+
+    Returns:
+        int: Наибольший id или 0, если записей нет.
+    """
+    async with session_for(user_id)() as session:
+        result = await session.execute(select(func.max(intakes.c.id)))
+        return result.scalar() or 0
+
+async def count_intakes_at(user_id: int, moments: Iterable[datetime], max_id: int) -> dict[tuple[datetime, int], int]:
+    """
+    Считает записи пользователя с заданными метками времени.
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+        moments (Iterable[datetime]): Метки времени (UTC).
+        max_id (int): Учитываются только записи с id не больше этого
+            (см. get_max_intake_id).
+
+    Returns:
+        dict[tuple[datetime, int], int]: (время UTC, объём в мл) → количество записей.
+    """
+    moments = [moment.astimezone(timezone.utc).replace(tzinfo=None) for moment in moments]
+    if not moments:
+        return {}
+    query = (
+        select(intakes.c.timestamp, intakes.c.amount_ml, func.count())
+        .where(intakes.c.user_id == user_id, intakes.c.id <= max_id, intakes.c.timestamp.in_(moments))
+        .group_by(intakes.c.timestamp, intakes.c.amount_ml)
+    )
+    async with session_for(user_id)() as session:
+        result = await session.execute(query)
+        return {(moment.replace(tzinfo=timezone.utc), amount_ml): count for moment, amount_ml, count in result}
+
+async def refresh_last_intake(user_id: int):
+    """Пересчитывает users.last_intake_at по intakes (после импорта задним числом)."""
+    async with session_for(user_id)() as session:
+        latest = (
+            select(func.max(intakes.c.timestamp))
+            .where(intakes.c.user_id == user_id)
+            .scalar_subquery()
+        )
+        await session.execute(update(users).where(users.c.user_id == user_id).values(last_intake_at=latest))
         await session.commit()
 
 async def get_today_intakes(user_id: int):
@@ -83,7 +236,7 @@ async def get_today_intakes(user_id: int):
         list[sqlalchemy.engine.Row]: Список записей.
     """
     today = datetime.now(timezone.utc).date()
-    async with AsyncSessionLocal() as session:
+    async with session_for(user_id)() as session:
         query = (
             select(intakes)
             .where(intakes.c.user_id == user_id)
@@ -106,7 +259,7 @@ async def get_weekly_totals(user_id: int):
     """
     now = datetime.now(timezone.utc)
     week_ago = now - timedelta(days=7)
-    async with AsyncSessionLocal() as session:
+    async with session_for(user_id)() as session:
         query = (
             select(
                 func.date(intakes.c.timestamp).label("date"),
@@ -120,17 +273,412 @@ async def get_weekly_totals(user_id: int):
         rows = result.fetchall()
         return {str(row.date): row.total for row in rows}
 
+async def get_analyze_snapshot(user_id: int):
+    """
+    Возвращает всё, что нужно /analyze, одним запросом.
+
+    Профиль, состояние серии и суммы за последние 7 дней (UTC) читаются одним
+    SELECT: суммы по дням собираются в SQLite через json_group_object
+    в скалярном подзапросе, поэтому из БД приходит одна строка, а сами
+    записи intakes в Python не материализуются. Сегодняшняя сумма — это
+    значение за сегодняшнюю дату.
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+
+    Returns:
+        tuple[UserProfile | None, dict | None, dict[str, int]]: Профиль (как get_user),
+        строка user_streaks (как get_user_streak) и словарь {"YYYY-MM-DD": total_ml}.
+    """
+    today = datetime.now(timezone.utc).date()
+    week_start = datetime.combine(today - timedelta(days=6), datetime.min.time(), tzinfo=timezone.utc)
+    day = func.date(intakes.c.timestamp)
+    daily = (
+        select(day.label("day"), func.sum(intakes.c.amount_ml).label("total"))
+        .where(intakes.c.user_id == user_id)
+        .where(intakes.c.timestamp >= week_start)
+        .group_by(day)
+        .subquery()
+    )
+    weekly = select(func.json_group_object(daily.c.day, daily.c.total)).scalar_subquery()
+    streak_columns = [column for column in user_streaks.c if column.name != "user_id"]
+    async with session_for(user_id)() as session:
+        query = (
+            select(users, user_streaks.c.user_id.label("streak_user_id"), *streak_columns,
+                   weekly.label("weekly_totals"))
+            .select_from(users.outerjoin(user_streaks, user_streaks.c.user_id == users.c.user_id))
+            .where(users.c.user_id == user_id)
+        )
+        result = await session.execute(query)
+        row = result.mappings().fetchone()
+    if not row:
+        return None, None, {}
+    user = UserProfile.from_row(tuple(row.values())[:len(users.c)])
+    streak = None
+    if row["streak_user_id"] is not None:
+        streak = {"user_id": user_id, **{column.name: row[column.name] for column in streak_columns}}
+    return user, streak, json.loads(row["weekly_totals"] or "{}")
+
+async def get_daily_totals(user_id: int, days: int):
+    """
+    Возвращает суммы воды по дням (UTC) за последние N дней одним запросом.
+
+    Диапазон задаётся по timestamp, а не по date(timestamp), поэтому запрос
+    читает только нужный отрезок индекса (user_id, timestamp).
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+        days (int): Количество дней, включая сегодняшний.
+
+    Returns:
+        list[sqlalchemy.engine.Row]: Строки (date "YYYY-MM-DD", total) по возрастанию
+        даты; дни без записей отсутствуют.
+    """
+    today = datetime.now(timezone.utc).date()
+    start = datetime.combine(today - timedelta(days=days - 1), datetime.min.time(), tzinfo=timezone.utc)
+    async with session_for(user_id)() as session:
+        day = func.date(intakes.c.timestamp)
+        query = (
+            select(day.label("date"), func.sum(intakes.c.amount_ml).label("total"))
+            .where(intakes.c.user_id == user_id)
+            .where(intakes.c.timestamp >= start)
+            .group_by(day)
+            .order_by(day)
+        )
+        result = await session.execute(query)
+        return result.fetchall()
+
+async def get_user_streak(user_id: int):
+    """
+    Возвращает состояние серии и рекорды пользователя.
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+
+    Returns:
+        dict | None: Строка user_streaks или None, если воду ещё не отмечали.
+        Действующую серию считайте через database.streaks.current_streak().
+    """
+    async with session_for(user_id)() as session:
+        query = select(user_streaks).where(user_streaks.c.user_id == user_id)
+        result = await session.execute(query)
+        row = result.mappings().fetchone()
+        return dict(row) if row else None
+
 async def toggle_notifications(user_id: int, enabled: bool):
     """Переключает статус напоминаний для пользователя."""
     await create_or_update_user(user_id, notifications_enabled=enabled)
 
-async def get_all_active_users():
-    """Возвращает всех пользователей с включёнными напоминаниями"""
-    async with AsyncSessionLocal() as session:
-        query = select(users).where(users.c.notifications_enabled == True)
-        result = await session.execute(query)
-        return result.mappings().fetchall()
+async def get_all_active_users(
+        timezone_offsets: Iterable[int] | None = None,
+        idle_since: datetime | None = None,
+        with_streaks: bool = False,
+):
+    """
+    Возвращает пользователей с включёнными напоминаниями.
+
+    Args:
+        timezone_offsets (Iterable[int] | None): Если задано — только пользователи
+            с этими смещениями часового пояса (в минутах от UTC).
+        idle_since (datetime | None): Если задано — только пользователи,
+            не отмечавшие воду начиная с этого момента (UTC).
+        with_streaks (bool): Добавить колонки current_streak и last_goal_day
+            из user_streaks (в том же запросе, через LEFT JOIN).
+
+    Returns:
+        list[UserProfile]: Профили пользователей всех шардов.
+    """
+    query = select(users).where(users.c.notifications_enabled == True)
+    if with_streaks:
+        query = query.add_columns(user_streaks.c.current_streak, user_streaks.c.last_goal_day).outerjoin(
+            user_streaks, user_streaks.c.user_id == users.c.user_id
+        )
+    if timezone_offsets is not None:
+        query = query.where(users.c.timezone_offset.in_(list(timezone_offsets)))
+    if idle_since is not None:
+        query = query.where(
+            or_(users.c.last_intake_at.is_(None), users.c.last_intake_at < idle_since)
+        )
+    return [UserProfile.from_row(row) for row in await _fetch_all_shards(query)]
+
+async def get_active_timezone_offsets() -> list[int]:
+    """
+    Возвращает различные смещения часовых поясов пользователей с напоминаниями.
+
+    Запрос покрывается индексом (notifications_enabled, timezone_offset)
+    и не читает сами строки пользователей.
+    """
+    query = (
+        select(users.c.timezone_offset)
+        .where(users.c.notifications_enabled == True)
+        .distinct()
+    )
+    return list(dict.fromkeys(row[0] for row in await _fetch_all_shards(query)))
 
 async def set_user_goal(user_id: int, goal_ml: int):
     """Устанавливает суточную цель пользователя"""
     await create_or_update_user(user_id, daily_goal_ml=goal_ml)
+
+async def set_leaderboard_opt_in(user_id: int, enabled: bool):
+    """Включает или выключает участие пользователя в таблице лидеров."""
+    await create_or_update_user(user_id, leaderboard_opt_in=enabled)
+
+async def get_user_day_total(user_id: int, day: date) -> int:
+    """
+    Возвращает сумму воды пользователя за сутки UTC.
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+        day (date): Сутки UTC.
+
+    Returns:
+        int: Сумма в мл (0, если записей нет).
+    """
+    start = datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
+    async with session_for(user_id)() as session:
+        query = (
+            select(func.sum(intakes.c.amount_ml))
+            .where(intakes.c.user_id == user_id)
+            .where(intakes.c.timestamp >= start)
+            .where(intakes.c.timestamp < start + timedelta(days=1))
+        )
+        result = await session.execute(query)
+        return result.scalar() or 0
+
+async def get_day_totals_by_user(day: date):
+    """
+    Возвращает суточные суммы всех пользователей за сутки UTC.
+
+    Читает только записи этих суток по индексу на timestamp.
+
+    Args:
+        day (date): Сутки UTC.
+
+    Returns:
+        list[sqlalchemy.engine.Row]: Строки (user_id, total, leaderboard_opt_in).
+    """
+    start = datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
+    query = (
+        select(
+            intakes.c.user_id,
+            func.sum(intakes.c.amount_ml).label("total"),
+            func.coalesce(users.c.leaderboard_opt_in, False).label("leaderboard_opt_in"),
+        )
+        .select_from(intakes.outerjoin(users, users.c.user_id == intakes.c.user_id))
+        .where(intakes.c.timestamp >= start)
+        .where(intakes.c.timestamp < start + timedelta(days=1))
+        .group_by(intakes.c.user_id)
+    )
+    return await _fetch_all_shards(query)
+
+async def save_community_stats(day: date, users_count: int, cut_points: list[int], top: list[tuple[int, int]]):
+    """
+    Сохраняет сводку за сутки: процентили и таблицу лидеров.
+
+    Повторный расчёт за те же сутки заменяет предыдущий.
+
+    Args:
+        day (date): Сутки UTC.
+        users_count (int): Количество пользователей в распределении.
+        cut_points (list[int]): Значения процентилей 0..100, мл.
+        top (list[tuple[int, int]]): Пары (user_id, total_ml) по убыванию.
+    """
+    values = {"users_count": users_count, "cut_points": cut_points, "computed_at": datetime.now(timezone.utc)}
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            sqlite_insert(community_stats)
+            .values(day=day, **values)
+            .on_conflict_do_update(index_elements=[community_stats.c.day], set_=values)
+        )
+        await session.execute(delete(leaderboard).where(leaderboard.c.day == day))
+        if top:
+            await session.execute(insert(leaderboard), [
+                {"day": day, "rank": rank, "user_id": user_id, "total_ml": total}
+                for rank, (user_id, total) in enumerate(top, start=1)
+            ])
+        await session.commit()
+
+async def get_community_stats(day: date):
+    """
+    Возвращает сводку за сутки UTC.
+
+    Returns:
+        dict | None: users_count и cut_points или None, если сводки ещё нет.
+    """
+    async with AsyncSessionLocal() as session:
+        query = select(community_stats.c.users_count, community_stats.c.cut_points).where(community_stats.c.day == day)
+        result = await session.execute(query)
+        row = result.mappings().fetchone()
+        return dict(row) if row else None
+
+async def get_leaderboard(day: date):
+    """
+    Возвращает таблицу лидеров за сутки UTC.
+
+    Returns:
+        list[sqlalchemy.engine.Row]: Строки (rank, user_id, total_ml) по возрастанию места.
+    """
+    async with AsyncSessionLocal() as session:
+        query = (
+            select(leaderboard.c.rank, leaderboard.c.user_id, leaderboard.c.total_ml)
+            .where(leaderboard.c.day == day)
+            .order_by(leaderboard.c.rank)
+        )
+        result = await session.execute(query)
+        return result.fetchall()
+
+async def set_weekly_digest(user_id: int, enabled: bool):
+    """Включает или выключает еженедельный отчёт пользователя."""
+    await create_or_update_user(user_id, weekly_digest_enabled=enabled)
+
+async def plan_digest_jobs(week: date, send_hour: int) -> int:
+    """
+    Ставит в очередь еженедельные отчёты всех подписанных пользователей.
+
+    Одна команда INSERT ... SELECT в каждом шарде; уже существующие задания
+    недели не трогаются, поэтому повторный вызов безопасен.
+
+    Args:
+        week (date): Понедельник недели отчёта (UTC).
+        send_hour (int): Час отправки по местному времени следующего понедельника.
+
+    Returns:
+        int: Количество новых заданий.
+    """
+    local_send = datetime.combine(week + timedelta(days=7), datetime.min.time()).replace(hour=send_hour)
+    send_at = func.datetime(
+        literal(local_send.strftime("%Y-%m-%d %H:%M:%S")),
+        func.printf("%+d minutes", -func.coalesce(users.c.timezone_offset, 0)),
+    )
+    stmt = insert(digest_jobs).prefix_with("OR IGNORE").from_select(
+        ["week", "user_id", "status", "send_at", "attempts", "updated_at"],
+        select(
+            literal(week, type_=digest_jobs.c.week.type),
+            users.c.user_id,
+            literal("pending"),
+            send_at,
+            literal(0),
+            literal(datetime.now(timezone.utc).replace(tzinfo=None), type_=DateTime),
+        ).where(users.c.weekly_digest_enabled == True),
+    )
+
+    async def plan(factory) -> int:
+        async with factory() as session:
+            result = await session.execute(stmt)
+            await session.commit()
+            return max(result.rowcount, 0)
+
+    return sum(await asyncio.gather(*(plan(factory) for factory in shard_sessions)))
+
+async def get_digest_batch(week: date, limit: int):
+    """
+    Возвращает данные для отрисовки очередной пачки отчётов одним запросом.
+
+    Пачка — первые limit заданий недели в статусе pending; к ним
+    присоединяются профиль и суммы по дням недели (LEFT JOIN на intakes
+    с группировкой), так что из БД приходят только агрегаты. Лимит делится
+    между шардами поровну.
+
+    Args:
+        week (date): Понедельник недели отчёта (UTC).
+        limit (int): Размер пачки, пользователей (не больше limit + число шардов).
+
+    Returns:
+        list[sqlalchemy.engine.Row]: Строки (user_id, daily_goal_ml, language,
+        weekly_digest_enabled, day, total, attempts); у пользователя без записей
+        за неделю — одна строка с day = None.
+    """
+    start = datetime.combine(week, datetime.min.time(), tzinfo=timezone.utc)
+    batch = (
+        select(digest_jobs.c.user_id, digest_jobs.c.attempts)
+        .where(digest_jobs.c.week == week)
+        .where(digest_jobs.c.status == "pending")
+        .order_by(digest_jobs.c.user_id)
+        .limit(-(-limit // len(shard_sessions)))
+        .subquery()
+    )
+    day = func.date(intakes.c.timestamp)
+    query = (
+        select(
+            users.c.user_id, users.c.daily_goal_ml, users.c.language, users.c.weekly_digest_enabled,
+            day.label("day"), func.sum(intakes.c.amount_ml).label("total"), batch.c.attempts,
+        )
+        .select_from(
+            batch.join(users, users.c.user_id == batch.c.user_id).outerjoin(intakes, and_(
+                intakes.c.user_id == users.c.user_id,
+                intakes.c.timestamp >= start,
+                intakes.c.timestamp < start + timedelta(days=7),
+            ))
+        )
+        .group_by(users.c.user_id, day)
+        .order_by(users.c.user_id)
+    )
+    return await _fetch_all_shards(query)
+
+async def get_due_digests(now: datetime, started_at: datetime, limit: int):
+    """
+    Возвращает готовые отчёты, которым пора уйти.
+
+    Args:
+        now (datetime): Текущее время (UTC).
+        started_at (datetime): Начало текущего прохода отправки: задания,
+            обновлённые после него (повтор после ошибки), в этот проход не берутся.
+        limit (int): Размер пачки.
+
+    Returns:
+        list[sqlalchemy.engine.Row]: Строки (week, user_id, caption, chart,
+        attempts, weekly_digest_enabled, send_at) по возрастанию send_at
+        среди всех шардов.
+    """
+    query = (
+        select(
+            digest_jobs.c.week, digest_jobs.c.user_id, digest_jobs.c.caption, digest_jobs.c.chart,
+            digest_jobs.c.attempts, func.coalesce(users.c.weekly_digest_enabled, False).label("weekly_digest_enabled"),
+            digest_jobs.c.send_at,
+        )
+        .select_from(digest_jobs.outerjoin(users, users.c.user_id == digest_jobs.c.user_id))
+        .where(digest_jobs.c.status == "rendered")
+        .where(digest_jobs.c.send_at <= now)
+        .where(digest_jobs.c.updated_at < started_at)
+        .order_by(digest_jobs.c.send_at)
+        .limit(limit)
+    )
+    rows = await _fetch_all_shards(query)
+    if len(shard_sessions) > 1:
+        rows = sorted(rows, key=lambda row: row.send_at)[:limit]
+    return rows
+
+async def update_digest_jobs(updates: list[dict]):
+    """
+    Сохраняет результаты обработки пачки заданий одним executemany на шард.
+
+    Args:
+        updates (list[dict]): Словари с ключами week, user_id, status,
+            caption, chart, attempts.
+    """
+    if not updates:
+        return
+    stmt = (
+        update(digest_jobs)
+        .where(digest_jobs.c.week == bindparam("b_week"))
+        .where(digest_jobs.c.user_id == bindparam("b_user_id"))
+        .values(
+            status=bindparam("b_status"),
+            caption=bindparam("b_caption"),
+            chart=bindparam("b_chart"),
+            attempts=bindparam("b_attempts"),
+            updated_at=bindparam("b_updated_at"),
+        )
+    )
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    by_shard: dict[int, list[dict]] = {}
+    for item in updates:
+        params = {f"b_{key}": value for key, value in item.items()} | {"b_updated_at": now}
+        by_shard.setdefault(shard_for(item["user_id"], len(shard_sessions)), []).append(params)
+
+    async def save(factory, params: list[dict]) -> None:
+        async with factory() as session:
+            await session.execute(stmt, params)
+            await session.commit()
+
+    await asyncio.gather(*(save(shard_sessions[index], params) for index, params in by_shard.items()))
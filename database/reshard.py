@@ -0,0 +1,186 @@
+"""
+Модуль перераспределения данных пользователей между шардами SQLite.
+
+Переносит строки таблиц пользователей (users, intakes, user_streaks,
+digest_jobs) в шард, который назначает им новое число шардов
+(database.engine.shard_for). Тем же способом один файл DB_PATH
+переводится в шардированный режим и обратно (--shards 1). Общие
+таблицы остаются в основном файле.
+
+Пользователи переносятся пачками: в целевом шарде их строки сначала
+удаляются (остатки прерванного запуска), затем вставляются копии,
+и только после фиксации целевой транзакции строки удаляются из исходного
+шарда. Поэтому прерванный перенос можно просто запустить повторно: если
+он прервался между этими шагами, строки пользователя есть в обоих файлах,
+и повторный запуск заменит копию в целевом шарде. В конце проверяется,
+что количество строк каждого пользователя не изменилось (дубли прерванного
+запуска считаются один раз) и каждый пользователь лежит в своём шарде.
+
+Запускайте при остановленном боте, затем задайте DB_SHARDS=N:
+    python -m database.reshard --shards N [--from M] [--batch 500]
+"""
+import argparse
+import asyncio
+import os
+from typing import Dict, List
+
+from sqlalchemy import delete, func, insert, select, union
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .engine import DB_PATH, create_sqlite_engine, init_schema, shard_for, shard_path
+from .models import digest_jobs, intakes, user_streaks, users
+
+USER_TABLES = (users, intakes, user_streaks, digest_jobs)
+"""Таблицы, строки которых принадлежат пользователю и лежат в его шарде."""
+
+BATCH_USERS = 500
+"""Сколько пользователей переносится одной транзакцией."""
+
+
+def detect_shards(base: str = DB_PATH) -> int:
+    """
+    Определяет текущее число шардов по существующим файлам.
+
+    Args:
+        base (str): Путь к основному файлу.
+
+    Returns:
+        int: 1 + количество файлов шардов, идущих подряд с номера 1.
+    """
+    count = 1
+    while os.path.exists(shard_path(count, base)):
+        count += 1
+    return count
+
+
+async def _user_ids(sqlite_engine: AsyncEngine) -> List[int]:
+    """Возвращает всех пользователей, у которых есть строки в шарде."""
+    query = union(*(select(table.c.user_id) for table in USER_TABLES))
+    async with sqlite_engine.connect() as conn:
+        return list((await conn.execute(query)).scalars())
+
+
+async def _row_counts(engines: List[AsyncEngine]) -> Dict[str, int]:
+    """
+    Считает строки таблиц пользователей во всех шардах.
+
+    Строки одного пользователя в нескольких шардах — копии, оставшиеся
+    от прерванного переноса (копирование и удаление из источника — разные
+    транзакции), поэтому для пользователя берётся число строк одной копии.
+
+    Returns:
+        dict[str, int]: Таблица → количество строк.
+    """
+    counts = {}
+    for table in USER_TABLES:
+        per_user: Dict[int, int] = {}
+        query = select(table.c.user_id, func.count()).group_by(table.c.user_id)
+        for sqlite_engine in engines:
+            async with sqlite_engine.connect() as conn:
+                for user_id, count in await conn.execute(query):
+                    per_user[user_id] = max(per_user.get(user_id, 0), count)
+        counts[table.name] = sum(per_user.values())
+    return counts
+
+
+async def _move(source: AsyncEngine, target: AsyncEngine, user_ids: List[int]) -> None:
+    """Переносит строки пачки пользователей из одного шарда в другой."""
+    await _copy(source, target, user_ids)
+    await _delete(source, user_ids)
+
+
+async def _copy(source: AsyncEngine, target: AsyncEngine, user_ids: List[int]) -> None:
+    """Заменяет строки пачки пользователей в целевом шарде копиями из исходного."""
+    rows = {}
+    async with source.connect() as conn:
+        for table in USER_TABLES:
+            result = await conn.execute(select(table).where(table.c.user_id.in_(user_ids)))
+            # id записей intakes назначает целевой шард: в разных файлах они пересекаются
+            rows[table.name] = [
+                {key: value for key, value in row.items() if not (table is intakes and key == "id")}
+                for row in result.mappings()
+            ]
+
+    async with target.begin() as conn:
+        for table in USER_TABLES:
+            await conn.execute(delete(table).where(table.c.user_id.in_(user_ids)))
+            if rows[table.name]:
+                await conn.execute(insert(table), rows[table.name])
+
+
+async def _delete(source: AsyncEngine, user_ids: List[int]) -> None:
+    """Удаляет строки пачки пользователей из исходного шарда."""
+    async with source.begin() as conn:
+        for table in USER_TABLES:
+            await conn.execute(delete(table).where(table.c.user_id.in_(user_ids)))
+
+
+async def reshard(shards: int, old_shards: int, batch: int = BATCH_USERS, base: str = DB_PATH) -> Dict[str, int]:
+    """
+    Перераспределяет данные пользователей с old_shards на shards файлов.
+
+    Args:
+        shards (int): Новое число шардов.
+        old_shards (int): Текущее число шардов.
+        batch (int): Пользователей на транзакцию.
+        base (str): Путь к основному файлу.
+
+    Returns:
+        dict[str, int]: Количество перенесённых пользователей и строк по таблицам.
+
+    Raises:
+        RuntimeError: Если после переноса не сошлись количества строк
+            или пользователь оказался не в своём шарде.
+    """
+    engines = [create_sqlite_engine(shard_path(index, base)) for index in range(max(shards, old_shards))]
+    try:
+        for sqlite_engine in engines:
+            await init_schema(sqlite_engine)
+        before = await _row_counts(engines)
+
+        moved = 0
+        for source_index in range(old_shards):
+            by_target: Dict[int, List[int]] = {}
+            for user_id in await _user_ids(engines[source_index]):
+                target_index = shard_for(user_id, shards)
+                if target_index != source_index:
+                    by_target.setdefault(target_index, []).append(user_id)
+            for target_index, user_ids in sorted(by_target.items()):
+                for start in range(0, len(user_ids), batch):
+                    chunk = user_ids[start:start + batch]
+                    await _move(engines[source_index], engines[target_index], chunk)
+                    moved += len(chunk)
+                    print(f"  шард {source_index} → {target_index}: {start + len(chunk)}/{len(user_ids)}")
+
+        after = await _row_counts(engines)
+        if after != before:
+            raise RuntimeError(f"Количество строк изменилось: было {before}, стало {after}")
+        for index, sqlite_engine in enumerate(engines):
+            misplaced = [user_id for user_id in await _user_ids(sqlite_engine) if shard_for(user_id, shards) != index]
+            if misplaced:
+                raise RuntimeError(f"В шарде {index} остались чужие пользователи: {misplaced[:10]}")
+        return {"users_moved": moved, **after}
+    finally:
+        for sqlite_engine in engines:
+            await sqlite_engine.dispose()
+
+
+async def _main(shards: int, old_shards: int, batch: int) -> None:
+    print(f"🔀 Перераспределение {DB_PATH}: {old_shards} → {shards} шардов")
+    result = await reshard(shards, old_shards, batch)
+    print(f"✅ Перенесено пользователей: {result.pop('users_moved')}; строк: {result}")
+    for index in range(shards, old_shards):
+        print(f"ℹ️ Шард {shard_path(index)} больше не используется (таблицы пользователей пусты)")
+    print(f"Запускайте бота с DB_SHARDS={shards}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Перераспределение данных пользователей между шардами SQLite")
+    parser.add_argument("--shards", type=int, required=True, help="Новое число шардов")
+    parser.add_argument("--from", type=int, dest="old_shards",
+                        help="Текущее число шардов (по умолчанию — по существующим файлам)")
+    parser.add_argument("--batch", type=int, default=BATCH_USERS, help="Пользователей на транзакцию")
+    args = parser.parse_args()
+    if args.shards < 1:
+        parser.error("--shards должно быть не меньше 1")
+    asyncio.run(_main(args.shards, args.old_shards or detect_shards(), args.batch))
@@ -0,0 +1,188 @@
+"""
+Модуль серий выполнения нормы и личных рекордов.
+
+Состояние хранится в таблице user_streaks и обновляется инкрементально:
+каждый приём воды меняет одну строку за O(1) — без чтения истории intakes.
+В строке накапливается сумма за текущий локальный день пользователя;
+когда она впервые за день достигает daily_goal_ml, серия продлевается
+(если норма была выполнена и вчера) или начинается заново.
+
+Смена дня обрабатывается лениво: при первом приёме в новый день сумма
+обнуляется, а серия, прерванная пропущенным днём, сбрасывается. При чтении
+то же правило применяет current_streak(), поэтому фоновая задача
+на полночь каждого часового пояса не нужна.
+
+Пересчёт из intakes (после изменения логики или импорта данных):
+    python -m database.streaks [--user USER_ID ...]
+"""
+import argparse
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from sqlalchemy import delete, func, insert, select
+
+from .engine import shard_for, shard_sessions
+from .models import intakes, user_streaks, users
+
+REBUILD_CHUNK = 1000
+"""Сколько строк user_streaks записывать за один executemany при пересчёте."""
+
+
+def local_day(moment: datetime, tz_offset: int | None) -> date:
+    """
+    Возвращает локальную дату пользователя.
+
+    Args:
+        moment (datetime): Момент времени в UTC.
+        tz_offset (int | None): Смещение часового пояса в минутах от UTC.
+
+    Returns:
+        date: Дата по локальному времени пользователя.
+    """
+    return (moment + timedelta(minutes=tz_offset or 0)).date()
+
+
+def apply_intake(state: Optional[Mapping[str, Any]], day: date, amount_ml: int, goal_ml: int | None) -> Dict[str, Any]:
+    """
+    Применяет приём воды к состоянию серии.
+
+    Args:
+        state (Mapping | None): Текущая строка user_streaks или None.
+        day (date): Локальный день приёма.
+        amount_ml (int): Объём в мл.
+        goal_ml (int | None): Суточная норма (None — серия не ведётся).
+
+    Returns:
+        dict: Новые значения колонок user_streaks (без user_id).
+    """
+    new = {
+        "current_streak": 0, "longest_streak": 0, "last_goal_day": None,
+        "day": None, "day_total_ml": 0, "best_day": None, "best_day_ml": 0,
+    }
+    if state:
+        new.update({key: state[key] for key in new})
+        new["current_streak"] = new["current_streak"] or 0
+        new["longest_streak"] = new["longest_streak"] or 0
+        new["day_total_ml"] = new["day_total_ml"] or 0
+        new["best_day_ml"] = new["best_day_ml"] or 0
+
+    # Смена дня: сумма начинается заново, серия с пропуском обрывается
+    if new["day"] != day:
+        new["day"] = day
+        new["day_total_ml"] = 0
+        new["current_streak"] = current_streak(new, day)
+    new["day_total_ml"] += amount_ml
+
+    if goal_ml and new["day_total_ml"] >= goal_ml and new["last_goal_day"] != day:
+        continues = new["last_goal_day"] == day - timedelta(days=1)
+        new["current_streak"] = new["current_streak"] + 1 if continues else 1
+        new["longest_streak"] = max(new["longest_streak"], new["current_streak"])
+        new["last_goal_day"] = day
+
+    if new["day_total_ml"] > new["best_day_ml"]:
+        new["best_day"] = day
+        new["best_day_ml"] = new["day_total_ml"]
+    return new
+
+
+def current_streak(state: Optional[Mapping[str, Any]], today: date) -> int:
+    """
+    Возвращает действующую серию на локальную дату.
+
+    Серия жива, пока норма выполнена сегодня или вчера; иначе она уже прервана,
+    даже если строка в БД ещё не обновлялась.
+
+    Args:
+        state (Mapping | None): Строка user_streaks или None.
+        today (date): Текущая локальная дата пользователя.
+
+    Returns:
+        int: Количество дней подряд с выполненной нормой.
+    """
+    if not state or not state["last_goal_day"]:
+        return 0
+    if state["last_goal_day"] < today - timedelta(days=1):
+        return 0
+    return state["current_streak"] or 0
+
+
+async def rebuild_streaks(user_ids: Iterable[int] | None = None) -> int:
+    """
+    Пересчитывает user_streaks по истории intakes.
+
+    Суммы по локальным дням считаются одним сгруппированным запросом
+    (смещение часового пояса применяется в SQLite модификатором date()),
+    строки читаются потоком и сворачиваются той же apply_intake, что
+    и при обычной записи. Шарды пересчитываются параллельно.
+
+    Args:
+        user_ids (Iterable[int] | None): Кого пересчитать (по умолчанию — всех).
+
+    Returns:
+        int: Количество записанных строк user_streaks.
+    """
+    if user_ids is None:
+        counts = await asyncio.gather(*(_rebuild_shard(factory, None) for factory in shard_sessions))
+        return sum(counts)
+    by_shard: dict[int, list[int]] = {}
+    for user_id in user_ids:
+        by_shard.setdefault(shard_for(user_id, len(shard_sessions)), []).append(user_id)
+    counts = await asyncio.gather(*(_rebuild_shard(shard_sessions[index], ids) for index, ids in by_shard.items()))
+    return sum(counts)
+
+
+async def _rebuild_shard(session_factory, ids: list[int] | None) -> int:
+    """Пересчитывает user_streaks в одном шарде (ids=None — всех его пользователей)."""
+    day = func.date(
+        intakes.c.timestamp,
+        func.printf("%+d minutes", func.coalesce(users.c.timezone_offset, 0)),
+    ).label("day")
+    query = (
+        select(intakes.c.user_id, users.c.daily_goal_ml, day, func.sum(intakes.c.amount_ml).label("total"))
+        .select_from(intakes.join(users, users.c.user_id == intakes.c.user_id))
+        .group_by(intakes.c.user_id, day)
+        .order_by(intakes.c.user_id, day)
+    )
+    if ids is not None:
+        query = query.where(intakes.c.user_id.in_(ids))
+
+    async with session_factory() as session:
+        rows = []
+        current_user, state = None, None
+        result = await session.stream(query)
+        async for user_id, goal_ml, day_str, total in result:
+            if user_id != current_user:
+                if state is not None:
+                    rows.append({"user_id": current_user, **state})
+                current_user, state = user_id, None
+            state = apply_intake(state, date.fromisoformat(day_str), total or 0, goal_ml)
+        if state is not None:
+            rows.append({"user_id": current_user, **state})
+
+        cleanup = delete(user_streaks)
+        if ids is not None:
+            cleanup = cleanup.where(user_streaks.c.user_id.in_(ids))
+        await session.execute(cleanup)
+        for start in range(0, len(rows), REBUILD_CHUNK):
+            await session.execute(insert(user_streaks), rows[start:start + REBUILD_CHUNK])
+        await session.commit()
+    return len(rows)
+
+
+async def _main(user_ids: list[int] | None) -> None:
+    from .engine import dispose_engines, init_db
+
+    await init_db()
+    try:
+        count = await rebuild_streaks(user_ids)
+        print(f"✅ Серии пересчитаны: {count} пользователей")
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пересчёт серий и рекордов из истории intakes")
+    parser.add_argument("--user", type=int, action="append", dest="user_ids",
+                        help="Пересчитать только этого пользователя (можно несколько раз)")
+    asyncio.run(_main(parser.parse_args().user_ids))
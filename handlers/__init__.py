@@ -3,6 +3,11 @@ from .start import router as start_router
 from .lang import router as lang_router
 from .drink import router as drink_router
 from .analyze import router as analize_router
+from .history import router as history_router
+from .community import router as community_router
+from .csv_import import router as import_router
+from .digest import router as digest_router
 # from .settings import router as settings_router
 from .reminder import router as reminder_router
 from .goal import router as goal_router
+from .admin import router as admin_router
@@ -0,0 +1,60 @@
+from aiogram import Router, F
+from aiogram.types import Message
+
+from services.profiler import UpdateProfiler
+
+router = Router()
+
+PROFILE_USAGE = (
+    "/profile — статус\n"
+    "/profile on [доля] [порог_мс]\n"
+    "/profile off\n"
+    "/profile rate 0.01\n"
+    "/profile slow 500"
+)
+
+
+def is_admin(message: Message, admin_ids: frozenset[int]) -> bool:
+    """Фильтр: команда от администратора из настроек ADMIN_IDS."""
+    return message.from_user is not None and message.from_user.id in admin_ids
+
+
+def _profile_status(profiler: UpdateProfiler) -> str:
+    state = "вкл" if profiler.enabled else "выкл"
+    return (
+        f"🔬 Профилирование: {state}\n"
+        f"Доля обновлений: {profiler.sample_rate:g}\n"
+        f"Порог медленных: {profiler.slow_threshold * 1000:.0f} мс\n"
+        f"Сохранено профилей: {profiler.dumped} ({profiler.directory})"
+    )
+
+
+@router.message(F.text.startswith("/profile"), is_admin)
+async def cmd_profile(message: Message, profiler: UpdateProfiler):
+    """
+    Включает, выключает и настраивает профилирование без перезапуска.
+
+    При workers > 1 действует только на процесс, обрабатывающий администратора.
+    """
+    args = message.text.split()[1:]
+    try:
+        if not args:
+            pass
+        elif args[0] == "off":
+            profiler.configure(sample_rate=0, slow_threshold=0)
+        elif args[0] == "on":
+            rate = float(args[1]) if len(args) > 1 else 0.01
+            slow_ms = float(args[2]) if len(args) > 2 else 1000
+            profiler.configure(sample_rate=rate, slow_threshold=slow_ms / 1000)
+        elif args[0] == "rate" and len(args) == 2:
+            profiler.configure(sample_rate=float(args[1]))
+        elif args[0] == "slow" and len(args) == 2:
+            profiler.configure(slow_threshold=float(args[1]) / 1000)
+        else:
+            await message.answer(PROFILE_USAGE)
+            return
+    except ValueError:
+        await message.answer(PROFILE_USAGE)
+        return
+
+    await message.answer(_profile_status(profiler))
@@ -6,15 +6,15 @@ from datetime import timedelta, datetime, timezone
 
 from utils.chart import generate_weekly_chart
 from utils.i18n import get_text, get_loc_list
-from database.queries import get_today_intakes, get_weekly_totals
+from database.profiles import UserProfile
+from database.streaks import current_streak, local_day
 
 router = Router()
 
 
-@router.message(F.text == "/analyze")
-async def cmd_stats(message: Message, lang: str, user: dict | None):
-    user_id = message.from_user.id
-
+# Профиль, серия и суммы за неделю приходят из I18nMiddleware одним запросом
+@router.message(F.text == "/analyze", flags={"user_query": "analyze"})
+async def cmd_stats(message: Message, lang: str, user: UserProfile | None, streak: dict | None, weekly_totals: dict):
     if not user or not user["daily_goal_ml"]:
         no_profile_msg = get_text("analyze.no_profile", lang)
         await message.answer(no_profile_msg)
@@ -23,8 +23,7 @@ async def cmd_stats(message: Message, lang: str, user: dict | None):
     goal = user["daily_goal_ml"]
 
     # Сегодняшние данные
-    today_intakes = await get_today_intakes(user_id)
-    today_total = sum(r.amount_ml for r in today_intakes)
+    today_total = weekly_totals.get(datetime.now(timezone.utc).date().isoformat(), 0)
     percent = min(100, round(today_total / goal * 100))
 
     # ASCII-прогресс-бар
@@ -33,8 +32,7 @@ async def cmd_stats(message: Message, lang: str, user: dict | None):
     bar = "█" * filled + "░" * (bar_length - filled)
 
     # Еженедельные данные
-    weekly_data = await get_weekly_totals(user_id)
-    week_str = _format_weekly_stats(weekly_data, goal, lang)
+    week_str = _format_weekly_stats(weekly_totals, goal, lang)
 
     stats_text = get_text(
         "analyze.report",
@@ -46,10 +44,22 @@ async def cmd_stats(message: Message, lang: str, user: dict | None):
         week_summary=week_str
     )
 
+    # Серия и рекорд — из user_streaks, без пересчёта истории
+    if streak and streak["best_day"]:
+        today_local = local_day(datetime.now(timezone.utc), user["timezone_offset"])
+        stats_text += "\n\n" + get_text(
+            "analyze.streak",
+            lang,
+            current=current_streak(streak, today_local),
+            longest=streak["longest_streak"] or 0,
+            best_date=streak["best_day"].strftime("%d.%m.%Y"),
+            best_amount=streak["best_day_ml"],
+        )
+
     # await message.answer(stats_text)
 
     # Генерируем график
-    chart_path = generate_weekly_chart(weekly_data, goal, lang)
+    chart_path = generate_weekly_chart(weekly_totals, goal, lang)
     photo = FSInputFile(chart_path)
     await message.answer_photo(photo, caption=stats_text)
 
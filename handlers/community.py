@@ -0,0 +1,97 @@
+from bisect import bisect_left
+from datetime import date, datetime, timedelta, timezone
+
+from aiogram import Router, F
+from aiogram.types import Message
+
+from database.profiles import UserProfile
+from database.queries import get_community_stats, get_leaderboard, get_user_day_total, set_leaderboard_opt_in
+from services.cluster import on_data_changed
+from utils.i18n import get_text
+
+router = Router()
+
+# Точки разбиения за последние рассчитанные сутки: {day: cut_points}.
+# Сводку пересчитывает процесс-лидер, поэтому в режиме нескольких процессов
+# кэш сбрасывается при каждом изменении базы другим процессом.
+_cut_points_cache: dict[date, list[float]] = {}
+on_data_changed(_cut_points_cache.clear)
+
+
+async def get_cut_points(day: date) -> list[float] | None:
+    """Возвращает процентили суточных сумм (кэшируются до смены суток)."""
+    if day not in _cut_points_cache:
+        stats = await get_community_stats(day)
+        if not stats:
+            return None  # сводка ещё не рассчитана — не кэшируем
+        _cut_points_cache.clear()
+        _cut_points_cache[day] = stats["cut_points"]
+    return _cut_points_cache[day]
+
+
+def percent_below(cut_points: list[float], total: int) -> int:
+    """
+    Доля пользователей, выпивших меньше total, по точкам разбиения.
+
+    Бинарный поиск по 101 процентилю: O(log n), без обращения к БД.
+
+    Args:
+        cut_points (list[float]): Процентили 0..100 суточных сумм.
+        total (int): Сумма пользователя, мл.
+
+    Returns:
+        int: Процент от 0 до 99.
+    """
+    return min(max(bisect_left(cut_points, total) - 1, 0), 99)
+
+
+@router.message(F.text == "/rank")
+async def cmd_rank(message: Message, lang: str):
+    yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+    cut_points = await get_cut_points(yesterday)
+    if not cut_points:
+        await message.answer(get_text("community.no_stats", lang))
+        return
+
+    total = await get_user_day_total(message.from_user.id, yesterday)
+    if not total:
+        await message.answer(get_text("community.rank_no_data", lang))
+        return
+
+    await message.answer(get_text("community.rank", lang, total=total, percent=percent_below(cut_points, total)))
+
+
+@router.message(F.text.regexp(r"^/leaderboard(\s+(on|off))?$"))
+async def cmd_leaderboard(message: Message, lang: str, user: UserProfile | None):
+    parts = message.text.split()
+    if len(parts) > 1:
+        if not user:
+            await message.answer(get_text("analyze.no_profile", lang))
+            return
+        enabled = parts[1] == "on"
+        await set_leaderboard_opt_in(message.from_user.id, enabled)
+        await message.answer(get_text("community.opt_in" if enabled else "community.opt_out", lang))
+        return
+
+    yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+    rows = await get_leaderboard(yesterday)
+    if not rows:
+        await message.answer(get_text("community.leaderboard_empty", lang))
+        return
+
+    medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+    you = get_text("community.you", lang)
+    units = get_text("ml", lang)
+    lines = [
+        f"{medals.get(row.rank, f'{row.rank}.')} {row.total_ml} {units}"
+        + (f" — {you}" if row.user_id == message.from_user.id else "")
+        for row in rows
+    ]
+    opted_in = bool(user and user.get("leaderboard_opt_in"))
+    await message.answer(get_text(
+        "community.leaderboard",
+        lang,
+        date=yesterday.strftime("%d.%m.%Y"),
+        table="\n".join(lines),
+        hint=get_text("community.hint_off" if opted_in else "community.hint_on", lang),
+    ))
@@ -0,0 +1,63 @@
+import os
+import tempfile
+
+from aiogram import Router, F, Bot
+from aiogram.types import Message
+
+from database.profiles import UserProfile
+from services.intake_import import MAX_IMPORT_BYTES, ImportFormatError, import_intakes
+from utils.i18n import get_text
+
+router = Router()
+
+
+@router.message(F.text == "/import")
+async def cmd_import_help(message: Message, lang: str):
+    """Показывает подсказку по импорту истории из CSV"""
+    await message.answer(get_text("import.help", lang))
+
+
+@router.message(F.document)
+async def handle_import_file(message: Message, lang: str, user: UserProfile | None, bot: Bot):
+    """Импорт истории из присланного CSV-файла"""
+    document = message.document
+    if not (document.file_name or "").lower().endswith(".csv") and document.mime_type != "text/csv":
+        await message.answer(get_text("import.help", lang))
+        return
+    if not user:
+        await message.answer(get_text("analyze.no_profile", lang))
+        return
+    if document.file_size and document.file_size > MAX_IMPORT_BYTES:
+        await message.answer(get_text("import.too_large", lang, limit=MAX_IMPORT_BYTES // (1024 * 1024)))
+        return
+
+    # Файл скачивается потоком во временный файл и читается построчно —
+    # целиком в памяти он не держится
+    os.makedirs("temp", exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix="import_", suffix=".csv", dir="temp")
+    os.close(fd)
+    try:
+        await bot.download(document, destination=path)
+        with open(path, encoding="utf-8-sig", errors="replace", newline="") as file:
+            report = await import_intakes(message.from_user.id, file, user["timezone_offset"])
+    except ImportFormatError:
+        await message.answer(get_text("import.bad_format", lang))
+        return
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    if report["first"] is None:
+        await message.answer(get_text("import.nothing", lang, invalid=report["invalid"]))
+        return
+    await message.answer(get_text(
+        "import.done",
+        lang,
+        inserted=report["inserted"],
+        duplicates=report["duplicates"],
+        invalid=report["invalid"],
+        first=report["first"].strftime("%d.%m.%Y"),
+        last=report["last"].strftime("%d.%m.%Y"),
+    ))
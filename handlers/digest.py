@@ -0,0 +1,26 @@
+from aiogram import Router, F
+from aiogram.types import Message
+
+from database.profiles import UserProfile
+from database.queries import set_weekly_digest
+from utils.i18n import get_text
+
+router = Router()
+
+
+@router.message(F.text.regexp(r"^/digest(\s+(on|off))?$"))
+async def cmd_digest(message: Message, lang: str, user: UserProfile | None):
+    """Статус и подписка на еженедельный отчёт: /digest, /digest on, /digest off"""
+    if not user:
+        await message.answer(get_text("analyze.no_profile", lang))
+        return
+
+    parts = message.text.split()
+    if len(parts) == 1:
+        enabled = bool(user.get("weekly_digest_enabled"))
+        await message.answer(get_text("digest.status_on" if enabled else "digest.status_off", lang))
+        return
+
+    enabled = parts[1] == "on"
+    await set_weekly_digest(message.from_user.id, enabled)
+    await message.answer(get_text("digest.enabled" if enabled else "digest.disabled", lang))
@@ -1,8 +1,10 @@
 from aiogram import Router, F, Bot
 from aiogram.types import Message, CallbackQuery
 
+from database.profiles import UserProfile
 from database.queries import get_user, add_intake
 from keyboards.inline import get_drink_quick_buttons
+from services.drink_debounce import add_tap
 from services.reminder_manager import schedule_next_reminder
 from utils.i18n import get_text, get_user_language
 
@@ -17,34 +19,38 @@ async def cmd_drink_help(message: Message, user_lang: str):
 
 
 @router.message(F.text.regexp(r"^/drink\s+(\d+)$"))
-async def cmd_drink_with_amount(message: Message, user_lang: str):
+async def cmd_drink_with_amount(message: Message, user_lang: str, user: UserProfile | None, bot: Bot):
     """Обработка команды вида: /drink 250"""
     amount_str = message.text.split(maxsplit=1)[1]
-    await process_water_amount(message, user_lang, amount_str)
+    await process_water_amount(message, user_lang, user, amount_str, bot)
 
 
 @router.message(F.text.regexp(r"^\d+$"))
-async def handle_raw_number(message: Message, user_lang: str):
+async def handle_raw_number(message: Message, user_lang: str, user: UserProfile | None, bot: Bot):
     """Обработка простого числа: "300" → добавить 300 мл"""
-    await process_water_amount(message, user_lang, message.text)
+    await process_water_amount(message, user_lang, user, message.text, bot)
 
 
 @router.callback_query(F.data.startswith("drink_"))
 async def drink_callback(callback: CallbackQuery, user_lang: str):
-    """Обработка inline-кнопок: drink_200, drink_500 и т.д."""
+    """
+    Обработка inline-кнопок: drink_200, drink_500 и т.д.
+
+    Нажатие подтверждается сразу, а запись в БД и редактирование сообщения
+    откладываются на короткое окно: серия нажатий подряд записывается одной
+    транзакцией и обновляет сообщение один раз (см. services/drink_debounce).
+    """
     try:
         amount = int(callback.data.split("_")[1])
-        user_id = callback.from_user.id
-        await add_intake(user_id, amount)
-
-        success_msg = get_text("drink.added", user_lang, amount=amount)
-        await callback.message.edit_text(success_msg)
-        await callback.answer()
     except (ValueError, IndexError):
         await callback.answer("❌ Некорректные данные", show_alert=True)
+        return
+
+    total = add_tap(callback.from_user.id, amount, callback.message, user_lang)
+    await callback.answer(get_text("drink.added", user_lang, amount=total))
 
 
-async def process_water_amount(message: Message, user_lang: str, user: dict | None, amount_str: str, bot: Bot):
+async def process_water_amount(message: Message, user_lang: str, user: UserProfile | None, amount_str: str, bot: Bot):
     """Общая логика обработки объёма воды"""
     try:
         amount = int(amount_str)
@@ -59,7 +65,7 @@ async def process_water_amount(message: Message, user_lang: str, user: dict | No
     await add_intake(message.from_user.id, amount)
 
     if user and user["notifications_enabled"]:
-        schedule_next_reminder(bot, message.from_user.id, minutes=100)
+        schedule_next_reminder(bot, message.from_user.id)
 
     # Получаем цель для расчёта прогресса
     user = await get_user(message.from_user.id)
@@ -80,11 +86,11 @@ async def get_today_total(user_id: int) -> int:
     """Возвращает сумму воды за сегодня в мл"""
     from datetime import datetime, timezone
     from sqlalchemy import select, func
-    from database.engine import AsyncSessionLocal
+    from database.engine import session_for
     from database.models import intakes
 
     today = datetime.now(timezone.utc).date()
-    async with AsyncSessionLocal() as session:
+    async with session_for(user_id)() as session:
         query = (
             select(func.sum(intakes.c.amount_ml))
             .where(intakes.c.user_id == user_id)
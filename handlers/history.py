@@ -0,0 +1,87 @@
+import os
+from datetime import datetime, timezone
+
+from aiogram import Router, F
+from aiogram.types import Message, CallbackQuery, FSInputFile, InlineKeyboardMarkup, InlineKeyboardButton
+
+from database.profiles import UserProfile
+from database.queries import get_daily_totals
+from utils.chart import generate_history_heatmap
+from utils.history import HISTORY_PERIODS, build_history
+from utils.i18n import get_text, get_loc_list
+
+router = Router()
+
+
+@router.message(F.text.regexp(r"^/history(\s+\d+)?$"))
+async def cmd_history(message: Message, lang: str, user: UserProfile | None):
+    if not user or not user["daily_goal_ml"]:
+        await message.answer(get_text("analyze.no_profile", lang))
+        return
+
+    # /history 90 — сразу отчёт, без аргумента — выбор периода
+    parts = (message.text or "").split()
+    if len(parts) > 1 and parts[1].isdigit() and int(parts[1]) in HISTORY_PERIODS:
+        await _send_history(message, message.from_user.id, user["daily_goal_ml"], int(parts[1]), lang)
+        return
+
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[[
+        InlineKeyboardButton(text=get_text("history.period", lang, days=days), callback_data=f"history_{days}")
+        for days in HISTORY_PERIODS
+    ]])
+    await message.answer(get_text("history.choose_period", lang), reply_markup=keyboard)
+
+
+@router.callback_query(F.data.startswith("history_"))
+async def history_callback(callback: CallbackQuery, lang: str, user: UserProfile | None):
+    if not user or not user["daily_goal_ml"]:
+        await callback.answer(get_text("analyze.no_profile", lang), show_alert=True)
+        return
+
+    days = callback.data.removeprefix("history_")
+    if not days.isdigit() or int(days) not in HISTORY_PERIODS:
+        await callback.answer()
+        return
+
+    await callback.answer()
+    await _send_history(callback.message, callback.from_user.id, user["daily_goal_ml"], int(days), lang)
+
+
+async def _send_history(message: Message, user_id: int, goal: int, days: int, lang: str):
+    """Строит и отправляет отчёт за период: тепловая карта и сводка в подписи."""
+    rows = await get_daily_totals(user_id, days)
+    history = build_history(rows, goal, days, datetime.now(timezone.utc).date())
+
+    if not history["tracked_days"]:
+        await message.answer(get_text("history.empty", lang, days=days))
+        return
+
+    weekdays = get_loc_list("weekday", lang)
+    report = get_text(
+        "history.report",
+        lang,
+        days=days,
+        total=history["total"],
+        average=history["average"],
+        rolling=history["rolling_now"],
+        trend=history["trend"],
+        goal=goal,
+        goal_days=history["goal_days"],
+        tracked_days=history["tracked_days"],
+        goal_percent=history["goal_percent"],
+        best_date=history["best_date"].strftime("%d.%m.%Y"),
+        best_amount=history["best_amount"],
+        best_weekday=weekdays[history["best_weekday"]],
+        best_weekday_avg=history["best_weekday_avg"],
+        worst_weekday=weekdays[history["worst_weekday"]],
+        worst_weekday_avg=history["worst_weekday_avg"],
+    )
+
+    chart_path = generate_history_heatmap(history["totals"], history["start"], goal, lang)
+    await message.answer_photo(FSInputFile(chart_path), caption=report)
+
+    # Удаляем временный файл
+    try:
+        os.remove(chart_path)
+    except OSError:
+        pass
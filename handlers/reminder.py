@@ -1,6 +1,7 @@
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 
+from database.profiles import UserProfile
 from database.queries import toggle_notifications
 from services.reminder_manager import cancel_reminder
 from utils.i18n import get_text
@@ -9,7 +10,7 @@ router = Router()
 
 
 @router.message(F.text == "/reminder")
-async def cmd_reminders(message: Message, user_lang: str, user: dict | None):
+async def cmd_reminders(message: Message, user_lang: str, user: UserProfile | None):
     if not user:
         no_profile = get_text("reminders.no_profile", user_lang)
         await message.answer(no_profile)
@@ -31,7 +32,7 @@ async def cmd_reminders(message: Message, user_lang: str, user: dict | None):
 
 
 @router.callback_query(F.data == "toggle_reminders")
-async def toggle_reminders_callback(callback: CallbackQuery, user_lang: str, user: dict | None):
+async def toggle_reminders_callback(callback: CallbackQuery, user_lang: str, user: UserProfile | None):
     user_id = callback.from_user.id
 
     if not user:
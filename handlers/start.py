@@ -3,6 +3,7 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
+from database.profiles import UserProfile
 from database.queries import create_or_update_user
 from keyboards.inline import get_gender_keyboard, get_activity_keyboard, get_main_menu_keyboard
 from keyboards.reply import get_main_reply_keyboard
@@ -19,11 +20,11 @@ class ProfileSetup(StatesGroup):
 
 
 @router.message(F.text == "/start")
-async def cmd_start(message: Message, lang: str, user: dict | None, state: FSMContext):
+async def cmd_start(message: Message, lang: str, user: UserProfile | None, state: FSMContext):
     """
     Aiogram автоматически внедряет:
       - lang: str → из мидлвари
-      - user: dict | None → из мидлвари
+      - user: UserProfile | None → из мидлвари
     """
     if user and user["daily_goal_ml"]:
         # Пользователь уже настроил профиль
@@ -46,7 +47,7 @@ async def cmd_start(message: Message, lang: str, user: dict | None, state: FSMCo
 
 
 @router.callback_query(ProfileSetup.gender, F.data.in_({"male", "female"}))
-async def process_gender(callback: CallbackQuery, lang: str, user: dict | None, state: FSMContext):
+async def process_gender(callback: CallbackQuery, lang: str, user: UserProfile | None, state: FSMContext):
     gender = 0 if callback.data == "male" else 1
     await state.update_data(gender=gender)
     await callback.message.edit_text(get_text("start.ask_weight", lang))
@@ -55,7 +56,7 @@ async def process_gender(callback: CallbackQuery, lang: str, user: dict | None,
 
 
 @router.message(ProfileSetup.weight, F.text.regexp(r"^\d{2,3}$"))
-async def process_weight(message: Message, lang: str, user: dict | None, state: FSMContext):
+async def process_weight(message: Message, lang: str, user: UserProfile | None, state: FSMContext):
     weight = int(message.text)
     if not (30 <= weight <= 200):
         await message.answer("Пожалуйста, введите реалистичный вес (от 30 до 200 кг):")
@@ -69,12 +70,12 @@ async def process_weight(message: Message, lang: str, user: dict | None, state:
 
 
 @router.message(ProfileSetup.weight)
-async def invalid_weight(message: Message, lang: str, user: dict | None):
+async def invalid_weight(message: Message, lang: str, user: UserProfile | None):
     await message.answer("Пожалуйста, введите только число (например: 68):")
 
 
 @router.callback_query(ProfileSetup.activity, F.data.in_({"low", "medium", "high"}))
-async def process_activity(callback: CallbackQuery, lang: str, user: dict | None, state: FSMContext):
+async def process_activity(callback: CallbackQuery, lang: str, user: UserProfile | None, state: FSMContext):
     activity_map = {"low": 0, "medium": 1, "high": 2}
     activity = activity_map[callback.data]
 
@@ -75,7 +75,7 @@ def get_main_menu_keyboard(user_lang: str = "ru") -> InlineKeyboardMarkup:
     ])
 
 
-def get_drink_quick_buttons() -> InlineKeyboardMarkup:
+def get_drink_quick_buttons(user_lang: str = "ru") -> InlineKeyboardMarkup:
     """
     Создаёт клавиатуру быстрого добавления воды (100, 200, 300, 500 мл).
 
@@ -7,29 +7,52 @@
 - планировщик напоминаний,
 - логирование.
 
-Запускает бота в режиме polling.
+Запускает бота в режиме polling или webhook — в одном процессе
+или кластером из нескольких процессов-обработчиков.
 """
 
 import asyncio
 import logging
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.filters import ExceptionTypeFilter
 
+from middlewares.fast_route import FastRouteMiddleware
 from middlewares.i18n import I18nMiddleware
+from middlewares.metrics import MetricsMiddleware
+from middlewares.profiling import ProfilingMiddleware
+from middlewares.throttling import THROTTLE_RULES, ThrottlingMiddleware
 from config import Settings
-from database.engine import init_db, AsyncSessionLocal
+from database.engine import init_db, shard_engines, AsyncSessionLocal
+from database.fsm_storage import SQLStorage
 from handlers import (
     start_router,
     lang_router,
     drink_router,
     analize_router,
+    history_router,
+    community_router,
+    import_router,
+    digest_router,
     # settings_router,
     reminder_router,
     goal_router,
+    admin_router,
 )
+from services.cluster import run_cluster
+from services.drink_debounce import flush_all as flush_drink_taps, set_debounce_window
+from services.http_session import PooledAiohttpSession
+from services.lanes import LaneOverflowError, UserLaneIsolation, on_lane_overflow
+from services.loop_monitor import LoopMonitor
+from services.metrics import instrument_engine, register_runtime_metrics, start_metrics_server
+from services.outbox import OutboundQueue
+from services.profiler import UpdateProfiler
+from services.reminder_manager import set_reminder_interval
 from services.scheduler import setup_scheduler
+from services.webhook import run_webhook
 from utils.i18n import load_locales
 
 # Настройка логирования
@@ -40,6 +63,110 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def create_bot(settings: Settings) -> Bot:
+    """
+    Создаёт экземпляр бота с настройками по умолчанию.
+
+    Все отправители используют этот экземпляр, а значит — общий пул
+    соединений PooledAiohttpSession.
+
+    Args:
+        settings (Settings): Конфигурация приложения.
+
+    Returns:
+        Bot: Бот с HTML-разметкой по умолчанию.
+    """
+    session = PooledAiohttpSession(
+        limit=settings.http_pool_limit,
+        limit_per_host=settings.http_pool_limit_per_host,
+        keepalive_timeout=settings.http_keepalive_timeout,
+        dns_ttl=settings.http_dns_ttl,
+        connect_timeout=settings.http_connect_timeout,
+        timeout=settings.http_timeout,
+        api_url=settings.bot_api_url,
+    )
+    return Bot(token=settings.bot_token, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+
+
+def create_dispatcher(settings: Settings, throttle_rules: Optional[Dict[str, Tuple[float, int]]] = None) -> Dispatcher:
+    """
+    Создаёт диспетчер с подключёнными middleware и маршрутами.
+
+    Роутеры — глобальные объекты модулей handlers, поэтому в одном процессе
+    диспетчер можно создать только один раз.
+
+    Args:
+        settings (Settings): Конфигурация приложения.
+        throttle_rules (dict | None): Лимиты ThrottlingMiddleware вместо
+            middlewares.throttling.THROTTLE_RULES (например, для бенчмарков).
+
+    Returns:
+        Dispatcher: Полностью настроенный диспетчер.
+    """
+    # FSM-состояния переживают перезапуск и удаляются, если сценарий брошен
+    storage = SQLStorage(
+        cache_size=settings.fsm_cache_size,
+        ttl=timedelta(hours=settings.fsm_ttl_hours),
+        flush_interval=settings.fsm_flush_interval,
+    )
+    # Обновления одного пользователя — по очереди, разных — параллельно
+    lanes = UserLaneIsolation(
+        max_concurrency=settings.lanes_max_concurrency,
+        max_queue=settings.lanes_max_queue,
+    )
+    dp = Dispatcher(storage=storage, events_isolation=lanes)
+    dp.errors.register(on_lane_overflow, ExceptionTypeFilter(LaneOverflowError))
+    # Отложенные нажатия кнопок воды записываются до закрытия сессии бота
+    dp.shutdown.register(flush_drink_taps)
+
+    # Выборочное профилирование; параметры меняются командой /profile
+    profiler = UpdateProfiler(
+        directory=settings.profile_dir,
+        sample_rate=settings.profile_sample_rate,
+        slow_threshold=settings.profile_slow_ms / 1000,
+        max_files=settings.profile_max_files,
+        hash_secret=settings.profile_hash_key or settings.bot_token,
+    )
+    dp["profiler"] = profiler
+    dp["admin_ids"] = frozenset(settings.admin_ids)
+
+    # Учёт времени хэндлеров — первым, чтобы измерять и остальные middleware
+    dp.message.middleware(MetricsMiddleware())
+    dp.callback_query.middleware(MetricsMiddleware())
+    dp.message.middleware(ProfilingMiddleware(profiler))
+    dp.callback_query.middleware(ProfilingMiddleware(profiler))
+
+    # Ограничение частоты — до локализации, чтобы спам не доходил до БД
+    throttling = ThrottlingMiddleware(throttle_rules or THROTTLE_RULES)
+    dp.message.middleware(throttling)
+    dp.callback_query.middleware(throttling)
+
+    # Применяем мидлварь ко всем сообщениям и колбэкам
+    dp.message.middleware(I18nMiddleware())
+    dp.callback_query.middleware(I18nMiddleware())
+
+    # Подключение маршрутов (роутеров)
+    dp.include_router(start_router)
+    dp.include_router(lang_router)
+    dp.include_router(drink_router)
+    dp.include_router(analize_router)
+    dp.include_router(history_router)
+    dp.include_router(community_router)
+    dp.include_router(import_router)
+    dp.include_router(digest_router)
+    # dp.include_router(settings_router)
+    dp.include_router(reminder_router)
+    dp.include_router(goal_router)
+    dp.include_router(admin_router)
+
+    # Быстрый выбор хэндлера по команде / префиксу callback; полная цепочка
+    # фильтров остаётся запасным путём. Должна быть последней outer middleware.
+    fast_route = FastRouteMiddleware(dp)
+    dp.message.outer_middleware(fast_route)
+    dp.callback_query.outer_middleware(fast_route)
+    return dp
+
+
 async def main():
     """
     Основная асинхронная функция запуска бота.
@@ -50,7 +177,11 @@ async def main():
         3. Настраивает бота и диспетчер.
         4. Подключает middleware для локализации.
         5. Регистрирует все маршруты (хэндлеры).
-        6. Запускает polling-режим для получения обновлений от Telegram.
+        6. Запускает получение обновлений от Telegram: polling или webhook
+           (settings.mode).
+
+    При workers > 1 вместо шагов 3–6 запускается кластер из нескольких
+    процессов-обработчиков (см. services/cluster.py).
 
     Исключения:
         KeyboardInterrupt, SystemExit: корректно завершает работу при остановке.
@@ -63,30 +194,54 @@ async def main():
     # Инициализация БД
     await init_db()
     logger.info("✅ База данных инициализирована")
+    for shard_engine in shard_engines:
+        instrument_engine(shard_engine.sync_engine)
+
+    if settings.workers > 1:
+        await run_cluster(settings)
+        return
 
     # Инициализация бота и диспетчера
-    bot = Bot(token=settings.bot_token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-    dp = Dispatcher(storage=MemoryStorage())
+    bot = create_bot(settings)
+    dp = create_dispatcher(settings)
 
-    # Применяем мидлварь ко всем сообщениям и колбэкам
-    dp.message.middleware(I18nMiddleware())
-    dp.callback_query.middleware(I18nMiddleware())
+    # Все исходящие сообщения идут через общую приоритетную очередь
+    outbox = OutboundQueue(workers=settings.outbox_workers, rate_limit=settings.outbox_rate_limit)
+    bot.session.middleware(outbox)
+    outbox.start()
 
-    # Подключение маршрутов (роутеров)
-    dp.include_router(start_router)
-    dp.include_router(lang_router)
-    dp.include_router(drink_router)
-    dp.include_router(analize_router)
-    # dp.include_router(settings_router)
-    dp.include_router(reminder_router)
-    dp.include_router(goal_router)
+    # Задержка цикла событий и (опционально) поиск блокирующего кода
+    loop_monitor = LoopMonitor(settings.loop_lag_interval, settings.slow_callback_threshold)
+    loop_monitor.start()
+
+    # Метрики Prometheus на локальном порту
+    metrics_runner = None
+    if settings.metrics_port:
+        register_runtime_metrics(outbox=outbox, lanes=dp.fsm.events_isolation, storage=dp.storage,
+                                 loop_monitor=loop_monitor, http_session=bot.session)
+        metrics_runner = await start_metrics_server(settings.metrics_host, settings.metrics_port)
 
     # Настройка планировщика напоминаний
-    await setup_scheduler(bot)
+    set_reminder_interval(settings.reminder_interval_minutes)
+    set_debounce_window(settings.drink_debounce_seconds)
+    await setup_scheduler(
+        bot,
+        interval_minutes=settings.reminder_interval_minutes,
+        digest_processes=settings.digest_processes,
+        digest_send_hour=settings.digest_send_hour,
+    )
 
-    # Запуск polling
     logger.info("🚀 Запуск бота...")
-    await dp.start_polling(bot, session_factory=AsyncSessionLocal)
+    try:
+        if settings.mode == "webhook":
+            await run_webhook(dp, bot, settings, session_factory=AsyncSessionLocal)
+        else:
+            await dp.start_polling(bot, session_factory=AsyncSessionLocal)
+    finally:
+        await loop_monitor.stop()
+        await outbox.stop()
+        if metrics_runner:
+            await metrics_runner.cleanup()
 
 
 if __name__ == "__main__":
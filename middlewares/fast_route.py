@@ -0,0 +1,316 @@
+"""
+Мидлварь быстрой маршрутизации команд и нажатий кнопок.
+
+Обычно aiogram проверяет фильтры всех хэндлеров всех роутеров по порядку,
+пока один не подойдёт: для «300» это два десятка F.text == ..., regexp
+и startswith. FastRouteMiddleware при первом событии строит таблицу
+«ключ → кандидаты»: ключ сообщения — первое слово текста (команда),
+ключ callback — часть data до первого «_». Для события берутся только
+хэндлеры, которые могут подойти под его ключ, и проверяются их собственные
+фильтры — в том же порядке, что и в полной цепочке.
+
+Таблица строится по фильтрам хэндлеров (F.attr == ..., F.attr.in_(...),
+F.attr.startswith(...), F.attr.regexp("^литерал...")) и консервативна:
+хэндлер, про который нельзя доказать, что он не подойдёт под ключ,
+попадает в кандидаты, поэтому если ни один кандидат не подошёл, событие
+не обработал бы и полный путь. Полная цепочка фильтров остаётся запасным
+путём для событий с FSM-состоянием (сценарии) и без текста/data.
+
+Мидлварь регистрируется как outer middleware диспетчера последней:
+внешние мидлвари, зарегистрированные после неё, быстрый путь обошёл бы.
+"""
+import logging
+import operator
+import re
+from inspect import isclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.dispatcher.event.bases import UNHANDLED, SkipHandler
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.dispatcher.event.telegram import TelegramEventObserver
+from aiogram.dispatcher.router import Router
+from aiogram.filters import StateFilter
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import CallbackQuery, Message
+from magic_filter import MagicFilter
+from magic_filter.operations import CallOperation, ComparatorOperation, FunctionOperation, GetAttributeOperation
+from magic_filter.util import in_op
+
+from services.metrics import FAST_ROUTE_EVENTS
+
+logger = logging.getLogger(__name__)
+
+OTHER = None
+"""Ключ корзины для событий, чей ключ не встречается в таблице."""
+
+Candidate = Tuple[HandlerObject, TelegramEventObserver, Router, Tuple[TelegramEventObserver, ...]]
+"""Хэндлер, его observer, роутер и observer'ы цепочки роутеров от диспетчера."""
+
+
+def _text_key(text: str) -> str:
+    """Ключ сообщения: текст до первого пробельного символа."""
+    if not text or text[0].isspace():
+        return ""
+    return text.split(maxsplit=1)[0]
+
+
+def _data_key(data: str) -> str:
+    """Ключ callback: data до первого «_»."""
+    return data.partition("_")[0]
+
+
+_SCHEMES: Dict[str, Tuple[str, Callable[[str], str]]] = {
+    "message": ("text", _text_key),
+    "callback_query": ("data", _data_key),
+}
+"""Тип события → (атрибут, по которому маршрутизируем, функция ключа)."""
+
+
+def regexp_literal_prefix(pattern: re.Pattern) -> str:
+    """
+    Литеральное начало, с которого обязана начинаться строка под регулярным выражением.
+
+    Консервативный разбор: учитываются только символы без специального
+    значения подряд от начала шаблона. Альтернатива «|» вне групп,
+    IGNORECASE/VERBOSE или квантификатор после символа сокращают префикс.
+
+    Args:
+        pattern (re.Pattern): Скомпилированный шаблон (используется с match/fullmatch).
+
+    Returns:
+        str: Префикс (пустая строка — ничего доказать нельзя).
+    """
+    if pattern.flags & (re.IGNORECASE | re.VERBOSE):
+        return ""
+    source = pattern.pattern
+    if not isinstance(source, str):
+        return ""
+
+    depth, escaped, in_class = 0, False, False
+    for char in source:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return ""
+
+    prefix = []
+    index = 1 if source.startswith("^") else 0
+    while index < len(source):
+        char = source[index]
+        if char in "*?{":
+            if prefix:
+                prefix.pop()  # предыдущий символ может отсутствовать
+            break
+        if char in "\\.^$+[]()|":
+            break
+        prefix.append(char)
+        index += 1
+    return "".join(prefix)
+
+
+def describe_filter(magic: MagicFilter, attr: str) -> Optional[Tuple[str, Any]]:
+    """
+    Распознаёт фильтр по атрибуту события.
+
+    Args:
+        magic (MagicFilter): Фильтр вида F.<attr>....
+        attr (str): Имя атрибута ("text" или "data").
+
+    Returns:
+        tuple | None: ("exact", множество значений), ("prefix", префикс)
+        или None, если фильтр не ограничивает значение атрибута доказуемо.
+    """
+    operations = magic._operations
+    if len(operations) < 2 or not isinstance(operations[0], GetAttributeOperation) \
+            or operations[0].name != attr:
+        return None
+    rest = operations[1:]
+
+    if len(rest) == 1 and isinstance(rest[0], ComparatorOperation) \
+            and rest[0].comparator is operator.eq and isinstance(rest[0].right, str):
+        return "exact", {rest[0].right}
+
+    if len(rest) == 1 and isinstance(rest[0], FunctionOperation):
+        function = rest[0].function
+        if function is in_op and len(rest[0].args) == 1 and not rest[0].kwargs:
+            values = rest[0].args[0]
+            if isinstance(values, (set, frozenset, list, tuple)) and all(isinstance(v, str) for v in values):
+                return "exact", set(values)
+        pattern = getattr(function, "__self__", None)
+        if isinstance(pattern, re.Pattern) and function.__name__ in ("match", "fullmatch"):
+            prefix = regexp_literal_prefix(pattern)
+            return ("prefix", prefix) if prefix else None
+
+    if len(rest) == 2 and isinstance(rest[0], GetAttributeOperation) and rest[0].name == "startswith" \
+            and isinstance(rest[1], CallOperation) and len(rest[1].args) == 1 and not rest[1].kwargs \
+            and isinstance(rest[1].args[0], str) and rest[1].args[0]:
+        return "prefix", rest[1].args[0]
+    return None
+
+
+async def _allows_default_state(callback: Any) -> bool:
+    """Пропускает ли фильтр событие без FSM-состояния (для фильтров не по состоянию — True)."""
+    if isinstance(callback, (State, StatesGroup)):
+        return callback(event=None, raw_state=None)
+    if isclass(callback) and issubclass(callback, StatesGroup):
+        return callback()(event=None, raw_state=None)
+    if isinstance(callback, StateFilter):
+        return bool(await callback(None, raw_state=None))
+    return True
+
+
+class FastRouteMiddleware(BaseMiddleware):
+    """
+    Outer middleware с таблицей маршрутизации «ключ → кандидаты».
+
+    Args:
+        dispatcher (Dispatcher): Диспетчер, роутеры которого индексируются.
+    """
+
+    def __init__(self, dispatcher: Dispatcher):
+        self.dispatcher = dispatcher
+        self._tables: Dict[str, Optional[Dict[Any, List[Candidate]]]] = {}
+
+    async def __call__(
+            self,
+            handler: Callable[[Message | CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+            event: Message | CallbackQuery,
+            data: Dict[str, Any]
+    ) -> Any:
+        event_type = "message" if isinstance(event, Message) else "callback_query"
+        candidates = await self.candidates(event_type, event, data)
+        if candidates is None:
+            FAST_ROUTE_EVENTS.inc(event_type, "fallback")
+            return await handler(event, data)
+
+        async for (handler_object, observer, _, _), kwargs in self.matches(candidates, event, data):
+            try:
+                wrapped = observer.outer_middleware.wrap_middlewares(
+                    observer._resolve_middlewares(), handler_object.call
+                )
+                response = await wrapped(event, kwargs)
+            except SkipHandler:
+                continue
+            FAST_ROUTE_EVENTS.inc(event_type, "hit")
+            return response
+
+        # Кандидаты — надмножество подходящих хэндлеров: раз ни один не подошёл,
+        # полная цепочка тоже ничего не найдёт
+        FAST_ROUTE_EVENTS.inc(event_type, "unhandled")
+        return UNHANDLED
+
+    async def candidates(self, event_type: str, event: Message | CallbackQuery,
+                         data: Dict[str, Any]) -> Optional[List[Candidate]]:
+        """
+        Возвращает кандидатов для события или None, если нужен полный путь.
+
+        Args:
+            event_type (str): "message" или "callback_query".
+            event: Входящее событие.
+            data (dict): Данные контекста (raw_state — текущее FSM-состояние).
+
+        Returns:
+            list | None: Хэндлеры в порядке полной цепочки.
+        """
+        if data.get("raw_state") is not None:
+            return None
+        if event_type not in self._tables:
+            self._tables[event_type] = await self._build(event_type)
+        table = self._tables[event_type]
+        attr, key_fn = _SCHEMES[event_type]
+        value = getattr(event, attr, None)
+        if table is None or not isinstance(value, str):
+            return None
+        return table.get(key_fn(value), table[OTHER])
+
+    @staticmethod
+    async def matches(candidates: List[Candidate], event: Message | CallbackQuery,
+                      data: Dict[str, Any]) -> AsyncIterator[Tuple[Candidate, Dict[str, Any]]]:
+        """
+        Перебирает кандидатов, чьи фильтры пропускают событие (как observer.trigger).
+
+        Args:
+            candidates (list): Кандидаты из таблицы.
+            event: Входящее событие.
+            data (dict): Данные контекста.
+
+        Yields:
+            tuple: (кандидат, данные для вызова хэндлера с результатами фильтров).
+        """
+        for candidate in candidates:
+            handler_object, _, router, chain = candidate
+            kwargs = {**data, "handler": handler_object, "event_router": router}
+            for chain_observer in chain:
+                passed, kwargs = await chain_observer.check_root_filters(event, **kwargs)
+                if not passed:
+                    break
+            else:
+                passed, kwargs = await handler_object.check(event, **kwargs)
+            if passed:
+                yield candidate, kwargs
+
+    async def _build(self, event_type: str) -> Optional[Dict[Any, List[Candidate]]]:
+        """Строит таблицу маршрутизации для типа события (None — быстрый путь невозможен)."""
+        attr, key_fn = _SCHEMES[event_type]
+        root_observer = self.dispatcher.observers[event_type]
+        if root_observer.outer_middleware[-1] is not self:
+            logger.warning("⚠️ Быстрая маршрутизация %s выключена: после неё есть outer middleware", event_type)
+            return None
+
+        entries: List[Tuple[Candidate, Optional[Tuple[str, Any]]]] = []
+        for router in self.dispatcher.chain_tail:
+            observer = router.observers[event_type]
+            if router is not self.dispatcher and len(observer.outer_middleware):
+                logger.warning("⚠️ Быстрая маршрутизация %s выключена: outer middleware в %s", event_type, router)
+                return None
+            chain = tuple(reversed([r.observers[event_type] for r in router.chain_head]))
+            for handler_object in observer.handlers:
+                callbacks = [f.magic or f.callback for f in handler_object.filters or ()]
+                if not all([await _allows_default_state(callback) for callback in callbacks]):
+                    continue  # хэндлер сценария: без FSM-состояния не сработает
+                constraint = next(
+                    (found for found in (describe_filter(c, attr) for c in callbacks if isinstance(c, MagicFilter))
+                     if found is not None),
+                    None,
+                )
+                entries.append(((handler_object, observer, router, chain), constraint))
+
+        keys = set()
+        for _, constraint in entries:
+            if constraint is None:
+                continue
+            kind, value = constraint
+            if kind == "exact":
+                keys.update(key_fn(item) for item in value)
+            else:
+                keys.add(key_fn(value))
+
+        table: Dict[Any, List[Candidate]] = {key: [] for key in keys}
+        table[OTHER] = []
+        for candidate, constraint in entries:
+            if constraint is None:
+                targets = list(table)
+            elif constraint[0] == "exact":
+                targets = {key_fn(item) for item in constraint[1]}
+            elif key_fn(constraint[1]) != constraint[1]:
+                # В префиксе есть разделитель — ключ любой подходящей строки известен
+                targets = [key_fn(constraint[1])]
+            else:
+                prefix = constraint[1]
+                targets = [key for key in keys if key.startswith(prefix)] + [OTHER]
+            for key in targets:
+                table[key].append(candidate)
+
+        logger.info("🧭 Таблица маршрутизации %s: %s ключей, %s хэндлеров", event_type, len(keys), len(entries))
+        return table
@@ -7,9 +7,10 @@
 """
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
 from aiogram.types import Message, CallbackQuery
 
-from database.queries import get_user
+from database.queries import get_analyze_snapshot, get_user
 from utils.i18n import get_user_language
 
 
@@ -19,7 +20,10 @@ class I18nMiddleware(BaseMiddleware):
 
     Добавляет в data следующие ключи:
         - 'lang' (str): код выбранного языка (например, 'ru', 'en')
-        - 'user' (dict | None): данные пользователя из БД или None
+        - 'user' (UserProfile | None): профиль пользователя из БД или None
+        - 'streak' (dict | None), 'weekly_totals' (dict): только для хэндлеров
+          с флагом user_query="analyze" — профиль и статистика читаются
+          одним запросом (get_analyze_snapshot) вместо get_user
 
     Приоритет выбора языка:
         1. Язык, сохранённый пользователем в профиле (поле 'language' в БД)
@@ -49,7 +53,10 @@ class I18nMiddleware(BaseMiddleware):
         """
         user_id = event.from_user.id
         telegram_lang = event.from_user.language_code or "ru"
-        user = await get_user(user_id)
+        if get_flag(data, "user_query") == "analyze":
+            user, data["streak"], data["weekly_totals"] = await get_analyze_snapshot(user_id)
+        else:
+            user = await get_user(user_id)
 
         # Определяем финальный язык
         lang = await get_user_language(user, user_id, telegram_lang)
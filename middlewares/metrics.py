@@ -0,0 +1,39 @@
+"""
+Мидлварь учёта времени работы хэндлеров.
+
+Измеряет длительность обработки каждого события (включая последующие
+middleware) и считает исключения, с меткой по имени функции-хэндлера.
+"""
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message
+
+from services.metrics import HANDLER_ERRORS, HANDLER_SECONDS
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Middleware для гистограммы длительности хэндлеров.
+
+    Регистрируется первой среди внутренних middleware, чтобы в измерение
+    попадали и ограничение частоты, и загрузка профиля пользователя.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[Message | CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+            event: Message | CallbackQuery,
+            data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = handler_object.callback.__name__ if handler_object else "unknown"
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(name)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - start, name)
@@ -0,0 +1,43 @@
+"""
+Мидлварь выборочного профилирования хэндлеров.
+
+Пока профилирование выключено, только передаёт событие дальше.
+Когда включено — регистрирует обновление в UpdateProfiler, который
+сохраняет профиль для доли обновлений и для всех медленных.
+"""
+import sys
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message
+
+from services.profiler import UpdateProfiler
+
+
+class ProfilingMiddleware(BaseMiddleware):
+    """
+    Middleware профилирования обработки событий.
+
+    Args:
+        profiler (UpdateProfiler): Общий профилировщик (настраивается на лету).
+    """
+
+    def __init__(self, profiler: UpdateProfiler):
+        self.profiler = profiler
+
+    async def __call__(
+            self,
+            handler: Callable[[Message | CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+            event: Message | CallbackQuery,
+            data: Dict[str, Any]
+    ) -> Any:
+        if not self.profiler.enabled:
+            return await handler(event, data)
+
+        handler_object = data.get("handler")
+        name = handler_object.callback.__name__ if handler_object else "unknown"
+        record = self.profiler.begin(sys._getframe())
+        try:
+            return await handler(event, data)
+        finally:
+            self.profiler.end(record, name, event.from_user.id)
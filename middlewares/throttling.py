@@ -0,0 +1,135 @@
+"""
+Мидлварь ограничения частоты запросов пользователя.
+
+Защищает базу данных и генерацию графиков от спама: на каждого пользователя
+и класс команды заводится token bucket. Запросы сверх лимита получают
+заранее подготовленный ответ и не доходят ни до БД, ни до хэндлера.
+"""
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message
+
+from utils.i18n import SUPPORTED_LANGUAGES, get_text
+
+THROTTLE_RULES: Dict[str, Tuple[float, int]] = {
+    "heavy": (0.1, 2),    # /analyze, /history, импорт CSV — не чаще раза в 10 секунд, запас 2
+    "write": (1.0, 5),    # запись воды: 1 в секунду, серия до 5 нажатий
+    "default": (2.0, 10),
+}
+"""Лимиты по классам команд: (пополнение токенов в секунду, ёмкость корзины)."""
+
+SWEEP_INTERVAL = 60.0
+"""Как часто удалять корзины неактивных пользователей, секунды."""
+
+
+def classify_event(event: Message | CallbackQuery) -> str:
+    """
+    Определяет класс команды для выбора лимита.
+
+    Args:
+        event: Входящее сообщение или callback.
+
+    Returns:
+        str: 'heavy', 'write' или 'default'.
+    """
+    if isinstance(event, CallbackQuery):
+        data = event.data or ""
+        if data.startswith("history_"):
+            return "heavy"
+        return "write" if data.startswith("drink_") else "default"
+    if event.document:
+        return "heavy"
+    text = event.text or ""
+    if text.startswith(("/analyze", "/history")):
+        return "heavy"
+    if text.isdigit() or text.startswith("/drink "):
+        return "write"
+    return "default"
+
+
+class _Bucket:
+    """Token bucket одного пользователя для одного класса команд."""
+
+    __slots__ = ("tokens", "updated_at", "warned")
+
+    def __init__(self, capacity: int, now: float):
+        self.tokens = float(capacity)
+        self.updated_at = now
+        self.warned = False
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Middleware ограничения частоты запросов по token bucket.
+
+    Должна регистрироваться раньше I18nMiddleware: отклонённый запрос
+    не должен читать профиль из БД, поэтому язык ответа берётся из Telegram.
+
+    Память — O(число активных пользователей): корзина, которая успела
+    полностью наполниться, ничем не отличается от новой и удаляется.
+
+    Args:
+        rules (dict): Лимиты по классам команд (см. THROTTLE_RULES).
+    """
+
+    def __init__(self, rules: Dict[str, Tuple[float, int]] = THROTTLE_RULES):
+        self.rules = rules
+        self._buckets: Dict[Tuple[int, str], _Bucket] = {}
+        self._replies: Dict[str, str] = {}
+        self._last_sweep = time.monotonic()
+        self.throttled = 0
+
+    async def __call__(
+            self,
+            handler: Callable[[Message | CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+            event: Message | CallbackQuery,
+            data: Dict[str, Any]
+    ) -> Any:
+        now = time.monotonic()
+        if now - self._last_sweep > SWEEP_INTERVAL:
+            self._sweep(now)
+
+        event_class = classify_event(event)
+        rate, capacity = self.rules[event_class]
+        key = (event.from_user.id, event_class)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(capacity, now)
+        else:
+            bucket.tokens = min(capacity, bucket.tokens + (now - bucket.updated_at) * rate)
+            bucket.updated_at = now
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            bucket.warned = False
+            return await handler(event, data)
+
+        self.throttled += 1
+        reply = self._get_reply(event.from_user.language_code)
+        if isinstance(event, CallbackQuery):
+            # На callback нужно ответить в любом случае, иначе кнопка «зависнет»
+            await event.answer(reply)
+        elif not bucket.warned:
+            # Предупреждаем один раз за серию, чтобы не спамить в ответ
+            bucket.warned = True
+            await event.answer(reply)
+        return None
+
+    def _get_reply(self, telegram_lang: str | None) -> str:
+        lang = telegram_lang if telegram_lang in SUPPORTED_LANGUAGES else "ru"
+        reply = self._replies.get(lang)
+        if reply is None:
+            reply = self._replies[lang] = get_text("throttle.too_many", lang)
+        return reply
+
+    def _sweep(self, now: float) -> None:
+        """Удаляет корзины, которые уже полностью наполнились."""
+        self._last_sweep = now
+        expired = [
+            key for key, bucket in self._buckets.items()
+            if (now - bucket.updated_at) * self.rules[key[1]][0] + bucket.tokens >= self.rules[key[1]][1]
+        ]
+        for key in expired:
+            del self._buckets[key]
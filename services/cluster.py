@@ -0,0 +1,445 @@
+"""
+Модуль горизонтального масштабирования бота на несколько процессов.
+
+Родительский процесс получает обновления от Telegram (getUpdates) и
+распределяет их по процессам-обработчикам по хэшу user_id: все обновления
+одного пользователя всегда попадают в один и тот же процесс. Поэтому
+кэш FSM-состояний и динамические напоминания (services/reminder_manager)
+остаются локальными для процесса-владельца.
+
+Родитель следит за процессами-обработчиками (WorkerSupervisor): упавший
+процесс перезапускается с новой очередью, а переполненная очередь не
+останавливает приём обновлений для остальных пользователей — после
+нескольких попыток обновление пропускается с записью в журнал.
+
+Периодические задачи (services/scheduler) выполняет только один процесс —
+лидер, удерживающий файловую блокировку. При падении лидера блокировку
+освобождает ОС, и её перехватывает другой процесс.
+
+Изменения в общей базе SQLite, сделанные другими процессами, отслеживаются
+через PRAGMA data_version: подписчики on_data_changed() получают сигнал
+для сброса своих кэшей (например, процентилей сообщества в
+handlers/community, которые пересчитывает лидер). Кэш FSM не подписан:
+состояния пользователя меняет только его процесс-владелец.
+"""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import sqlite3
+import zlib
+from queue import Full
+from typing import Any, Callable, Dict, List, Optional
+
+from aiogram.exceptions import TelegramNetworkError, TelegramServerError
+
+from config import Settings
+
+logger = logging.getLogger(__name__)
+
+LEADER_RETRY_SECONDS = 15
+"""Как часто процесс, не ставший лидером, пытается захватить блокировку."""
+
+DATA_VERSION_POLL_SECONDS = 1.0
+"""Период опроса PRAGMA data_version."""
+
+WORKER_QUEUE_SIZE = 1000
+"""Максимум необработанных обновлений в очереди одного процесса."""
+
+WORKER_PUT_TIMEOUT = 5.0
+"""Сколько секунд ждать места в очереди процесса за одну попытку."""
+
+WORKER_PUT_ATTEMPTS = 6
+"""Сколько попыток положить обновление в заполненную очередь до его пропуска."""
+
+WORKER_CHECK_SECONDS = 5.0
+"""Период проверки, живы ли процессы-обработчики."""
+
+_data_changed_callbacks: List[Callable[[], None]] = []
+"""Подписчики на изменения БД, сделанные другими процессами."""
+
+
+def partition_for(user_id: int, workers: int) -> int:
+    """
+    Возвращает номер процесса-владельца пользователя.
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+        workers (int): Общее количество процессов-обработчиков.
+
+    Returns:
+        int: Номер процесса от 0 до workers - 1.
+    """
+    return zlib.crc32(str(user_id).encode()) % workers
+
+
+def extract_user_id(update: Dict[str, Any]) -> Optional[int]:
+    """
+    Извлекает ID пользователя (или чата) из «сырого» обновления Telegram.
+
+    Args:
+        update (dict): Обновление в формате Bot API.
+
+    Returns:
+        int | None: ID отправителя, ID чата или None, если их нет.
+    """
+    for key, event in update.items():
+        if key == "update_id" or not isinstance(event, dict):
+            continue
+        sender = event.get("from") or event.get("user")
+        if sender:
+            return sender["id"]
+        chat = event.get("chat") or (event.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+    return None
+
+
+def on_data_changed(callback: Callable[[], None]) -> None:
+    """
+    Подписывает функцию на изменения БД, сделанные другими процессами.
+
+    Args:
+        callback (Callable[[], None]): Функция сброса кэша.
+    """
+    _data_changed_callbacks.append(callback)
+
+
+class LeaderLock:
+    """
+    Выбор лидера через эксклюзивную файловую блокировку (flock).
+
+    Args:
+        path (str): Путь к файлу блокировки.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def acquired(self) -> bool:
+        """Удерживает ли текущий процесс блокировку."""
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """
+        Пытается захватить блокировку без ожидания.
+
+        Returns:
+            bool: True, если процесс стал (или уже является) лидером.
+        """
+        import fcntl  # только POSIX
+
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        """Освобождает блокировку."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class DataVersionWatcher:
+    """
+    Отслеживает изменения файла SQLite, сделанные другими соединениями.
+
+    PRAGMA data_version меняется, когда другое соединение фиксирует
+    транзакцию, поэтому опрос не читает данные и почти ничего не стоит.
+
+    Args:
+        db_path (str): Путь к файлу базы данных.
+        interval (float): Период опроса в секундах.
+    """
+
+    def __init__(self, db_path: str, interval: float = DATA_VERSION_POLL_SECONDS):
+        self.db_path = db_path
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Запускает фоновый опрос."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает опрос."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            version = await asyncio.to_thread(self._read_version, conn)
+            while True:
+                await asyncio.sleep(self.interval)
+                current = await asyncio.to_thread(self._read_version, conn)
+                if current != version:
+                    version = current
+                    for callback in _data_changed_callbacks:
+                        callback()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _read_version(conn: sqlite3.Connection) -> int:
+        return conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+class WorkerSupervisor:
+    """
+    Процессы-обработчики и их очереди с перезапуском упавших процессов.
+
+    Процесс проверяется перед каждой передачей ему обновления и фоновой
+    задачей раз в WORKER_CHECK_SECONDS. Упавший процесс запускается заново
+    с новой очередью: обновления, оставшиеся в старой, теряются.
+
+    Args:
+        workers (int): Количество процессов.
+        target (Callable | None): Точка входа процесса (index, queue);
+            по умолчанию — _worker_entry.
+    """
+
+    def __init__(self, workers: int, target: Optional[Callable[[int, Any], None]] = None):
+        self.target = target or _worker_entry
+        self.queues: List[Any] = [None] * workers
+        self.processes: List[Any] = [None] * workers
+        self.restarts = 0
+        self.dropped = 0
+        self._ctx = multiprocessing.get_context("spawn")
+        self._monitor_task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Запускает процессы и фоновую проверку."""
+        for index in range(len(self.processes)):
+            self._spawn(index)
+        self._monitor_task = asyncio.create_task(self._monitor())
+
+    def ensure_alive(self, index: int) -> None:
+        """Перезапускает процесс, если он завершился."""
+        process = self.processes[index]
+        if process.is_alive():
+            return
+        logger.error("💥 Процесс-обработчик %s завершился (код %s), перезапуск", index, process.exitcode)
+        # Старую очередь никто не читает: её фоновый поток не должен держать выход
+        self.queues[index].cancel_join_thread()
+        self.restarts += 1
+        self._spawn(index)
+
+    async def put(self, index: int, raw: Dict[str, Any]) -> bool:
+        """
+        Передаёт обновление процессу.
+
+        Заполненная очередь даёт обратное давление, но не дольше
+        WORKER_PUT_ATTEMPTS * WORKER_PUT_TIMEOUT секунд: дальше обновление
+        пропускается, чтобы один зависший процесс не останавливал приём
+        обновлений всех пользователей.
+
+        Args:
+            index (int): Номер процесса.
+            raw (dict): Обновление в формате Bot API.
+
+        Returns:
+            bool: False, если обновление пропущено.
+        """
+        loop = asyncio.get_running_loop()
+        for _ in range(WORKER_PUT_ATTEMPTS):
+            self.ensure_alive(index)
+            put = functools.partial(self.queues[index].put, raw, timeout=WORKER_PUT_TIMEOUT)
+            try:
+                await loop.run_in_executor(None, put)
+                return True
+            except Full:
+                logger.warning("⏳ Очередь процесса %s заполнена", index)
+        self.dropped += 1
+        logger.error("🗑 Обновление %s пропущено: процесс %s не разбирает очередь", raw.get("update_id"), index)
+        return False
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Останавливает процессы, дав им обработать уже полученные обновления.
+
+        Args:
+            timeout (float): Сколько секунд ждать завершения каждого процесса.
+        """
+        if self._monitor_task:
+            self._monitor_task.cancel()
+            await asyncio.gather(self._monitor_task, return_exceptions=True)
+            self._monitor_task = None
+        loop = asyncio.get_running_loop()
+        for queue in self.queues:
+            try:
+                await loop.run_in_executor(None, functools.partial(queue.put, None, timeout=WORKER_PUT_TIMEOUT))
+            except Full:
+                pass  # процесс не разбирает очередь — будет остановлен ниже
+        for index, process in enumerate(self.processes):
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                logger.warning("🛑 Процесс-обработчик %s не остановился за %s с, завершаем принудительно", index, timeout)
+                process.terminate()
+                await loop.run_in_executor(None, process.join, timeout)
+            self.queues[index].cancel_join_thread()
+
+    def _spawn(self, index: int) -> None:
+        queue = self._ctx.Queue(maxsize=WORKER_QUEUE_SIZE)
+        process = self._ctx.Process(target=self.target, args=(index, queue), name=f"bot-worker-{index}", daemon=True)
+        process.start()
+        self.queues[index] = queue
+        self.processes[index] = process
+
+    async def _monitor(self) -> None:
+        while True:
+            await asyncio.sleep(WORKER_CHECK_SECONDS)
+            for index in range(len(self.processes)):
+                self.ensure_alive(index)
+
+
+async def run_cluster(settings: Settings) -> None:
+    """
+    Запускает процессы-обработчики и распределяет между ними обновления.
+
+    База данных должна быть инициализирована до вызова.
+
+    Args:
+        settings (Settings): Конфигурация приложения (settings.workers > 1).
+    """
+    from main import create_bot, create_dispatcher
+
+    workers = WorkerSupervisor(settings.workers)
+    workers.start()
+    logger.info("🧩 Запущено процессов-обработчиков: %s", settings.workers)
+
+    bot = create_bot(settings)
+    # Диспетчер в родителе нужен только для списка используемых типов обновлений
+    allowed_updates = create_dispatcher(settings).resolve_used_update_types()
+    try:
+        await _poll_updates(bot, workers, allowed_updates)
+    finally:
+        await workers.stop()
+        await bot.session.close()
+
+
+async def _poll_updates(bot, workers: WorkerSupervisor, allowed_updates) -> None:
+    """Получает обновления через getUpdates и раскладывает по процессам."""
+    offset = None
+    backoff = 1.0
+    while True:
+        try:
+            updates = await bot.get_updates(offset=offset, timeout=30, allowed_updates=allowed_updates)
+        except (TelegramNetworkError, TelegramServerError) as e:
+            logger.warning("🌐 Ошибка getUpdates: %s, повтор через %.0f с", e, backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+            continue
+        backoff = 1.0
+
+        for update in updates:
+            raw = update.model_dump(mode="json", exclude_unset=True)
+            user_id = extract_user_id(raw)
+            index = partition_for(user_id, len(workers.queues)) if user_id is not None else 0
+            await workers.put(index, raw)
+            offset = update.update_id + 1
+
+
+def _worker_entry(index: int, queue) -> None:
+    """Точка входа процесса-обработчика."""
+    try:
+        asyncio.run(_run_worker(index, queue))
+    except (KeyboardInterrupt, SystemExit):
+        pass
+
+
+async def _run_worker(index: int, queue) -> None:
+    """
+    Обрабатывает обновления своей части пользователей.
+
+    Args:
+        index (int): Номер процесса.
+        queue: Очередь multiprocessing с «сырыми» обновлениями (None — остановка).
+    """
+    from main import create_bot, create_dispatcher
+    from database.engine import AsyncSessionLocal, DB_PATH, shard_engines
+    from services.loop_monitor import LoopMonitor
+    from services.metrics import instrument_engine, register_runtime_metrics, start_metrics_server
+    from services.outbox import OutboundQueue
+    from services.drink_debounce import flush_all as flush_drink_taps, set_debounce_window
+    from services.reminder_manager import set_reminder_interval
+    from services.scheduler import setup_scheduler
+    from utils.i18n import load_locales
+
+    settings = Settings()
+    load_locales()
+
+    bot = create_bot(settings)
+    dp = create_dispatcher(settings)
+
+    outbox = OutboundQueue(workers=settings.outbox_workers, rate_limit=settings.outbox_rate_limit / settings.workers)
+    bot.session.middleware(outbox)
+    outbox.start()
+
+    for shard_engine in shard_engines:
+        instrument_engine(shard_engine.sync_engine)
+    loop_monitor = LoopMonitor(settings.loop_lag_interval, settings.slow_callback_threshold)
+    loop_monitor.start()
+    metrics_runner = None
+    if settings.metrics_port:
+        register_runtime_metrics(outbox=outbox, lanes=dp.fsm.events_isolation, storage=dp.storage,
+                                 loop_monitor=loop_monitor, http_session=bot.session)
+        metrics_runner = await start_metrics_server(settings.metrics_host, settings.metrics_port + index)
+
+    set_reminder_interval(settings.reminder_interval_minutes)
+    set_debounce_window(settings.drink_debounce_seconds)
+
+    watcher = DataVersionWatcher(DB_PATH)
+    watcher.start()
+
+    lock = LeaderLock(os.path.join(os.path.dirname(DB_PATH) or ".", "scheduler.lock"))
+
+    async def elect_leader():
+        while not lock.try_acquire():
+            await asyncio.sleep(LEADER_RETRY_SECONDS)
+        logger.info("👑 Процесс %s стал лидером и запускает периодические задачи", index)
+        await setup_scheduler(
+            bot,
+            interval_minutes=settings.reminder_interval_minutes,
+            digest_processes=settings.digest_processes,
+            digest_send_hour=settings.digest_send_hour,
+        )
+
+    election = asyncio.create_task(elect_leader())
+    loop = asyncio.get_running_loop()
+    tasks: set = set()
+    try:
+        while True:
+            raw = await loop.run_in_executor(None, queue.get)
+            if raw is None:
+                break
+            task = asyncio.create_task(dp.feed_raw_update(bot, raw, session_factory=AsyncSessionLocal))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    finally:
+        election.cancel()
+        await asyncio.gather(election, *tasks, return_exceptions=True)
+        await flush_drink_taps()
+        await dp.fsm.close()
+        await watcher.stop()
+        await loop_monitor.stop()
+        await outbox.stop()
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        lock.release()
+        await bot.session.close()
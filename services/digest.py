@@ -0,0 +1,252 @@
+"""
+Модуль еженедельных отчётов (digest).
+
+Отчёт за прошедшую неделю (понедельник–воскресенье, UTC) готовится
+конвейером, чтобы рисование сотен графиков не останавливало бота:
+    1. Планирование — одна команда INSERT ... SELECT ставит задание
+       в digest_jobs каждому подписанному пользователю со временем
+       отправки: понедельник, send_hour по его местному времени.
+    2. Отрисовка — ночью (вне пиковых часов) пачки заданий забираются
+       одним запросом вместе с суммами по дням, графики строятся
+       параллельно в пуле процессов, PNG и подпись сохраняются в БД.
+    3. Отправка — раз в несколько минут готовые отчёты, чьё время
+       наступило, уходят через очередь исходящих сообщений с низким
+       приоритетом (services/outbox): она соблюдает лимит скорости
+       Bot API и не задерживает ответы хэндлерам.
+
+Каждый шаг фиксирует результат в статусе задания (pending → rendered →
+sent), поэтому после падения процесса работа продолжается с места
+остановки: повторный запуск не создаёт дублей, не перерисовывает готовое
+и не отправляет отправленное.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest, TelegramForbiddenError
+from aiogram.types import BufferedInputFile
+
+from database.queries import get_digest_batch, get_due_digests, plan_digest_jobs, update_digest_jobs
+from services.outbox import bulk_priority
+from utils.chart import render_weekly_chart_png
+from utils.clock import get_clock
+from utils.i18n import get_loc_list, get_text, load_locales
+
+logger = logging.getLogger(__name__)
+
+RENDER_BATCH = 200
+"""Сколько отчётов забирать на отрисовку одним запросом."""
+
+SEND_BATCH = 50
+"""Сколько отчётов ставить в очередь отправки за один шаг."""
+
+MAX_ATTEMPTS = 3
+"""После стольких неудачных отправок (или отрисовок, прерванных падением пула) задание помечается failed."""
+
+PLAN_WINDOW = timedelta(days=1)
+"""Планировать отчёт можно в течение суток после окончания недели."""
+
+_processes = 2
+"""Количество процессов для отрисовки графиков (устанавливается в main.py)."""
+
+_send_hour = 9
+"""Час отправки по местному времени пользователя (устанавливается в main.py)."""
+
+
+def configure(processes: int, send_hour: int) -> None:
+    """
+    Задаёт параметры конвейера отчётов.
+
+    Args:
+        processes (int): Количество процессов для отрисовки графиков.
+        send_hour (int): Час отправки по местному времени пользователя.
+    """
+    global _processes, _send_hour
+    _processes = max(1, processes)
+    _send_hour = send_hour
+
+
+def digest_week(now: datetime) -> date:
+    """Возвращает понедельник последней завершённой недели (UTC)."""
+    today = now.astimezone(timezone.utc).date()
+    return today - timedelta(days=today.weekday() + 7)
+
+
+async def prepare_weekly_digests() -> None:
+    """
+    Планирует и отрисовывает отчёты за последнюю завершённую неделю.
+
+    Запускается по расписанию ночью в понедельник и при старте бота —
+    чтобы дорисовать то, что не успели до перезапуска.
+    """
+    now = get_clock().now()
+    week = digest_week(now)
+    week_end = datetime.combine(week + timedelta(days=7), datetime.min.time(), tzinfo=timezone.utc)
+    planned = 0
+    if now - week_end <= PLAN_WINDOW:
+        planned = await plan_digest_jobs(week, _send_hour)
+    rendered = await render_pending_digests(week)
+    if planned or rendered:
+        logger.info("📬 Отчёты за неделю %s: запланировано %s, отрисовано %s", week, planned, rendered)
+
+
+async def render_pending_digests(week: date) -> int:
+    """
+    Отрисовывает все ожидающие отчёты недели в пуле процессов.
+
+    Падение процесса пула (BrokenProcessPool) — временная ошибка: задания
+    пачки, которые не успели нарисоваться, остаются pending с увеличенным
+    attempts, пул создаётся заново, и они берутся в следующую пачку.
+    Исключение внутри отрисовки помечает задание failed сразу.
+
+    Args:
+        week (date): Понедельник недели отчёта (UTC).
+
+    Returns:
+        int: Количество отрисованных отчётов.
+    """
+    loop = asyncio.get_running_loop()
+    week_end = week + timedelta(days=6)
+    rendered = 0
+    pool = _create_pool()
+    try:
+        while True:
+            rows = await get_digest_batch(week, RENDER_BATCH)
+            if not rows:
+                break
+
+            profiles: Dict[int, Dict[str, Any]] = {}
+            totals: Dict[int, Dict[str, int]] = defaultdict(dict)
+            for user_id, goal_ml, language, enabled, day, total, attempts in rows:
+                profiles[user_id] = {"goal": goal_ml or 2000, "lang": language or "ru", "enabled": enabled,
+                                     "attempts": attempts or 0}
+                if day is not None:
+                    totals[user_id][day] = total
+
+            updates: List[Dict[str, Any]] = []
+            to_render = []
+            for user_id, profile in profiles.items():
+                if not profile["enabled"] or not totals.get(user_id):
+                    # Отписался или не пил всю неделю — отправлять нечего
+                    updates.append(_job_update(week, user_id, "skipped"))
+                else:
+                    to_render.append(user_id)
+
+            charts = await asyncio.gather(*(
+                loop.run_in_executor(pool, render_weekly_chart_png, totals[user_id],
+                                     profiles[user_id]["goal"], profiles[user_id]["lang"], week_end)
+                for user_id in to_render
+            ), return_exceptions=True)
+
+            pool_broken = False
+            for user_id, chart in zip(to_render, charts):
+                if isinstance(chart, BrokenProcessPool):
+                    pool_broken = True
+                    attempts = profiles[user_id]["attempts"] + 1
+                    status = "failed" if attempts >= MAX_ATTEMPTS else "pending"
+                    updates.append(_job_update(week, user_id, status, attempts=attempts))
+                    continue
+                if isinstance(chart, BaseException):
+                    logger.error("❌ Не удалось нарисовать отчёт для %s: %r", user_id, chart)
+                    updates.append(_job_update(week, user_id, "failed"))
+                    continue
+                profile = profiles[user_id]
+                caption = _digest_caption(totals[user_id], profile["goal"], profile["lang"], week)
+                updates.append(_job_update(week, user_id, "rendered", caption=caption, chart=chart))
+                rendered += 1
+
+            await update_digest_jobs(updates)
+            if pool_broken:
+                logger.warning("♻️ Процесс отрисовки отчётов упал, пул создаётся заново")
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = _create_pool()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return rendered
+
+
+async def send_due_digests(bot: Bot) -> int:
+    """
+    Отправляет готовые отчёты, время которых наступило.
+
+    Args:
+        bot (Bot): Экземпляр бота.
+
+    Returns:
+        int: Количество отправленных отчётов.
+    """
+    started_at = get_clock().now()
+    sent = 0
+    while True:
+        rows = await get_due_digests(get_clock().now(), started_at, SEND_BATCH)
+        if not rows:
+            return sent
+        with bulk_priority():
+            results = await asyncio.gather(*(_send_digest(bot, row) for row in rows))
+        await update_digest_jobs(results)
+        sent += sum(1 for result in results if result["status"] == "sent")
+
+
+async def _send_digest(bot: Bot, row) -> Dict[str, Any]:
+    """Отправляет один отчёт и возвращает новое состояние задания."""
+    if not row.weekly_digest_enabled:
+        return _job_update(row.week, row.user_id, "skipped", attempts=row.attempts)
+    try:
+        await bot.send_photo(
+            chat_id=row.user_id,
+            photo=BufferedInputFile(row.chart, filename="digest.png"),
+            caption=row.caption,
+        )
+    except (TelegramForbiddenError, TelegramBadRequest) as e:
+        # Бот заблокирован или чат недоступен — повтор не поможет
+        logger.warning("⚠️ Отчёт для %s не доставлен: %s", row.user_id, e)
+        return _job_update(row.week, row.user_id, "failed", attempts=row.attempts + 1)
+    except (TelegramAPIError, OSError, asyncio.TimeoutError) as e:
+        attempts = row.attempts + 1
+        logger.warning("🌐 Ошибка отправки отчёта %s (попытка %s): %s", row.user_id, attempts, e)
+        if attempts >= MAX_ATTEMPTS:
+            return _job_update(row.week, row.user_id, "failed", attempts=attempts)
+        return _job_update(row.week, row.user_id, "rendered", caption=row.caption, chart=row.chart,
+                           attempts=attempts)
+    return _job_update(row.week, row.user_id, "sent", attempts=row.attempts + 1)
+
+
+def _create_pool() -> ProcessPoolExecutor:
+    """Создаёт пул процессов для отрисовки графиков."""
+    # spawn: дочерние процессы не наследуют цикл событий, потоки и соединения с БД
+    return ProcessPoolExecutor(
+        max_workers=_processes,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=load_locales,
+    )
+
+
+def _job_update(week: date, user_id: int, status: str, caption: Optional[str] = None,
+                chart: Optional[bytes] = None, attempts: int = 0) -> Dict[str, Any]:
+    """Новое состояние задания; график хранится только пока отчёт не отправлен."""
+    return {"week": week, "user_id": user_id, "status": status, "caption": caption,
+            "chart": chart, "attempts": attempts}
+
+
+def _digest_caption(totals: Dict[str, int], goal_ml: int, lang: str, week: date) -> str:
+    """Подпись к отчёту: итоги недели по суммам за дни."""
+    best_day, best_amount = max(totals.items(), key=lambda item: item[1])
+    total = sum(totals.values())
+    return get_text(
+        "digest.caption",
+        lang,
+        start=week.strftime("%d.%m"),
+        end=(week + timedelta(days=6)).strftime("%d.%m.%Y"),
+        total=total,
+        average=round(total / 7),
+        goal_days=sum(1 for amount in totals.values() if amount >= goal_ml),
+        best_day=get_loc_list("weekday", lang)[date.fromisoformat(best_day).weekday()],
+        best_amount=best_amount,
+    )
@@ -0,0 +1,203 @@
+"""
+Модуль объединения частых нажатий быстрых кнопок.
+
+Пользователи нередко нажимают «+200 мл» несколько раз подряд. Вместо
+записи в БД и редактирования сообщения на каждое нажатие callback
+подтверждается сразу, а нажатия пользователя копятся в течение короткого
+окна. Окно продлевается каждым новым нажатием, но не дольше MAX_DELAY
+от первого. Затем фоновая задача записывает все нажатия одной транзакцией
+(add_intakes — по записи на нажатие, со своим временем) и один раз
+редактирует сообщение итоговым объёмом.
+
+Нажатия уже подтверждены пользователю, поэтому при ошибке записи (например,
+блокировке SQLite) серия не теряется: нажатия возвращаются в серию
+пользователя и записываются повторно. Если все MAX_FLUSH_ATTEMPTS попыток
+не удались, сообщение редактируется текстом об ошибке.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import Message
+
+from database.queries import add_intakes
+from services.metrics import DRINK_TAP_BATCHES, DRINK_TAPS
+from utils.clock import get_clock
+from utils.i18n import get_text
+
+logger = logging.getLogger(__name__)
+
+MAX_DELAY = 3.0
+"""Максимальная задержка записи от первого нажатия серии, секунды."""
+
+MAX_FLUSH_ATTEMPTS = 3
+"""Сколько раз пытаться записать серию, прежде чем сообщить пользователю об ошибке."""
+
+RETRY_DELAY = 1.0
+"""Пауза перед повторной записью серии, секунды (умножается на номер попытки)."""
+
+_window = 1.0
+"""Окно объединения нажатий, секунды (устанавливается в main.py)."""
+
+
+@dataclass
+class _Burst:
+    """Серия нажатий одного пользователя, ещё не записанная в БД."""
+
+    message: Optional[Message]
+    lang: str
+    taps: List[Tuple[datetime, int]] = field(default_factory=list)
+    started_at: float = 0.0
+    last_tap_at: float = 0.0
+    task: Optional[asyncio.Task] = None
+    attempts: int = 0
+
+    @property
+    def total(self) -> int:
+        return sum(amount for _, amount in self.taps)
+
+
+_bursts: Dict[int, _Burst] = {}
+"""Незаписанные серии нажатий по user_id."""
+
+_tasks: Set[asyncio.Task] = set()
+"""Фоновые задачи записи серий (ссылки нужны, чтобы задачи не собрал GC)."""
+
+
+def set_debounce_window(seconds: float) -> None:
+    """
+    Устанавливает окно объединения нажатий.
+
+    Args:
+        seconds (float): Окно в секундах (0 — записывать каждое нажатие сразу).
+    """
+    global _window
+    _window = max(0.0, seconds)
+
+
+def pending_taps_count() -> int:
+    """Возвращает количество нажатий, ожидающих записи."""
+    return sum(len(burst.taps) for burst in _bursts.values())
+
+
+def add_tap(user_id: int, amount_ml: int, message: Optional[Message], lang: str) -> int:
+    """
+    Добавляет нажатие в серию пользователя и при необходимости запускает её запись.
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+        amount_ml (int): Объём нажатой кнопки, мл.
+        message (Message | None): Сообщение с кнопками — его отредактирует запись серии.
+        lang (str): Язык пользователя.
+
+    Returns:
+        int: Сумма серии с учётом этого нажатия, мл.
+    """
+    now = asyncio.get_running_loop().time()
+    burst = _bursts.get(user_id)
+    if burst is None:
+        burst = _bursts[user_id] = _Burst(message=message, lang=lang, started_at=now)
+    elif message is not None:
+        burst.message = message
+    burst.taps.append((get_clock().now(), amount_ml))
+    burst.last_tap_at = now
+    DRINK_TAPS.inc()
+    if burst.task is None:
+        _start_task(burst, _flush_later(user_id, burst))
+    return burst.total
+
+
+def _start_task(burst: _Burst, coro) -> None:
+    """Запускает фоновую задачу записи серии."""
+    burst.task = asyncio.create_task(coro)
+    _tasks.add(burst.task)
+    burst.task.add_done_callback(_tasks.discard)
+
+
+async def flush_all() -> None:
+    """Немедленно записывает все ожидающие серии и дожидается начатых записей (при остановке бота)."""
+    # Начатая запись может завершиться ошибкой и вернуть нажатия в серию — повторяем
+    while _bursts or _tasks:
+        bursts = list(_bursts.items())
+        for _, burst in bursts:
+            burst.task.cancel()  # задача ещё ждёт окончания окна или повтора — запишем сами
+        await asyncio.gather(
+            *(_flush(user_id, burst, final=True) for user_id, burst in bursts),
+            *_tasks,
+            return_exceptions=True,
+        )
+
+
+async def _flush_later(user_id: int, burst: _Burst) -> None:
+    """Ждёт окончания окна серии и записывает её."""
+    loop = asyncio.get_running_loop()
+    while True:
+        deadline = min(burst.last_tap_at + _window, burst.started_at + MAX_DELAY)
+        delay = deadline - loop.time()
+        if delay <= 0:
+            break
+        await asyncio.sleep(delay)
+    await _flush(user_id, burst)
+
+
+async def _retry_later(user_id: int, burst: _Burst) -> None:
+    """Ждёт паузу перед повторной записью серии и записывает её."""
+    await asyncio.sleep(RETRY_DELAY * burst.attempts)
+    await _flush(user_id, burst)
+
+
+async def _flush(user_id: int, burst: _Burst, final: bool = False) -> None:
+    """
+    Записывает серию одной транзакцией и один раз редактирует сообщение.
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+        burst (_Burst): Серия нажатий.
+        final (bool): Последняя попытка (остановка бота) — при ошибке не повторять.
+    """
+    if _bursts.get(user_id) is not burst:
+        return  # уже записана
+    del _bursts[user_id]
+    try:
+        await add_intakes(user_id, burst.taps)
+    except Exception:
+        burst.attempts += 1
+        if not final and burst.attempts < MAX_FLUSH_ATTEMPTS:
+            logger.warning("⚠️ Не удалось записать %s нажатий пользователя %s (попытка %s), повторим",
+                           len(burst.taps), user_id, burst.attempts, exc_info=True)
+            _requeue(user_id, burst)
+            return
+        logger.exception("❌ Не удалось записать %s нажатий пользователя %s", len(burst.taps), user_id)
+        await _edit(user_id, burst, get_text("drink.save_failed", burst.lang, amount=burst.total))
+        return
+    DRINK_TAP_BATCHES.inc()
+    await _edit(user_id, burst, get_text("drink.added", burst.lang, amount=burst.total))
+
+
+def _requeue(user_id: int, burst: _Burst) -> None:
+    """Возвращает незаписанные нажатия в серию пользователя для повторной записи."""
+    pending = _bursts.get(user_id)
+    if pending is not None:
+        # Пока шла запись, пользователь нажал ещё: старые нажатия запишутся вместе
+        # с новыми, а сообщение покажет общую сумму
+        pending.taps[:0] = burst.taps
+        pending.attempts = max(pending.attempts, burst.attempts)
+        if pending.message is None:
+            pending.message = burst.message
+        return
+    _bursts[user_id] = burst
+    _start_task(burst, _retry_later(user_id, burst))
+
+
+async def _edit(user_id: int, burst: _Burst, text: str) -> None:
+    """Редактирует сообщение с кнопками, если оно есть."""
+    if burst.message is None:
+        return
+    try:
+        await burst.message.edit_text(text)
+    except TelegramAPIError as e:
+        logger.warning("⚠️ Не удалось обновить сообщение для %s: %s", user_id, e)
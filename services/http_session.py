@@ -0,0 +1,162 @@
+"""
+Модуль HTTP-сессии для запросов к Bot API.
+
+Все отправители (хэндлеры, напоминания, рассылки, отчёты) работают через
+один экземпляр бота, а значит — через один пул соединений aiohttp.
+PooledAiohttpSession настраивает этот пул: размер, keep-alive, кэш DNS,
+таймауты и адрес сервера Bot API (официальный или локальный
+telegram-bot-api). Через TraceConfig считается, сколько запросов ушло
+по уже открытым соединениям, сколько соединений пришлось открыть и как
+долго запросы ждали свободного соединения, — по этим числам подбирается
+размер пула под массовые рассылки.
+"""
+
+import logging
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+from aiohttp import ClientSession, ClientTimeout, TraceConfig
+from aiohttp.hdrs import USER_AGENT
+from aiohttp.http import SERVER_SOFTWARE
+
+from aiogram import Bot
+from aiogram.__meta__ import __version__
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+
+logger = logging.getLogger(__name__)
+
+
+class PooledAiohttpSession(AiohttpSession):
+    """
+    Сессия aiogram с настраиваемым пулом соединений и статистикой их использования.
+
+    Args:
+        limit (int): Максимум одновременно открытых соединений (0 — без ограничения).
+        limit_per_host (int): Максимум соединений с одним хостом (0 — без ограничения).
+        keepalive_timeout (float): Сколько секунд держать простаивающее соединение открытым.
+        dns_ttl (int): Время жизни записей в кэше DNS, секунды.
+        connect_timeout (float): Таймаут установки соединения, секунды.
+        timeout (float): Общий таймаут запроса, секунды.
+        api_url (str): Адрес локального сервера Bot API (пусто — api.telegram.org).
+    """
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 0, keepalive_timeout: float = 30.0,
+                 dns_ttl: int = 300, connect_timeout: float = 10.0, timeout: float = 60.0,
+                 api_url: str = "") -> None:
+        api = TelegramAPIServer.from_base(api_url, is_local=True) if api_url else None
+        super().__init__(timeout=timeout, **({"api": api} if api else {}))
+        self.connect_timeout = connect_timeout
+        self._connector_init.update(
+            limit=limit,
+            limit_per_host=limit_per_host,
+            keepalive_timeout=keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=dns_ttl,
+        )
+        self._stats = {
+            "requests": 0,
+            "failed": 0,
+            "in_flight": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "pool_waits": 0,
+            "pool_wait_seconds": 0.0,
+            "pool_wait_max": 0.0,
+        }
+
+    async def create_session(self) -> ClientSession:
+        if self._should_reset_connector:
+            await self.close()
+
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(
+                connector=self._connector_type(**self._connector_init),
+                headers={USER_AGENT: f"{SERVER_SOFTWARE} aiogram/{__version__}"},
+                timeout=ClientTimeout(total=self.timeout, connect=self.connect_timeout),
+                trace_configs=[self._trace_config()],
+            )
+            self._should_reset_connector = False
+
+        return self._session
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod[TelegramType], timeout: Optional[int] = None
+    ) -> TelegramType:
+        # Числовой таймаут aiohttp превращает в ClientTimeout(total=...) и теряет
+        # таймаут соединения — передаём полный объект
+        total = self.timeout if timeout is None else timeout
+        return await super().make_request(
+            bot, method, timeout=ClientTimeout(total=total, connect=self.connect_timeout)
+        )
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            stats = self.stats()
+            logger.info(
+                "🔌 HTTP-сессия Bot API: запросов %s, новых соединений %s, повторно использовано %s (%.0f%%), "
+                "ожиданий свободного соединения %s (макс. %.3f с)",
+                stats["requests"], stats["connections_created"], stats["connections_reused"],
+                stats["reuse_ratio"] * 100, stats["pool_waits"], stats["pool_wait_max"],
+            )
+        await super().close()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает статистику использования пула соединений.
+
+        Returns:
+            dict: requests, failed, in_flight — запросы; connections_created,
+            connections_reused, reuse_ratio — открытые и переиспользованные
+            соединения; pool_waits, pool_wait_seconds, pool_wait_max — ожидание
+            свободного соединения при исчерпанном лимите; limit, limit_per_host.
+        """
+        stats: Dict[str, Any] = dict(self._stats)
+        acquired = stats["connections_created"] + stats["connections_reused"]
+        stats["reuse_ratio"] = stats["connections_reused"] / acquired if acquired else 0.0
+        stats["limit"] = self._connector_init["limit"]
+        stats["limit_per_host"] = self._connector_init["limit_per_host"]
+        return stats
+
+    def _trace_config(self) -> TraceConfig:
+        """Создаёт TraceConfig, обновляющий статистику сессии."""
+        stats = self._stats
+        trace = TraceConfig(trace_config_ctx_factory=lambda trace_request_ctx: SimpleNamespace())
+
+        async def on_request_start(session, ctx, params):
+            stats["requests"] += 1
+            stats["in_flight"] += 1
+
+        async def on_request_end(session, ctx, params):
+            stats["in_flight"] -= 1
+
+        async def on_request_exception(session, ctx, params):
+            stats["in_flight"] -= 1
+            stats["failed"] += 1
+
+        async def on_connection_queued_start(session, ctx, params):
+            ctx.queued_at = time.perf_counter()
+
+        async def on_connection_queued_end(session, ctx, params):
+            waited = time.perf_counter() - ctx.queued_at
+            stats["pool_waits"] += 1
+            stats["pool_wait_seconds"] += waited
+            stats["pool_wait_max"] = max(stats["pool_wait_max"], waited)
+
+        async def on_connection_create_end(session, ctx, params):
+            stats["connections_created"] += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            stats["connections_reused"] += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_end.append(on_request_end)
+        trace.on_request_exception.append(on_request_exception)
+        trace.on_connection_queued_start.append(on_connection_queued_start)
+        trace.on_connection_queued_end.append(on_connection_queued_end)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace
@@ -0,0 +1,203 @@
+"""
+Модуль импорта истории потребления воды из CSV.
+
+Пользователи, переходящие из других трекеров, присылают экспорт в CSV.
+Файл читается построчно (csv.reader поверх открытого файла), строки
+проверяются и записываются пачками по IMPORT_CHUNK через add_intakes_bulk —
+в памяти одновременно находится не больше одной пачки, каким бы большим
+ни был файл. После импорта пересчитываются производные данные:
+users.last_intake_at и серии user_streaks.
+
+Дубликатами считаются только записи, которые уже были в БД до начала
+импорта: каждая такая запись (та же метка времени и объём) поглощает одну
+строку файла. Повторы внутри файла — настоящие приёмы воды (экспорт по
+дням, две одинаковые порции в одну минуту) и импортируются все, а повторная
+отправка того же файла ничего не добавляет.
+
+Поддерживаемый формат: строка заголовка, колонка времени (timestamp,
+datetime, date [+ time]) и колонка объёма (amount_ml, ml, amount, volume
+или liters/amount_l в литрах). Разделитель определяется автоматически.
+Время без часового пояса считается локальным временем пользователя,
+дата без времени — полднем этого дня.
+"""
+
+import csv
+from collections import Counter
+from datetime import datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterator, Optional, TextIO, Tuple
+
+from database.queries import add_intakes_bulk, count_intakes_at, get_max_intake_id, refresh_last_intake
+from database.streaks import rebuild_streaks
+from utils.timezones import get_user_timezone
+
+IMPORT_CHUNK = 1000
+"""Сколько записей вставлять за одну транзакцию."""
+
+MAX_IMPORT_BYTES = 20 * 1024 * 1024
+"""Максимальный размер файла: Bot API отдаёт ботам файлы до 20 МБ."""
+
+MIN_AMOUNT_ML, MAX_AMOUNT_ML = 10, 5000
+"""Допустимый объём одной записи, мл."""
+
+EARLIEST_TIMESTAMP = datetime(2000, 1, 1, tzinfo=timezone.utc)
+"""Записи старше этого момента считаются ошибочными."""
+
+TIMESTAMP_COLUMNS = ("timestamp", "datetime", "date_time", "time_stamp", "created_at", "logged_at")
+DATE_COLUMNS = ("date", "day")
+TIME_COLUMNS = ("time",)
+AMOUNT_COLUMNS = {
+    "amount_ml": 1, "ml": 1, "amount": 1, "volume": 1, "volume_ml": 1, "water_ml": 1, "water": 1,
+    "liters": 1000, "litres": 1000, "amount_l": 1000, "volume_l": 1000, "l": 1000,
+}
+"""Имена колонок объёма и множитель для перевода в мл."""
+
+DATETIME_FORMATS = (
+    "%d.%m.%Y %H:%M:%S", "%d.%m.%Y %H:%M", "%d.%m.%Y",
+    "%Y/%m/%d %H:%M:%S", "%Y/%m/%d %H:%M", "%Y/%m/%d",
+)
+"""Форматы времени помимо ISO 8601 и unix-времени."""
+
+
+class ImportFormatError(ValueError):
+    """В файле не найдены колонки времени и объёма."""
+
+
+def _parse_moment(value: str, tz) -> Optional[datetime]:
+    """Разбирает время записи; naive-время считается локальным для пользователя."""
+    value = value.strip()
+    if not value:
+        return None
+    moment = None
+    if value.replace(".", "", 1).isdigit() and len(value.split(".")[0]) >= 9:
+        return datetime.fromtimestamp(float(value), tz=timezone.utc)  # unix-время
+    try:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        for fmt in DATETIME_FORMATS:
+            try:
+                moment = datetime.strptime(value, fmt)
+                break
+            except ValueError:
+                continue
+    if moment is None:
+        return None
+    if len(value) <= 10:
+        moment = datetime.combine(moment.date(), time(12, 0))  # только дата — полдень
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=tz)
+    return moment.astimezone(timezone.utc)
+
+
+def read_intake_rows(file: TextIO, tz_offset: int | None) -> Iterator[Optional[Tuple[datetime, int]]]:
+    """
+    Построчно читает CSV и проверяет записи.
+
+    Args:
+        file (TextIO): Открытый текстовый файл.
+        tz_offset (int | None): Смещение часового пояса пользователя в минутах.
+
+    Yields:
+        tuple[datetime, int] | None: (время UTC, объём в мл) или None для
+        строки, не прошедшей проверку.
+
+    Raises:
+        ImportFormatError: Нет заголовка с колонками времени и объёма.
+    """
+    sample = file.read(4096)
+    file.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(file, dialect)
+
+    header = [name.strip().lstrip("\ufeff").lower().replace(" ", "_") for name in next(reader, [])]
+    position = {name: index for index, name in enumerate(header)}
+    moment_column = next((position[name] for name in TIMESTAMP_COLUMNS if name in position), None)
+    date_column = next((position[name] for name in DATE_COLUMNS if name in position), None)
+    time_column = next((position[name] for name in TIME_COLUMNS if name in position), None)
+    amount_name = next((name for name in AMOUNT_COLUMNS if name in position), None)
+    if amount_name is None or (moment_column is None and date_column is None):
+        raise ImportFormatError(", ".join(header))
+    amount_column, multiplier = position[amount_name], AMOUNT_COLUMNS[amount_name]
+
+    tz = get_user_timezone(tz_offset or 0)
+    latest = datetime.now(timezone.utc) + timedelta(days=1)
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        try:
+            if moment_column is not None:
+                raw_moment = row[moment_column]
+            else:
+                raw_moment = row[date_column] + (f" {row[time_column]}" if time_column is not None else "")
+            moment = _parse_moment(raw_moment, tz)
+            amount = round(float(row[amount_column].strip().replace(",", ".")) * multiplier)
+        except (IndexError, ValueError, OverflowError, OSError):
+            yield None
+            continue
+        if moment is None or not (EARLIEST_TIMESTAMP <= moment <= latest) \
+                or not (MIN_AMOUNT_ML <= amount <= MAX_AMOUNT_ML):
+            yield None
+            continue
+        yield moment, amount
+
+
+async def import_intakes(user_id: int, file: TextIO, tz_offset: int | None) -> Dict[str, Any]:
+    """
+    Импортирует записи из CSV и пересчитывает производные данные.
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+        file (TextIO): Открытый текстовый файл.
+        tz_offset (int | None): Смещение часового пояса пользователя в минутах.
+
+    Returns:
+        dict: inserted, duplicates, invalid — количества строк;
+        first, last — границы периода импортированных записей (UTC) или None.
+
+    Raises:
+        ImportFormatError: Нет заголовка с колонками времени и объёма.
+    """
+    report: Dict[str, Any] = {"inserted": 0, "duplicates": 0, "invalid": 0, "first": None, "last": None}
+    chunk = []
+    # Записи с id не больше этого существовали до импорта; сколько из них
+    # уже поглощено строками предыдущих пачек — по (время, объём). Словарь
+    # ограничен историей пользователя, а не размером файла.
+    existing_up_to = await get_max_intake_id(user_id)
+    matched: Dict[Tuple[datetime, int], int] = {}
+
+    async def flush() -> None:
+        existing = await count_intakes_at(user_id, {moment for moment, _ in chunk}, existing_up_to)
+        duplicates = Counter()
+        for key, count in Counter(chunk).items():
+            available = existing.get(key, 0) - matched.get(key, 0)
+            if available > 0:
+                duplicates[key] = min(count, available)
+                matched[key] = matched.get(key, 0) + duplicates[key]
+        new_rows = []
+        for key in chunk:
+            if duplicates[key]:
+                duplicates[key] -= 1
+            else:
+                new_rows.append(key)
+        report["inserted"] += await add_intakes_bulk(user_id, new_rows)
+        report["duplicates"] += len(chunk) - len(new_rows)
+        chunk.clear()
+
+    for parsed in read_intake_rows(file, tz_offset):
+        if parsed is None:
+            report["invalid"] += 1
+            continue
+        chunk.append(parsed)
+        moment = parsed[0]
+        report["first"] = min(report["first"] or moment, moment)
+        report["last"] = max(report["last"] or moment, moment)
+        if len(chunk) >= IMPORT_CHUNK:
+            await flush()
+    await flush()
+
+    if report["inserted"]:
+        await refresh_last_intake(user_id)
+        await rebuild_streaks([user_id])
+    return report
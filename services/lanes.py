@@ -0,0 +1,130 @@
+"""
+Модуль упорядоченной обработки обновлений по пользователям.
+
+Обновления одного пользователя обрабатываются строго по очереди (например,
+двойное нажатие drink_ рядом с set_lang_ больше не гоняется за общие данные),
+а обновления разных пользователей — параллельно, но не более заданного числа
+одновременно, чтобы не перегружать SQLite.
+
+Реализовано как event isolation aiogram: FSM-middleware берёт блокировку
+до чтения состояния, поэтому состояние сценария тоже читается уже по очереди.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Dict
+
+from aiogram.fsm.storage.base import BaseEventIsolation, StorageKey
+from aiogram.types import ErrorEvent
+
+logger = logging.getLogger(__name__)
+
+
+class LaneOverflowError(Exception):
+    """Очередь обновлений пользователя переполнена, обновление отброшено."""
+
+    def __init__(self, user_id: int):
+        super().__init__(f"Too many pending updates for user {user_id}")
+        self.user_id = user_id
+
+
+class _Lane:
+    """Очередь обновлений одного пользователя."""
+
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0
+
+
+class UserLaneIsolation(BaseEventIsolation):
+    """
+    Последовательная обработка по user_id с общим лимитом параллельности.
+
+    Args:
+        max_concurrency (int): Максимум одновременно обрабатываемых обновлений.
+        max_queue (int): Максимум ожидающих и обрабатываемых обновлений
+            одного пользователя; сверх лимита обновления отбрасываются.
+    """
+
+    def __init__(self, max_concurrency: int = 32, max_queue: int = 20):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._lanes: Dict[int, _Lane] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._active = 0
+
+        self.max_lanes = 0
+        self.rejected = 0
+        self._wait_count = 0
+        self._wait_sum = 0.0
+        self._wait_max = 0.0
+        self._wait_recent: deque = deque(maxlen=1000)
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        lane = self._lanes.get(key.user_id)
+        if lane is None:
+            lane = self._lanes[key.user_id] = _Lane()
+            self.max_lanes = max(self.max_lanes, len(self._lanes))
+        if lane.pending >= self.max_queue:
+            self.rejected += 1
+            raise LaneOverflowError(key.user_id)
+
+        loop = asyncio.get_running_loop()
+        lane.pending += 1
+        queued_at = loop.time()
+        try:
+            # Сначала очередь пользователя, потом общий слот: ожидающие
+            # пользователи не занимают слоты параллельности
+            async with lane.lock:
+                async with self._semaphore:
+                    self._record_wait(loop.time() - queued_at)
+                    self._active += 1
+                    try:
+                        yield
+                    finally:
+                        self._active -= 1
+        finally:
+            lane.pending -= 1
+            if lane.pending == 0:
+                del self._lanes[key.user_id]
+
+    async def close(self) -> None:
+        self._lanes.clear()
+
+    def _record_wait(self, wait: float) -> None:
+        self._wait_count += 1
+        self._wait_sum += wait
+        self._wait_max = max(self._wait_max, wait)
+        self._wait_recent.append(wait)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает метрики очередей.
+
+        Returns:
+            dict: Текущее и максимальное число очередей пользователей, число
+            обрабатываемых обновлений, отброшенные обновления и время ожидания
+            (среднее, максимум, p50/p95 по последним 1000 обновлениям).
+        """
+        recent = sorted(self._wait_recent)
+        return {
+            "lanes": len(self._lanes),
+            "max_lanes": self.max_lanes,
+            "active": self._active,
+            "rejected": self.rejected,
+            "wait_avg": self._wait_sum / self._wait_count if self._wait_count else 0.0,
+            "wait_max": self._wait_max,
+            "wait_p50": recent[len(recent) // 2] if recent else 0.0,
+            "wait_p95": recent[int(len(recent) * 0.95)] if recent else 0.0,
+        }
+
+
+async def on_lane_overflow(event: ErrorEvent) -> bool:
+    """Обработчик ошибок диспетчера: отброшенное обновление — не ошибка кода."""
+    logger.warning("⚠️ Обновление %s отброшено: %s", event.update.update_id, event.exception)
+    return True
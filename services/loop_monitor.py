@@ -0,0 +1,148 @@
+"""
+Модуль контроля отзывчивости цикла событий.
+
+Фоновая задача периодически засыпает на фиксированный интервал и измеряет,
+насколько позже срока она проснулась, — это задержка цикла событий (lag).
+Пока цикл занят синхронным кодом (генерация графика, запись файлов),
+все обработчики стоят, и задержка растёт.
+
+Дополнительно можно включить сторожевой поток: если цикл не отвечает
+дольше порога, поток снимает стек главного потока и пишет в журнал,
+какая задача и какая строка кода его блокирует, а после разблокировки —
+сколько длилась блокировка.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Dict, Optional
+
+from services.metrics import LOOP_LAG_SECONDS, LOOP_STALLS
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+"""Корень проекта: кадры из него показываются в отчёте первыми."""
+
+
+class LoopMonitor:
+    """
+    Измеритель задержки цикла событий и детектор блокировок.
+
+    Args:
+        interval (float): Период измерения задержки, секунды.
+        slow_threshold (float): Порог блокировки для сторожевого потока,
+            секунды (0 — сторожевой поток не запускается).
+    """
+
+    def __init__(self, interval: float = 0.25, slow_threshold: float = 0.0):
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._recent: deque = deque(maxlen=1000)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._heartbeat = time.monotonic()
+
+    def start(self) -> None:
+        """Запускает измерение в текущем цикле событий (и сторожевой поток, если задан порог)."""
+        self._loop = asyncio.get_running_loop()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._run())
+        if self.slow_threshold > 0:
+            self._thread = threading.Thread(
+                target=self._watch, args=(threading.get_ident(),), name="loop-watchdog", daemon=True
+            )
+            self._thread.start()
+
+    async def stop(self) -> None:
+        """Останавливает измерение и сторожевой поток."""
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._thread:
+            self._thread.join(timeout=1)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает сводку задержек.
+
+        Returns:
+            dict: Максимум за всё время, p50/p95/p99 и максимум по последним
+            1000 измерениям (секунды), число зафиксированных блокировок.
+        """
+        recent = sorted(self._recent)
+
+        def pick(q: float) -> float:
+            return recent[min(int(len(recent) * q), len(recent) - 1)] if recent else 0.0
+
+        return {
+            "max": self.max_lag,
+            "recent_max": recent[-1] if recent else 0.0,
+            "p50": pick(0.50),
+            "p95": pick(0.95),
+            "p99": pick(0.99),
+            "stalls": self.stalls,
+        }
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - started - self.interval, 0.0)
+            self._heartbeat = time.monotonic()
+            self._recent.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG_SECONDS.observe(lag)
+
+    def _watch(self, loop_thread_id: int) -> None:
+        """Сторожевой поток: сообщает о блокировках цикла событий."""
+        stalled_since: Optional[float] = None
+        # Задержка считается от последнего пробуждения, поэтому учитываем и сам интервал
+        limit = self.interval + self.slow_threshold
+        while not self._stop.wait(min(self.slow_threshold, self.interval) / 2):
+            silence = time.monotonic() - self._heartbeat
+            if silence > limit and stalled_since is None:
+                stalled_since = self._heartbeat + self.interval
+                self.stalls += 1
+                LOOP_STALLS.inc()
+                self._report_stall(loop_thread_id, silence - self.interval)
+            elif silence <= limit and stalled_since is not None:
+                logger.warning("🐢 Цикл событий снова отвечает: блокировка длилась %.2f с",
+                               self._heartbeat - stalled_since)
+                stalled_since = None
+
+    def _report_stall(self, loop_thread_id: int, blocked_for: float) -> None:
+        frame = sys._current_frames().get(loop_thread_id)
+        if frame is None:
+            return
+        stack = traceback.extract_stack(frame)
+        task = asyncio.current_task(self._loop) if self._loop else None
+        coro = task.get_coro() if task else None
+        culprit = next(
+            (entry for entry in reversed(stack) if entry.filename.startswith(PROJECT_ROOT)),
+            stack[-1],
+        )
+        logger.warning(
+            "🐢 Цикл событий заблокирован уже %.2f с: задача %s (%s), %s:%s в %s\n%s",
+            blocked_for,
+            task.get_name() if task else "—",
+            getattr(coro, "__qualname__", "—"),
+            os.path.relpath(culprit.filename, PROJECT_ROOT), culprit.lineno, culprit.name,
+            "".join(traceback.format_list(stack[-15:])),
+        )
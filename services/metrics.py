@@ -0,0 +1,179 @@
+"""
+Модуль эксплуатационных метрик бота.
+
+Объявляет метрики приложения, подключает их к компонентам (БД, очередь
+исходящих сообщений, очереди пользователей, кэши) и поднимает локальный
+aiohttp-сервер, отдающий метрики в текстовом формате Prometheus по GET /metrics.
+"""
+import logging
+import time
+
+from aiohttp import web
+from sqlalchemy import event
+
+from utils.metrics import CallbackMetric, Counter, Histogram, render
+from utils.timezones import get_user_timezone
+
+logger = logging.getLogger(__name__)
+
+HANDLER_SECONDS = Histogram("bot_handler_duration_seconds", "Длительность обработки события хэндлером", ["handler"])
+HANDLER_ERRORS = Counter("bot_handler_errors_total", "Исключения в хэндлерах", ["handler"])
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "Длительность SQL-запросов (count — количество запросов)",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+REMINDERS_SENT = Counter("reminders_sent_total", "Отправленные напоминания", ["source"])
+LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds",
+    "Задержка пробуждения задач в цикле событий",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+LOOP_STALLS = Counter("event_loop_stalls_total", "Блокировки цикла событий дольше порога")
+FAST_ROUTE_EVENTS = Counter(
+    "fast_route_events_total",
+    "События по способу маршрутизации: hit — таблица, unhandled — нет хэндлера, fallback — полная цепочка",
+    ["event", "result"],
+)
+DRINK_TAPS = Counter("drink_taps_total", "Нажатия быстрых кнопок добавления воды")
+DRINK_TAP_BATCHES = Counter("drink_tap_batches_total", "Записи серий нажатий (одна транзакция и одно редактирование)")
+
+
+def instrument_engine(sync_engine) -> None:
+    """
+    Подключает учёт SQL-запросов через события SQLAlchemy.
+
+    Args:
+        sync_engine: Синхронный движок (для AsyncEngine — engine.sync_engine).
+    """
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started_at = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        operation = statement.lstrip().split(None, 1)[0].upper()
+        DB_QUERY_SECONDS.observe(time.perf_counter() - context._metrics_started_at, operation)
+
+
+def _cache_stats(storage) -> dict:
+    """Собирает попадания и промахи кэшей приложения."""
+    tz_info = get_user_timezone.cache_info()
+    stats = {"timezone": (tz_info.hits, tz_info.misses)}
+    if hasattr(storage, "hits"):
+        stats["fsm"] = (storage.hits, storage.misses)
+    return stats
+
+
+def register_runtime_metrics(outbox=None, lanes=None, storage=None, loop_monitor=None,
+                             http_session=None) -> None:
+    """
+    Регистрирует метрики, значения которых берутся у компонентов при чтении.
+
+    Args:
+        outbox (OutboundQueue | None): Очередь исходящих сообщений.
+        lanes (UserLaneIsolation | None): Очереди обновлений пользователей.
+        storage (SQLStorage | None): FSM-хранилище с кэшем.
+        loop_monitor (LoopMonitor | None): Измеритель задержки цикла событий.
+        http_session (PooledAiohttpSession | None): HTTP-сессия бота с пулом соединений.
+    """
+    from services import drink_debounce, reminder_manager
+
+    CallbackMetric("reminders_pending", "Запланированные динамические напоминания",
+                   reminder_manager.pending_reminders_count)
+    CallbackMetric("drink_taps_pending", "Нажатия кнопок воды, ожидающие записи",
+                   drink_debounce.pending_taps_count)
+
+    def hits():
+        return {(name,): hit for name, (hit, miss) in _cache_stats(storage).items()}
+
+    def misses():
+        return {(name,): miss for name, (hit, miss) in _cache_stats(storage).items()}
+
+    def ratio():
+        return {(name,): hit / (hit + miss) if hit + miss else 0.0
+                for name, (hit, miss) in _cache_stats(storage).items()}
+
+    CallbackMetric("cache_hits_total", "Попадания в кэш", hits, ["cache"], "counter")
+    CallbackMetric("cache_misses_total", "Промахи кэша", misses, ["cache"], "counter")
+    CallbackMetric("cache_hit_ratio", "Доля попаданий в кэш", ratio, ["cache"])
+
+    if outbox is not None:
+        def outbox_stat(field):
+            return lambda: {
+                (name,): values[field] for name, values in outbox.stats().items() if name != "total"
+            }
+
+        CallbackMetric("outbox_messages_sent_total", "Отправленные запросы Bot API",
+                       outbox_stat("sent"), ["priority"], "counter")
+        CallbackMetric("outbox_messages_failed_total", "Запросы Bot API, завершившиеся ошибкой",
+                       outbox_stat("failed"), ["priority"], "counter")
+        CallbackMetric("outbox_queue_depth", "Запросы в очереди исходящих сообщений",
+                       outbox_stat("depth"), ["priority"])
+        CallbackMetric("outbox_latency_p95_seconds", "p95 задержки от постановки в очередь до отправки",
+                       outbox_stat("latency_p95"), ["priority"])
+        CallbackMetric("outbox_retries_total", "Повторы запросов Bot API",
+                       lambda: outbox.stats()["total"]["retries"], metric_type="counter")
+        CallbackMetric("outbox_flood_waits_total", "Ожидания flood control",
+                       lambda: outbox.stats()["total"]["flood_waits"], metric_type="counter")
+
+    if lanes is not None:
+        CallbackMetric("lanes_active", "Очереди пользователей с ожидающими обновлениями",
+                       lambda: lanes.stats()["lanes"])
+        CallbackMetric("lanes_rejected_total", "Отброшенные обновления (переполнена очередь пользователя)",
+                       lambda: lanes.stats()["rejected"], metric_type="counter")
+        CallbackMetric("lanes_wait_p95_seconds", "p95 ожидания обновления в очереди пользователя",
+                       lambda: lanes.stats()["wait_p95"])
+
+    if loop_monitor is not None:
+        CallbackMetric("event_loop_lag_max_seconds", "Максимальная задержка цикла событий с запуска",
+                       lambda: loop_monitor.max_lag)
+        CallbackMetric("event_loop_lag_recent_seconds", "Задержка цикла событий по последним измерениям",
+                       lambda: {(q,): loop_monitor.stats()[q] for q in ("p50", "p95", "p99", "recent_max")},
+                       ["quantile"])
+
+    if http_session is not None:
+        def http_stat(field):
+            return lambda: http_session.stats()[field]
+
+        CallbackMetric("bot_api_http_requests_total", "HTTP-запросы к Bot API",
+                       http_stat("requests"), metric_type="counter")
+        CallbackMetric("bot_api_http_requests_in_flight", "Выполняющиеся HTTP-запросы к Bot API",
+                       http_stat("in_flight"))
+        CallbackMetric("bot_api_http_connections_created_total", "Открытые соединения с Bot API",
+                       http_stat("connections_created"), metric_type="counter")
+        CallbackMetric("bot_api_http_connections_reused_total", "Запросы по уже открытому соединению",
+                       http_stat("connections_reused"), metric_type="counter")
+        CallbackMetric("bot_api_http_connection_reuse_ratio", "Доля запросов по уже открытому соединению",
+                       http_stat("reuse_ratio"))
+        CallbackMetric("bot_api_http_pool_waits_total", "Ожидания свободного соединения в пуле",
+                       http_stat("pool_waits"), metric_type="counter")
+        CallbackMetric("bot_api_http_pool_wait_seconds_total", "Суммарное ожидание свободного соединения",
+                       http_stat("pool_wait_seconds"), metric_type="counter")
+        CallbackMetric("bot_api_http_pool_limit", "Лимит соединений пула (0 — без ограничения)",
+                       http_stat("limit"))
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """
+    Запускает HTTP-сервер метрик.
+
+    Args:
+        host (str): Адрес (обычно 127.0.0.1 — наружу метрики не публикуются).
+        port (int): Порт.
+
+    Returns:
+        web.AppRunner: Runner для остановки сервера (runner.cleanup()).
+    """
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info("📈 Метрики доступны на http://%s:%s/metrics", host, port)
+    return runner
@@ -0,0 +1,304 @@
+"""
+Модуль централизованной очереди исходящих сообщений.
+
+Все вызовы Bot API, адресованные конкретному чату, проходят через общую
+очередь с классами приоритета: ответы пользователям (interactive) всегда
+обслуживаются раньше массовых рассылок (bulk). Очередь сохраняет порядок
+сообщений внутри одного чата, соблюдает общий лимит скорости отправки и
+повторяет запросы при flood control (TelegramRetryAfter) и сетевых ошибках.
+
+Подключается к сессии бота как request-middleware, поэтому хэндлеры
+продолжают вызывать message.answer() и bot.send_message() как обычно.
+"""
+
+import asyncio
+import itertools
+import logging
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Deque, Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Класс приоритета исходящего запроса (меньше — важнее)."""
+
+    INTERACTIVE = 0
+    BULK = 1
+
+
+_current_priority: ContextVar[Priority] = ContextVar("outbound_priority", default=Priority.INTERACTIVE)
+"""Приоритет запросов, отправляемых из текущего контекста выполнения."""
+
+
+@contextmanager
+def bulk_priority():
+    """
+    Помечает все запросы внутри блока как массовую рассылку.
+
+    Пример:
+        >>> with bulk_priority():
+        ...     await bot.send_message(chat_id, text)
+    """
+    token = _current_priority.set(Priority.BULK)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class _Job:
+    """Один отложенный запрос к Bot API."""
+
+    __slots__ = ("make_request", "bot", "method", "chat_id", "priority", "future", "enqueued_at", "attempts")
+
+    def __init__(self, make_request, bot: Bot, method: TelegramMethod, chat_id: Any, priority: Priority):
+        self.make_request = make_request
+        self.bot = bot
+        self.method = method
+        self.chat_id = chat_id
+        self.priority = priority
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = asyncio.get_running_loop().time()
+        self.attempts = 0
+
+
+class OutboundQueue(BaseRequestMiddleware):
+    """
+    Приоритетная очередь исходящих запросов с упорядочиванием по чатам.
+
+    Запросы без chat_id (getUpdates, answerCallbackQuery и т.п.) и запросы,
+    сделанные до запуска очереди, передаются в Bot API напрямую.
+
+    Args:
+        workers (int): Количество параллельных отправителей.
+        rate_limit (float): Общий лимит запросов в секунду (Telegram — около 30).
+        max_retries (int): Максимум повторов запроса при сетевых ошибках и flood control.
+        backoff_base (float): Базовая задержка экспоненциального backoff в секундах.
+        backoff_max (float): Верхняя граница задержки backoff в секундах.
+    """
+
+    def __init__(
+            self,
+            workers: int = 4,
+            rate_limit: float = 25.0,
+            max_retries: int = 5,
+            backoff_base: float = 0.5,
+            backoff_max: float = 30.0,
+    ):
+        self.workers = workers
+        self.rate_limit = rate_limit
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._ready: Optional[asyncio.PriorityQueue] = None
+        self._chats: Dict[Any, Deque[_Job]] = {}
+        self._scheduled: Dict[Any, Priority] = {}
+        self._processing: set = set()
+        self._seq = itertools.count()
+        self._tasks: List[asyncio.Task] = []
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+
+        self._depth = {priority: 0 for priority in Priority}
+        self._sent = {priority: 0 for priority in Priority}
+        self._failed = {priority: 0 for priority in Priority}
+        self._latency_sum = {priority: 0.0 for priority in Priority}
+        self._latency_max = {priority: 0.0 for priority in Priority}
+        self._latency_recent = {priority: deque(maxlen=1000) for priority in Priority}
+        self._retries = 0
+        self._flood_waits = 0
+
+    @property
+    def running(self) -> bool:
+        """Запущены ли обработчики очереди."""
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        """Запускает обработчики очереди в текущем event loop."""
+        if self._tasks:
+            return
+        self._ready = asyncio.PriorityQueue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info("📤 Outbound queue started (%s workers, %.1f req/s)", self.workers, self.rate_limit)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Останавливает очередь, дождавшись отправки накопленных сообщений.
+
+        Args:
+            timeout (float): Сколько секунд ждать опустошения очереди.
+        """
+        if not self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.depth() and loop.time() < deadline:
+            await asyncio.sleep(0.1)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Всё, что не успели отправить, завершаем ошибкой, чтобы не зависли ожидающие
+        for jobs in self._chats.values():
+            for job in jobs:
+                if not job.future.done():
+                    job.future.cancel()
+        self._chats.clear()
+        self._scheduled.clear()
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None or not self._tasks:
+            return await make_request(bot, method)
+
+        job = _Job(make_request, bot, method, chat_id, _current_priority.get())
+        self._enqueue(job)
+        return await job.future
+
+    def depth(self, priority: Priority | None = None) -> int:
+        """Количество запросов в очереди (всего или для одного приоритета)."""
+        if priority is None:
+            return sum(self._depth.values())
+        return self._depth[priority]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Возвращает метрики очереди.
+
+        Returns:
+            dict: Глубина очереди, число отправленных и неудачных запросов,
+            задержка от постановки в очередь до отправки (среднее, максимум,
+            p50/p95 по последним 1000 запросам) для каждого приоритета,
+            а также общее число повторов и ожиданий flood control.
+        """
+        result: Dict[str, Dict[str, Any]] = {}
+        for priority in Priority:
+            recent = sorted(self._latency_recent[priority])
+            sent = self._sent[priority]
+            result[priority.name.lower()] = {
+                "depth": self._depth[priority],
+                "sent": sent,
+                "failed": self._failed[priority],
+                "latency_avg": self._latency_sum[priority] / sent if sent else 0.0,
+                "latency_max": self._latency_max[priority],
+                "latency_p50": recent[len(recent) // 2] if recent else 0.0,
+                "latency_p95": recent[int(len(recent) * 0.95)] if recent else 0.0,
+            }
+        result["total"] = {"retries": self._retries, "flood_waits": self._flood_waits}
+        return result
+
+    def _enqueue(self, job: _Job) -> None:
+        """Добавляет запрос в очередь его чата и при необходимости планирует чат."""
+        self._chats.setdefault(job.chat_id, deque()).append(job)
+        self._depth[job.priority] += 1
+        if job.chat_id in self._processing:
+            return  # чат будет перепланирован после текущего запроса
+        scheduled = self._scheduled.get(job.chat_id)
+        if scheduled is None or job.priority < scheduled:
+            self._schedule_chat(job.chat_id, job.priority)
+
+    def _schedule_chat(self, chat_id: Any, priority: Priority) -> None:
+        self._scheduled[chat_id] = priority
+        self._ready.put_nowait((priority, next(self._seq), chat_id))
+
+    async def _worker(self) -> None:
+        """Обрабатывает чаты в порядке приоритета, по одному запросу за раз."""
+        while True:
+            priority, _, chat_id = await self._ready.get()
+            # Устаревшая запись: чат уже перепланирован с другим приоритетом
+            if self._scheduled.get(chat_id) != priority:
+                continue
+            del self._scheduled[chat_id]
+
+            jobs = self._chats[chat_id]
+            job = jobs.popleft()
+            self._depth[job.priority] -= 1
+            self._processing.add(chat_id)
+            try:
+                await self._process(job)
+            finally:
+                self._processing.discard(chat_id)
+                if jobs:
+                    self._schedule_chat(chat_id, min(pending.priority for pending in jobs))
+                else:
+                    del self._chats[chat_id]
+
+    async def _process(self, job: _Job) -> None:
+        """Отправляет запрос с соблюдением лимита скорости и повторами."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wait_for_slot()
+            job.attempts += 1
+            try:
+                result = await job.make_request(job.bot, job.method)
+            except TelegramRetryAfter as e:
+                # Flood control распространяется на весь бот — приостанавливаем всех
+                self._flood_waits += 1
+                self._paused_until = max(self._paused_until, loop.time() + e.retry_after)
+                logger.warning("⏳ Flood control: pausing outbound queue for %s s", e.retry_after)
+                if job.attempts > self.max_retries:
+                    self._fail(job, e)
+                    return
+                continue
+            except (TelegramNetworkError, TelegramServerError, asyncio.TimeoutError, OSError) as e:
+                if job.attempts > self.max_retries:
+                    self._fail(job, e)
+                    return
+                self._retries += 1
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (job.attempts - 1))
+                logger.warning("🌐 Outbound request to %s failed (%s), retry in %.1f s", job.chat_id, e, delay)
+                await asyncio.sleep(delay)
+                continue
+            except asyncio.CancelledError:
+                if not job.future.done():
+                    job.future.cancel()
+                raise
+            except Exception as e:
+                self._fail(job, e)
+                return
+
+            latency = loop.time() - job.enqueued_at
+            self._sent[job.priority] += 1
+            self._latency_sum[job.priority] += latency
+            self._latency_max[job.priority] = max(self._latency_max[job.priority], latency)
+            self._latency_recent[job.priority].append(latency)
+            if not job.future.done():
+                job.future.set_result(result)
+            return
+
+    def _fail(self, job: _Job, error: BaseException) -> None:
+        self._failed[job.priority] += 1
+        if not job.future.done():
+            job.future.set_exception(error)
+
+    async def _wait_for_slot(self) -> None:
+        """Ожидает окончания паузы flood control и свободного слота по лимиту скорости."""
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            if self._paused_until > now:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1 / self.rate_limit
+            if slot > now:
+                await asyncio.sleep(slot - now)
+            # Пока ждали слот, другой отправитель мог получить flood control
+            if self._paused_until <= loop.time():
+                return
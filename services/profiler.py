@@ -0,0 +1,226 @@
+"""
+Модуль выборочного профилирования обработки обновлений.
+
+Фоновый поток раз в несколько миллисекунд снимает стек главного потока
+(sys._current_frames) и относит снимок к обновлению, чей хэндлер сейчас
+выполняется. Если обновление ожидает (БД, Bot API, блокировку), вместо стека
+выполнения берётся цепочка await его задачи с листом «[await ...]» — так
+профиль показывает и время работы, и время ожидания.
+
+Профиль сохраняется для случайной доли обновлений и для всех обновлений
+медленнее порога, в формате folded stacks («кадр;кадр;кадр N»), который
+понимают flamegraph.pl, speedscope и inferno. Остальные снимки отбрасываются.
+Пока профилирование выключено, поток не запущен и затраты нулевые.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = 0.005
+"""Период снятия стека, секунды."""
+
+
+class _Record:
+    """Снимки одного профилируемого обновления."""
+
+    __slots__ = ("frame", "task", "started_at", "sampled", "samples")
+
+    def __init__(self, frame: FrameType, task: Optional[asyncio.Task], sampled: bool):
+        self.frame = frame
+        self.task = task
+        self.started_at = time.perf_counter()
+        self.sampled = sampled
+        self.samples: Counter = Counter()
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def user_hash(user_id: int, key: bytes) -> str:
+    """
+    Короткий хэш user_id для имён файлов (без раскрытия самого ID).
+
+    Хэш ключевой: Telegram ID — всего около 10^10 значений, и без секрета
+    ID по имени файла восстанавливается перебором за минуты.
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+        key (bytes): Секретный ключ BLAKE2s (до 32 байт).
+
+    Returns:
+        str: 10 шестнадцатеричных символов.
+    """
+    return hashlib.blake2s(str(user_id).encode(), digest_size=5, key=key).hexdigest()
+
+
+class UpdateProfiler:
+    """
+    Семплирующий профилировщик обновлений.
+
+    Args:
+        directory (str): Каталог для профилей.
+        sample_rate (float): Доля профилируемых обновлений (0 — только медленные).
+        slow_threshold (float): Порог длительности в секундах, после которого
+            профиль сохраняется всегда (0 — не использовать).
+        max_files (int): Сколько последних профилей хранить в каталоге.
+        interval (float): Период снятия стека, секунды.
+        hash_secret (str): Секрет для хэша user_id в именах файлов. Если пуст,
+            ключ случайный, и хэши одного пользователя меняются при перезапуске.
+    """
+
+    def __init__(self, directory: str = "data/profiles", sample_rate: float = 0.0,
+                 slow_threshold: float = 0.0, max_files: int = 200, interval: float = SAMPLE_INTERVAL,
+                 hash_secret: str = ""):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.max_files = max_files
+        self.interval = interval
+        self.dumped = 0
+        self._seq = 0
+        self._hash_key = (hashlib.blake2s(hash_secret.encode(), person=b"profiles").digest()
+                          if hash_secret else os.urandom(32))
+
+        self._inflight: Dict[int, _Record] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._thread_id: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Включено ли профилирование."""
+        return self.sample_rate > 0 or self.slow_threshold > 0
+
+    def configure(self, sample_rate: float | None = None, slow_threshold: float | None = None) -> None:
+        """
+        Меняет параметры на лету, без перезапуска бота.
+
+        Args:
+            sample_rate (float | None): Новая доля профилируемых обновлений.
+            slow_threshold (float | None): Новый порог медленного обновления, секунды.
+        """
+        if sample_rate is not None:
+            self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        if slow_threshold is not None:
+            self.slow_threshold = max(slow_threshold, 0.0)
+        logger.info("🔬 Профилирование: доля %.3f, порог %.0f мс",
+                    self.sample_rate, self.slow_threshold * 1000)
+
+    def begin(self, frame: FrameType) -> _Record:
+        """
+        Начинает сбор снимков для обновления.
+
+        Args:
+            frame (FrameType): Кадр middleware, внутри которого выполняется хэндлер.
+
+        Returns:
+            _Record: Запись, которую нужно передать в end().
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._thread_id = threading.get_ident()
+            self._thread = threading.Thread(target=self._run, name="update-profiler", daemon=True)
+            self._thread.start()
+        record = _Record(frame, asyncio.current_task(), random.random() < self.sample_rate)
+        self._inflight[id(frame)] = record
+        return record
+
+    def end(self, record: _Record, handler_name: str, user_id: int) -> None:
+        """
+        Завершает сбор и при необходимости сохраняет профиль.
+
+        Запись файла выполняется в пуле потоков, чтобы не блокировать цикл событий.
+
+        Args:
+            record (_Record): Запись из begin().
+            handler_name (str): Имя функции-хэндлера.
+            user_id (int): Telegram ID пользователя.
+        """
+        self._inflight.pop(id(record.frame), None)
+        duration = time.perf_counter() - record.started_at
+        slow = self.slow_threshold > 0 and duration >= self.slow_threshold
+        if not (record.sampled or slow) or not record.samples:
+            return
+        self._seq += 1
+        name = "{}-{:06d}_{}ms_{}_{}.folded".format(
+            time.strftime("%Y%m%d-%H%M%S"), self._seq % 1_000_000, int(duration * 1000),
+            handler_name, user_hash(user_id, self._hash_key),
+        )
+        asyncio.get_running_loop().run_in_executor(None, self._dump, name, dict(record.samples))
+
+    def _dump(self, name: str, samples: Dict[str, int]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, name), "w", encoding="utf-8") as file:
+            for stack, count in samples.items():
+                file.write(f"{stack} {count}\n")
+        self.dumped += 1
+
+        # Ротация: имена начинаются с времени, старые файлы идут первыми
+        files = sorted(entry for entry in os.listdir(self.directory) if entry.endswith(".folded"))
+        for old in files[:max(len(files) - self.max_files, 0)]:
+            try:
+                os.remove(os.path.join(self.directory, old))
+            except OSError:
+                pass
+
+    def _run(self) -> None:
+        """Цикл фонового потока: снимает стеки, пока профилирование включено."""
+        while self.enabled:
+            time.sleep(self.interval)
+            if self._inflight:
+                try:
+                    self._sample()
+                except Exception:
+                    logger.exception("❌ Ошибка снятия стека профилировщиком")
+
+    def _sample(self) -> None:
+        records = dict(self._inflight)
+        frame = sys._current_frames().get(self._thread_id)
+
+        # Стек выполняющегося кода: от листа к корню до кадра middleware
+        running: List[FrameType] = []
+        while frame is not None:
+            running.append(frame)
+            record = records.pop(id(frame), None)
+            if record is not None:
+                record.samples[";".join(_frame_name(f) for f in reversed(running))] += 1
+                break
+            frame = frame.f_back
+
+        # Остальные обновления ждут: берём цепочку await их задач
+        for record in records.values():
+            stack = self._await_stack(record)
+            if stack:
+                record.samples[stack] += 1
+
+    @staticmethod
+    def _await_stack(record: _Record) -> str | None:
+        if record.task is None:
+            return None
+        names: List[str] = []
+        awaitable: Any = record.task.get_coro()
+        found = False
+        while awaitable is not None:
+            frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+            if frame is None:
+                break
+            found = found or frame is record.frame
+            if found:
+                names.append(_frame_name(frame))
+            awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+        if not names:
+            return None
+        leaf = type(awaitable).__name__ if awaitable is not None else "?"
+        names.append(f"[await {leaf}]")
+        return ";".join(names)
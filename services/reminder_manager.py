@@ -4,25 +4,51 @@
 Реализует умные напоминания, которые срабатывают через заданный интервал
 после последнего приёма воды, с учётом дневного времени (9:00–21:00)
 и часового пояса пользователя.
+
+Время берётся из utils.clock, поэтому подсистему можно проигрывать
+в виртуальном времени (см. benchmarks/reminder_simulation.py).
 """
 
 import asyncio
-from datetime import datetime, time, timedelta, timezone
+from datetime import timedelta, timezone
 from typing import Dict
 import logging
-import pytz
 
 from aiogram import Bot
 from aiogram.exceptions import TelegramAPIError
 
-from database.queries import get_user, toggle_notifications
+from database.queries import get_user, get_user_streak, toggle_notifications
+from database.streaks import local_day
 from keyboards.inline import get_drink_quick_buttons
+from services.metrics import REMINDERS_SENT
+from services.outbox import bulk_priority
+from utils.clock import get_clock
 from utils.i18n import get_text, get_user_language
+from utils.timezones import REMINDER_WINDOW_START, get_user_timezone, is_within_reminder_window
 
 
 _active_reminders: Dict[int, asyncio.Task] = {}
 """Глобальное хранилище активных задач напоминаний по user_id."""
 
+_reminder_interval_minutes = 100
+"""Интервал напоминания после последнего приёма воды (устанавливается в main.py)."""
+
+
+def set_reminder_interval(minutes: int) -> None:
+    """
+    Устанавливает интервал напоминаний по умолчанию.
+
+    Args:
+        minutes (int): Интервал в минутах после последнего приёма воды.
+    """
+    global _reminder_interval_minutes
+    _reminder_interval_minutes = minutes
+
+
+def pending_reminders_count() -> int:
+    """Возвращает количество запланированных напоминаний."""
+    return len(_active_reminders)
+
 
 def cancel_reminder(user_id: int) -> None:
     """
@@ -42,6 +68,8 @@ async def _send_reminder(bot: Bot, user_id: int) -> None:
 
     Проверяет:
         - Включены ли напоминания у пользователя
+        - Не отмечал ли пользователь воду в течение интервала напоминаний
+          (например, через inline-кнопки) — тогда напоминание откладывается
         - Находится ли локальное время в диапазоне 9:00–21:00
         - Если вне диапазона — переносит напоминание на 9:00 следующего дня
 
@@ -54,25 +82,37 @@ async def _send_reminder(bot: Bot, user_id: int) -> None:
         if not user or not user.get("notifications_enabled"):
             return
 
-        # Определяем локальное время пользователя
-        tz_offset = user.get("timezone_offset", 0)  # в минутах от UTC
-        user_tz = pytz.FixedOffset(tz_offset)
-        now_local = datetime.now(timezone.utc).astimezone(user_tz).time()
-
-        # Проверка рабочих часов
-        if not time(9, 0) <= now_local <= time(21, 0):
+        now_utc = get_clock().now()
+
+        # Пользователь пил недавно — переносим напоминание на конец интервала
+        last_intake_at = user.get("last_intake_at")
+        if last_intake_at is not None:
+            if last_intake_at.tzinfo is None:
+                last_intake_at = last_intake_at.replace(tzinfo=timezone.utc)
+            due = last_intake_at + timedelta(minutes=_reminder_interval_minutes)
+            if due > now_utc:
+                _schedule_reminder(bot, user_id, (due - now_utc).total_seconds())
+                return
+
+        # Проверка рабочих часов по локальному времени пользователя
+        tz_offset = user.get("timezone_offset") or 0  # в минутах от UTC
+        if not is_within_reminder_window(tz_offset, now_utc):
             delay = _get_delay_to_next_morning(tz_offset)
             _schedule_reminder(bot, user_id, delay)
             return
 
         # Отправка напоминания
-        lang = get_user_language(user.get("language"), "en")
+        lang = await get_user_language(user, user_id, "en")
         msg = get_text("reminders.notification", lang)
+        streak = await get_user_streak(user_id)
+        if streak:
+            msg += streak_reminder_suffix(streak, local_day(now_utc, tz_offset), lang)
         await bot.send_message(
             chat_id=user_id,
             text=msg,
             reply_markup=get_drink_quick_buttons(lang)
         )
+        REMINDERS_SENT.inc("dynamic")
 
     except TelegramAPIError as e:
         # Ожидаемые ошибки Telegram: пользователь заблокировал, чат не найден и т.д.
@@ -89,6 +129,25 @@ async def _send_reminder(bot: Bot, user_id: int) -> None:
         raise  # Перебрасываем, чтобы не скрывать баги
 
 
+def streak_reminder_suffix(streak, today, lang: str) -> str:
+    """
+    Возвращает строку о серии для текста напоминания.
+
+    Напоминаем о серии, только если она жива и сегодня норма ещё не выполнена.
+
+    Args:
+        streak (Mapping): Колонки current_streak и last_goal_day из user_streaks.
+        today (date): Локальная дата пользователя.
+        lang (str): Код языка.
+
+    Returns:
+        str: Текст с переводом строки в начале или пустая строка.
+    """
+    if not streak["current_streak"] or streak["last_goal_day"] != today - timedelta(days=1):
+        return ""
+    return "\n\n" + get_text("reminders.streak", lang, days=streak["current_streak"])
+
+
 def _get_delay_to_next_morning(tz_offset: int) -> float:
     """
     Вычисляет задержку до 9:00 следующего дня в секундах.
@@ -99,11 +158,10 @@ def _get_delay_to_next_morning(tz_offset: int) -> float:
     Returns:
         float: Задержка в секундах (минимум 60 сек).
     """
-    now_utc = datetime.now(timezone.utc)
-    user_tz = pytz.FixedOffset(tz_offset)
-    now_local = now_utc.astimezone(user_tz)
+    now_utc = get_clock().now()
+    now_local = now_utc.astimezone(get_user_timezone(tz_offset))
     next_morning = now_local.replace(hour=9, minute=0, second=0, microsecond=0)
-    if now_local.time() >= time(9, 0):
+    if now_local.time() >= REMINDER_WINDOW_START:
         next_morning += timedelta(days=1)
     delay = (next_morning - now_local).total_seconds()
     return max(delay, 60)
@@ -119,24 +177,34 @@ def _schedule_reminder(bot: Bot, user_id: int, delay: float) -> None:
         delay (float): Задержка в секундах.
     """
     async def wrapper():
-        await asyncio.sleep(delay)
-        await _send_reminder(bot, user_id)
+        await get_clock().sleep(delay)
+        with bulk_priority():
+            await _send_reminder(bot, user_id)
 
     task = asyncio.create_task(wrapper())
     _active_reminders[user_id] = task
+    task.add_done_callback(lambda done: _forget_reminder(user_id, done))
+
+
+def _forget_reminder(user_id: int, task: asyncio.Task) -> None:
+    """Убирает завершившуюся задачу, если её ещё не заменило новое напоминание."""
+    if _active_reminders.get(user_id) is task:
+        del _active_reminders[user_id]
 
 
-def schedule_next_reminder(bot: Bot, user_id: int, minutes: int = 120) -> None:
+def schedule_next_reminder(bot: Bot, user_id: int, minutes: int | None = None) -> None:
     """
-    Планирует новое напоминание через N часов после последнего действия.
+    Планирует новое напоминание через N минут после последнего действия.
 
     Автоматически отменяет предыдущее напоминание для этого пользователя.
 
     Args:
         bot (Bot): Экземпляр бота.
         user_id (int): Telegram ID пользователя.
-        hours (int): Интервал в часах (по умолчанию 2).
+        minutes (int | None): Интервал в минутах (по умолчанию — из настроек).
     """
     cancel_reminder(user_id)
+    if minutes is None:
+        minutes = _reminder_interval_minutes
     delay_seconds = minutes * 60
     _schedule_reminder(bot, user_id, delay_seconds)
@@ -4,40 +4,73 @@
 Используется для периодических задач, не зависящих от действий пользователя
 (например, очистка старых записей, аналитика).
 """
-from datetime import datetime, time, timezone, timedelta
+from datetime import date, datetime, timedelta, timezone
+import numpy as np
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-import pytz
 
-from database.queries import get_all_active_users
+from database.queries import (
+    get_all_active_users,
+    get_active_timezone_offsets,
+    get_day_totals_by_user,
+    save_community_stats,
+)
+from utils.clock import get_clock
 from utils.i18n import get_text
+from utils.timezones import offsets_in_reminder_window
 from keyboards.inline import get_drink_quick_buttons
+from database.streaks import local_day
+from services.digest import configure as configure_digest, prepare_weekly_digests, send_due_digests
+from services.metrics import REMINDERS_SENT
+from services.reminder_manager import streak_reminder_suffix
+from services.outbox import bulk_priority
 
 # Глобальный бот (будет установлен в main.py)
 _bot = None
 
+# Интервал между напоминаниями в минутах (будет установлен в main.py)
+_interval_minutes = 100
+
+# Сколько мест хранить в таблице лидеров за сутки
+LEADERBOARD_SIZE = 10
+
 def set_bot(bot):
     global _bot
     _bot = bot
 
+def set_interval(minutes: int):
+    global _interval_minutes
+    _interval_minutes = minutes
+
 async def send_water_reminder():
-    """Отправляет напоминание всем активным пользователям"""
+    """
+    Отправляет напоминание активным пользователям, у которых сейчас день.
+
+    Окно 9:00–21:00 по локальному времени проверяется по набору смещений
+    часовых поясов, а не по каждому пользователю: из БД выбираются только те,
+    кому можно написать прямо сейчас. Пользователи, отметившие воду за последний
+    интервал напоминаний, пропускаются.
+    """
     if _bot is None:
         return
 
-    users = await get_all_active_users()
-    now_utc = datetime.now(timezone.utc)
+    now_utc = get_clock().now()
+    offsets = offsets_in_reminder_window(await get_active_timezone_offsets(), now_utc)
+    if not offsets:
+        return
 
-    for user in users:
-        try:
-            # Определяем локальное время пользователя
-            tz_offset = user["timezone_offset"]  # в минутах от UTC
-            user_tz = pytz.FixedOffset(tz_offset)
-            local_time = now_utc.astimezone(user_tz).time()
+    users = await get_all_active_users(
+        timezone_offsets=offsets,
+        idle_since=now_utc - timedelta(minutes=_interval_minutes),
+        with_streaks=True,
+    )
 
-            # Отправляем напоминание только в рабочие часы (9:00–21:00)
-            if time(9, 0) <= local_time <= time(21, 0):
+    # Рассылка идёт с низким приоритетом и не задерживает ответы хэндлеров
+    with bulk_priority():
+        for user in users:
+            try:
                 lang = user["language"] or "ru"
                 msg = get_text("reminders.notification", lang)
+                msg += streak_reminder_suffix(user, local_day(now_utc, user["timezone_offset"]), lang)
 
                 # Добавляем быстрые кнопки
                 await _bot.send_message(
@@ -45,19 +78,82 @@ async def send_water_reminder():
                     text=msg,
                     reply_markup=get_drink_quick_buttons(lang)
                 )
-        except Exception as e:
-            print(f"Failed to send reminder: {e}")
+                REMINDERS_SENT.inc("periodic")
+            except Exception as e:
+                print(f"Failed to send reminder: {e}")
+
+async def update_community_stats(day: date | None = None):
+    """
+    Пересчитывает суточную сводку сообщества: процентили и таблицу лидеров.
+
+    Суммы по пользователям приходят одним сгруппированным запросом, дальше
+    всё считается векторно: 101 точка разбиения (процентили 0..100) через
+    np.percentile и первые LEADERBOARD_SIZE участников через argpartition.
+    Хэндлеры отвечают по сохранённым точкам бинарным поиском.
+
+    Args:
+        day (date | None): Сутки UTC (по умолчанию — вчерашние).
+    """
+    if day is None:
+        day = get_clock().now().date() - timedelta(days=1)
+    rows = await get_day_totals_by_user(day)
+    if not rows:
+        return
+
+    user_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    totals = np.fromiter((row[1] or 0 for row in rows), dtype=np.int64, count=len(rows))
+    opted_in = np.fromiter((bool(row[2]) for row in rows), dtype=bool, count=len(rows))
 
-async def setup_scheduler(bot):
+    cut_points = np.percentile(totals, np.arange(101)).round(1).tolist()
+
+    candidates = np.flatnonzero(opted_in)
+    if candidates.size > LEADERBOARD_SIZE:
+        candidates = candidates[np.argpartition(-totals[candidates], LEADERBOARD_SIZE - 1)[:LEADERBOARD_SIZE]]
+    order = candidates[np.argsort(-totals[candidates], kind="stable")]
+    top = [(int(user_ids[index]), int(totals[index])) for index in order]
+
+    await save_community_stats(day, len(rows), cut_points, top)
+
+async def setup_scheduler(bot, interval_minutes: int = 100, digest_processes: int = 2, digest_send_hour: int = 9):
     """Запускает планировщик напоминаний"""
     set_bot(bot)
+    set_interval(interval_minutes)
+    configure_digest(digest_processes, digest_send_hour)
     scheduler = AsyncIOScheduler()
-    # Напоминание каждые 2 часа
+    # Периодическое напоминание
     scheduler.add_job(
         send_water_reminder,
         'interval',
-        minutes=100,
+        minutes=interval_minutes,
         next_run_time=datetime.now() + timedelta(seconds=10)
     )
+    # Сводка за прошедшие сутки UTC; первый расчёт — вскоре после запуска,
+    # чтобы закрыть сутки, пропущенные во время простоя
+    scheduler.add_job(
+        update_community_stats,
+        'cron',
+        hour=0,
+        minute=5,
+        timezone=timezone.utc,
+        next_run_time=datetime.now(timezone.utc) + timedelta(seconds=30)
+    )
+    # Еженедельные отчёты: отрисовка ночью в понедельник (UTC), при запуске —
+    # продолжение прерванной работы; отправка — по мере наступления утра у пользователей
+    scheduler.add_job(
+        prepare_weekly_digests,
+        'cron',
+        day_of_week='mon',
+        hour=0,
+        minute=30,
+        timezone=timezone.utc,
+        next_run_time=datetime.now(timezone.utc) + timedelta(seconds=60)
+    )
+    scheduler.add_job(
+        send_due_digests,
+        'interval',
+        minutes=5,
+        args=[bot],
+        next_run_time=datetime.now(timezone.utc) + timedelta(seconds=90)
+    )
     scheduler.start()
     print("✅ Scheduler started")
@@ -0,0 +1,130 @@
+"""
+Модуль приёма обновлений через webhook (альтернатива long polling).
+
+Поднимает aiohttp-сервер, который принимает обновления от Telegram POST-запросами,
+сразу отвечает HTTP 200 и обрабатывает обновление в фоне. Количество
+одновременно обрабатываемых обновлений ограничено: при заполнении лимита
+ответ задерживается до освобождения слота, и Telegram сам снижает темп доставки.
+
+Для локальной проверки достаточно отправить записанное обновление:
+    curl -X POST -H "Content-Type: application/json" \\
+         -H "X-Telegram-Bot-Api-Secret-Token: <секрет>" \\
+         -d @update.json http://127.0.0.1:8080/webhook
+Если webhook_url не задан, регистрация webhook в Telegram не выполняется.
+"""
+
+import asyncio
+import logging
+from typing import Any
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+
+from config import Settings
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+"""Заголовок, в котором Telegram передаёт секретный токен webhook."""
+
+
+def create_webhook_app(
+        dp: Dispatcher,
+        bot: Bot,
+        path: str = "/webhook",
+        secret_token: str = "",
+        max_in_flight: int = 100,
+        **workflow_data: Any,
+) -> web.Application:
+    """
+    Создаёт aiohttp-приложение для приёма обновлений.
+
+    Args:
+        dp (Dispatcher): Диспетчер, которому передаются обновления.
+        bot (Bot): Экземпляр бота.
+        path (str): Путь, на который Telegram отправляет обновления.
+        secret_token (str): Секрет для проверки заголовка запроса (пустой — без проверки).
+        max_in_flight (int): Максимум одновременно обрабатываемых обновлений.
+        **workflow_data: Дополнительные данные для хэндлеров (как в start_polling).
+
+    Returns:
+        web.Application: Приложение с единственным POST-маршрутом.
+    """
+    semaphore = asyncio.Semaphore(max_in_flight)
+    in_flight: set = set()
+
+    async def process_update(update: dict) -> None:
+        try:
+            await dp.feed_raw_update(bot, update, **workflow_data)
+        except Exception:
+            logger.exception("❌ Ошибка обработки обновления %s", update.get("update_id"))
+        finally:
+            semaphore.release()
+
+    async def handle(request: web.Request) -> web.Response:
+        if secret_token and request.headers.get(SECRET_HEADER) != secret_token:
+            return web.Response(status=401)
+        try:
+            update = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+
+        # Ждём свободный слот: пока он занят, Telegram не получает ответ
+        # и не присылает следующие обновления
+        await semaphore.acquire()
+        task = asyncio.create_task(process_update(update))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+        return web.Response(status=200)
+
+    async def on_shutdown(app: web.Application) -> None:
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+    app = web.Application()
+    app.router.add_post(path, handle)
+    app.on_shutdown.append(on_shutdown)
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, settings: Settings, **workflow_data: Any) -> None:
+    """
+    Запускает webhook-сервер и работает до остановки процесса.
+
+    Args:
+        dp (Dispatcher): Диспетчер.
+        bot (Bot): Экземпляр бота.
+        settings (Settings): Конфигурация (параметры webhook_*).
+        **workflow_data: Дополнительные данные для хэндлеров.
+    """
+    app = create_webhook_app(
+        dp,
+        bot,
+        path=settings.webhook_path,
+        secret_token=settings.webhook_secret,
+        max_in_flight=settings.webhook_max_in_flight,
+        **workflow_data,
+    )
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.webhook_host, settings.webhook_port)
+
+    await dp.emit_startup(bot=bot, **workflow_data)
+    await site.start()
+    logger.info("🌐 Webhook слушает %s:%s%s", settings.webhook_host, settings.webhook_port, settings.webhook_path)
+
+    if settings.webhook_url:
+        await bot.set_webhook(
+            url=settings.webhook_url.rstrip("/") + settings.webhook_path,
+            secret_token=settings.webhook_secret or None,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=min(settings.webhook_max_in_flight, 100),
+        )
+        logger.info("✅ Webhook зарегистрирован в Telegram")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await dp.emit_shutdown(bot=bot, **workflow_data)
+        await bot.session.close()
@@ -0,0 +1,18 @@
+"""
+Общие настройки тестов.
+
+database/engine.py читает DB_PATH при импорте, поэтому окружение
+готовится здесь — до импорта модулей бота.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(prefix="aquatrack-tests-"), "test.db"))
+os.environ.setdefault("BOT_TOKEN", "42:TEST")
+os.environ["I18N_AUTO_GENERATE"] = "0"
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
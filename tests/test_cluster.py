@@ -0,0 +1,57 @@
+"""Тесты надзора за процессами-обработчиками (services/cluster.py)."""
+import asyncio
+import os
+import time
+
+from services import cluster
+from services.cluster import WorkerSupervisor
+
+
+def _crashing_worker(index, queue):
+    """Обработчик, который падает на обновлении "crash"."""
+    while True:
+        raw = queue.get()
+        if raw is None:
+            return
+        if raw == "crash":
+            os._exit(1)
+
+
+def _stuck_worker(index, queue):
+    """Обработчик, который не разбирает очередь."""
+    time.sleep(60)
+
+
+def test_dead_worker_is_restarted_with_a_new_queue():
+    async def scenario():
+        workers = WorkerSupervisor(1, target=_crashing_worker)
+        workers.start()
+        first = workers.processes[0]
+        assert await workers.put(0, "crash")
+        await asyncio.get_running_loop().run_in_executor(None, first.join, 10)
+        assert await workers.put(0, {"update_id": 1})
+        restarted = workers.processes[0]
+        await workers.stop()
+        return workers.restarts, first.exitcode, restarted is not first, restarted.exitcode
+
+    assert asyncio.run(scenario()) == (1, 1, True, 0)
+
+
+def test_full_queue_drops_the_update_instead_of_blocking(monkeypatch):
+    monkeypatch.setattr(cluster, "WORKER_QUEUE_SIZE", 1)
+    monkeypatch.setattr(cluster, "WORKER_PUT_TIMEOUT", 0.1)
+    monkeypatch.setattr(cluster, "WORKER_PUT_ATTEMPTS", 2)
+
+    async def scenario():
+        workers = WorkerSupervisor(1, target=_stuck_worker)
+        workers.start()
+        accepted = [await workers.put(0, {"update_id": update_id}) for update_id in (1, 2)]
+        started = time.monotonic()
+        await workers.stop(timeout=1)
+        return accepted, workers.dropped, workers.processes[0].is_alive(), time.monotonic() - started
+
+    accepted, dropped, alive, stop_seconds = asyncio.run(scenario())
+    assert accepted == [True, False]
+    assert dropped == 1
+    assert not alive
+    assert stop_seconds < 5
@@ -0,0 +1,98 @@
+"""Тесты объединения нажатий быстрых кнопок (services/drink_debounce.py)."""
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from services import drink_debounce
+from services.drink_debounce import add_tap, flush_all
+from utils.i18n import get_text, load_locales
+
+USER_ID = 7
+
+
+class _Message:
+    """Сообщение с кнопками: запоминает тексты редактирования."""
+
+    def __init__(self):
+        self.edits = []
+
+    async def edit_text(self, text):
+        self.edits.append(text)
+
+
+@pytest.fixture(autouse=True)
+def writes(monkeypatch):
+    """Настраивает короткие задержки; возвращает список вызовов add_intakes."""
+    monkeypatch.chdir(Path(__file__).resolve().parent.parent)
+    load_locales()
+    monkeypatch.setattr(drink_debounce, "_window", 0.05)
+    monkeypatch.setattr(drink_debounce, "RETRY_DELAY", 0.01)
+    calls = []
+    yield calls
+    assert not drink_debounce._bursts and not drink_debounce._tasks
+
+
+def _amounts(taps):
+    return [amount for _, amount in taps]
+
+
+def test_taps_within_the_window_are_written_once(monkeypatch, writes):
+    async def add_intakes(user_id, taps):
+        writes.append((user_id, _amounts(taps)))
+
+    monkeypatch.setattr(drink_debounce, "add_intakes", add_intakes)
+    message = _Message()
+
+    async def scenario():
+        totals = [add_tap(USER_ID, amount, message, "ru") for amount in (200, 200, 300)]
+        await asyncio.sleep(0.2)
+        return totals
+
+    assert asyncio.run(scenario()) == [200, 400, 700]
+    assert writes == [(USER_ID, [200, 200, 300])]
+    assert message.edits == [get_text("drink.added", "ru", amount=700)]
+
+
+def test_failed_write_requeues_taps_ahead_of_later_ones(monkeypatch, writes):
+    message = _Message()
+
+    async def add_intakes(user_id, taps):
+        writes.append(_amounts(taps))
+        if len(writes) == 1:
+            add_tap(USER_ID, 500, message, "ru")  # нажатие во время записи
+        raise OSError("database is locked")
+
+    monkeypatch.setattr(drink_debounce, "add_intakes", add_intakes)
+
+    async def scenario():
+        add_tap(USER_ID, 200, message, "ru")
+        add_tap(USER_ID, 300, message, "ru")
+        while drink_debounce._tasks:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert writes == [[200, 300]] + [[200, 300, 500]] * (drink_debounce.MAX_FLUSH_ATTEMPTS - 1)
+    assert message.edits == [get_text("drink.save_failed", "ru", amount=1000)]
+
+
+def test_flush_all_drains_taps_requeued_by_a_running_write(monkeypatch, writes):
+    message = _Message()
+
+    async def add_intakes(user_id, taps):
+        writes.append(_amounts(taps))
+        if len(writes) == 1:
+            await asyncio.sleep(0.05)
+            raise OSError("database is locked")
+
+    monkeypatch.setattr(drink_debounce, "add_intakes", add_intakes)
+
+    async def scenario():
+        add_tap(USER_ID, 250, message, "ru")
+        while not writes:
+            await asyncio.sleep(0.01)  # запись началась
+        await flush_all()
+
+    asyncio.run(scenario())
+    assert writes == [[250], [250]]
+    assert message.edits == [get_text("drink.added", "ru", amount=250)]
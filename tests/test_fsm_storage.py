@@ -0,0 +1,26 @@
+"""Тесты FSM-хранилища (database/fsm_storage.py)."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from aiogram.fsm.storage.base import StorageKey
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database.engine import create_sqlite_engine, init_schema
+from database.fsm_storage import SQLStorage, _Record
+
+
+def test_purge_expired_checks_the_whole_cache(tmp_path):
+    async def purge():
+        engine = create_sqlite_engine(str(tmp_path / "fsm.db"))
+        await init_schema(engine)
+        storage = SQLStorage(session_factory=async_sessionmaker(bind=engine, expire_on_commit=False))
+        stale, fresh = (StorageKey(bot_id=42, chat_id=user_id, user_id=user_id) for user_id in (1, 2))
+        storage._remember(storage._key(fresh), _Record("Form:weight"))
+        # Устаревшую запись недавно читали — она в конце LRU, после свежей
+        two_days_ago = datetime.now(timezone.utc) - timedelta(days=2)
+        storage._remember(storage._key(stale), _Record("Form:weight", updated_at=two_days_ago))
+        await storage.purge_expired()
+        await engine.dispose()
+        return list(storage._cache)
+
+    assert asyncio.run(purge()) == ["42:2:2:::default"]
@@ -0,0 +1,82 @@
+"""Тесты импорта истории из CSV (services/intake_import.py)."""
+import asyncio
+import io
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from database.engine import dispose_engines, init_db, session_for
+from database.models import intakes
+from database.queries import create_or_update_user
+from services import intake_import
+from services.intake_import import import_intakes
+
+DAILY_EXPORT = "date,amount_ml\n2025-01-05,250\n2025-01-05,250\n2025-01-05,250\n2025-01-06,300\n"
+
+
+def _run(user_id: int, *files: str, tz_offset: int = 0):
+    """Импортирует файлы по очереди; возвращает отчёты и записи пользователя."""
+    async def scenario():
+        await init_db()
+        await create_or_update_user(user_id, timezone_offset=tz_offset)
+        reports = [await import_intakes(user_id, io.StringIO(text), tz_offset) for text in files]
+        async with session_for(user_id)() as session:
+            result = await session.execute(
+                select(intakes.c.timestamp, intakes.c.amount_ml)
+                .where(intakes.c.user_id == user_id)
+                .order_by(intakes.c.timestamp, intakes.c.amount_ml)
+            )
+            rows = [tuple(row) for row in result]
+        await dispose_engines()
+        return reports, rows
+
+    return asyncio.run(scenario())
+
+
+def _counts(report: dict) -> tuple:
+    return report["inserted"], report["duplicates"], report["invalid"]
+
+
+def test_repeated_rows_in_one_file_are_all_imported():
+    (report,), rows = _run(101, DAILY_EXPORT)
+    assert _counts(report) == (4, 0, 0)
+    assert sum(amount for _, amount in rows) == 1050
+
+
+def test_reimporting_the_same_file_adds_nothing():
+    (first, second), rows = _run(102, DAILY_EXPORT, DAILY_EXPORT)
+    assert _counts(first) == (4, 0, 0)
+    assert _counts(second) == (0, 4, 0)
+    assert len(rows) == 4
+
+
+def test_existing_rows_absorb_repeats_across_chunks(monkeypatch):
+    monkeypatch.setattr(intake_import, "IMPORT_CHUNK", 2)
+    (first, second), rows = _run(103, "date,amount_ml\n2025-01-05,250\n", DAILY_EXPORT)
+    assert _counts(first) == (1, 0, 0)
+    # Одна из трёх строк 2025-01-05 уже была в БД, остальные — новые приёмы
+    assert _counts(second) == (3, 1, 0)
+    assert len(rows) == 4
+
+
+def test_liters_are_converted_to_ml():
+    (report,), rows = _run(104, "timestamp;liters\n2025-01-05 08:00;0,5\n2025-01-05 09:00;1.25\n")
+    assert _counts(report) == (2, 0, 0)
+    assert [amount for _, amount in rows] == [500, 1250]
+
+
+def test_naive_times_are_local_and_offsets_are_kept():
+    text = (
+        "timestamp,amount_ml\n"
+        "2025-01-05 09:00,200\n"           # местное время UTC+3
+        "2025-01-05T09:00:00+01:00,300\n"  # явное смещение
+        "2025-01-05T09:00:00Z,400\n"
+    )
+    (report,), rows = _run(105, text, tz_offset=180)
+    assert _counts(report) == (3, 0, 0)
+    assert rows == [
+        (datetime(2025, 1, 5, 6, 0), 200),
+        (datetime(2025, 1, 5, 8, 0), 300),
+        (datetime(2025, 1, 5, 9, 0), 400),
+    ]
+    assert report["first"] == datetime(2025, 1, 5, 6, 0, tzinfo=timezone.utc)
@@ -0,0 +1,32 @@
+"""Тесты очереди исходящих сообщений (services/outbox.py)."""
+import asyncio
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from services.outbox import OutboundQueue
+
+
+def test_endless_flood_control_fails_the_request():
+    method = SendMessage(chat_id=1, text="💧")
+    calls = []
+
+    async def make_request(bot, request):
+        calls.append(request)
+        raise TelegramRetryAfter(method=request, message="Too Many Requests", retry_after=0)
+
+    async def send():
+        queue = OutboundQueue(workers=1, rate_limit=1000, max_retries=2)
+        queue.start()
+        try:
+            with pytest.raises(TelegramRetryAfter):
+                await asyncio.wait_for(queue(make_request, None, method), timeout=5)
+            return queue.stats()
+        finally:
+            await queue.stop(timeout=0)
+
+    stats = asyncio.run(send())
+    assert len(calls) == 3
+    assert stats["interactive"]["failed"] == 1
+    assert stats["total"]["flood_waits"] == 3
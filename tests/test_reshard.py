@@ -0,0 +1,81 @@
+"""Тесты перераспределения данных между шардами (database/reshard.py)."""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, insert, select
+
+from database import reshard as reshard_module
+from database.engine import create_sqlite_engine, init_schema, shard_for, shard_path
+from database.models import intakes, user_streaks, users
+from database.reshard import reshard
+
+USERS = range(1, 24)
+
+
+async def _seed(base: str) -> None:
+    """Создаёт основной файл с пользователями, их записями и сериями."""
+    engine = create_sqlite_engine(base)
+    await init_schema(engine)
+    now = datetime(2026, 1, 1, 12, 0)
+    async with engine.begin() as conn:
+        await conn.execute(insert(users), [{"user_id": user_id, "daily_goal_ml": 2000} for user_id in USERS])
+        await conn.execute(insert(intakes), [
+            {"user_id": user_id, "amount_ml": 250, "timestamp": now + timedelta(minutes=index)}
+            for user_id in USERS for index in range(user_id % 3 + 1)
+        ])
+        await conn.execute(insert(user_streaks), [{"user_id": user_id, "current_streak": 1} for user_id in USERS])
+    await engine.dispose()
+
+
+async def _contents(base: str, shards: int) -> dict:
+    """Возвращает {шард: {таблица: [(user_id, число строк)]}}."""
+    contents = {}
+    for index in range(shards):
+        engine = create_sqlite_engine(shard_path(index, base))
+        async with engine.connect() as conn:
+            contents[index] = {
+                table.name: sorted((await conn.execute(
+                    select(table.c.user_id, func.count()).group_by(table.c.user_id)
+                )).all())
+                for table in (users, intakes, user_streaks)
+            }
+        await engine.dispose()
+    return contents
+
+
+def test_reshard_moves_every_user_to_its_shard(tmp_path):
+    base = str(tmp_path / "bot.db")
+    asyncio.run(_seed(base))
+
+    result = asyncio.run(reshard(4, 1, batch=5, base=base))
+
+    assert result["users"] == len(USERS)
+    assert result["intakes"] == sum(user_id % 3 + 1 for user_id in USERS)
+    for index, tables in asyncio.run(_contents(base, 4)).items():
+        assert all(shard_for(user_id, 4) == index for user_id, _ in tables["users"])
+
+
+def test_interrupted_reshard_can_be_rerun(tmp_path, monkeypatch):
+    base = str(tmp_path / "bot.db")
+    asyncio.run(_seed(base))
+    expected = asyncio.run(_contents(base, 1))[0]
+
+    # Сбой между фиксацией копии в целевом шарде и удалением из исходного:
+    # строки первой пачки остаются в обоих файлах
+    async def failing_delete(source, user_ids):
+        raise OSError("disk I/O error")
+
+    monkeypatch.setattr(reshard_module, "_delete", failing_delete)
+    with pytest.raises(OSError):
+        asyncio.run(reshard(4, 1, batch=5, base=base))
+    monkeypatch.undo()
+
+    result = asyncio.run(reshard(4, 1, batch=5, base=base))
+
+    assert result["users"] == len(USERS)
+    merged = {name: [] for name in expected}
+    for tables in asyncio.run(_contents(base, 4)).values():
+        for name, rows in tables.items():
+            merged[name].extend(rows)
+    assert {name: sorted(rows) for name, rows in merged.items()} == expected
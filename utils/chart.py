@@ -2,19 +2,26 @@
 Модуль генерации графиков статистики.
 
 Создаёт изображения с графиками потребления воды за неделю
-с использованием matplotlib. Поддерживает несколько языков.
+и календарную тепловую карту истории с использованием matplotlib.
+Поддерживает несколько языков.
 """
 
+import io
 import os
-from datetime import datetime, timedelta, timezone
+import time
+from datetime import date, datetime, timedelta, timezone
 from typing import Dict
 import matplotlib
 import matplotlib.pyplot as plt
+import numpy as np
 
 from utils.i18n import get_loc_list, get_text
+from utils.metrics import Histogram
 
 matplotlib.use('Agg')  # Используем backend без GUI
 
+CHART_RENDER_SECONDS = Histogram("chart_render_duration_seconds", "Длительность построения графика", ["chart"])
+
 
 def generate_weekly_chart(
         weekly_data: Dict[str, int],
@@ -36,14 +43,66 @@ def generate_weekly_chart(
         Использует backend Agg для работы без GUI.
         Файл сохраняется в папку temp/.
     """
+    started_at = time.perf_counter()
+    _plot_weekly_chart(weekly_data, goal_ml, lang)
+
+    # Сохранение
+    os.makedirs("temp", exist_ok=True)
+    filename = f"temp/chart_{hash(str(weekly_data)) % 1000000}.png"
+    plt.savefig(filename, dpi=150, bbox_inches='tight')
+    plt.close()  # Освобождаем память
+
+    CHART_RENDER_SECONDS.observe(time.perf_counter() - started_at, "weekly")
+    return filename
+
+
+def render_weekly_chart_png(
+        weekly_data: Dict[str, int],
+        goal_ml: int,
+        lang: str,
+        end_date: date
+) -> bytes:
+    """
+    Строит недельную диаграмму и возвращает PNG в памяти.
+
+    Используется для еженедельных отчётов: выполняется в процессах пула
+    (services/digest.py), поэтому принимает и возвращает только простые
+    данные и не пишет временных файлов.
+
+    Args:
+        weekly_data (dict): Словарь вида {"YYYY-MM-DD": total_ml}.
+        goal_ml (int): Суточная цель потребления воды в мл.
+        lang (str): Код языка для подписей.
+        end_date (date): Последний день недели на диаграмме.
+
+    Returns:
+        bytes: Содержимое PNG-файла.
+    """
+    started_at = time.perf_counter()
+    _plot_weekly_chart(weekly_data, goal_ml, lang, end_date)
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format="png", dpi=120, bbox_inches='tight')
+    plt.close()
+
+    CHART_RENDER_SECONDS.observe(time.perf_counter() - started_at, "digest")
+    return buffer.getvalue()
+
+
+def _plot_weekly_chart(
+        weekly_data: Dict[str, int],
+        goal_ml: int,
+        lang: str,
+        end_date: date | None = None
+) -> None:
+    """Рисует недельную диаграмму на текущей фигуре pyplot (7 дней по end_date включительно)."""
     # Настройка локали для подписей
     labels = get_loc_list("weekday", lang)
     units = get_text("ml", lang)
     goal = get_text("analyze.goal", lang)
 
     # Подготовка данных
-    today = datetime.now(timezone.utc).date()
-    dates = [(today - timedelta(days=i)) for i in range(6, -1, -1)]  # от старых к новым
+    end_date = end_date or datetime.now(timezone.utc).date()
+    dates = [(end_date - timedelta(days=i)) for i in range(6, -1, -1)]  # от старых к новым
     amounts = [weekly_data.get(date.isoformat(), 0) for date in dates]
     days = [labels[date.weekday()] for date in dates]
 
@@ -76,10 +135,67 @@ def generate_weekly_chart(
     plt.legend()
     plt.tight_layout()
 
+
+def generate_history_heatmap(
+        totals: np.ndarray,
+        start: date,
+        goal_ml: int,
+        lang: str = "en"
+) -> str:
+    """
+    Генерирует календарную тепловую карту потребления воды.
+
+    Столбцы — недели, строки — дни недели; цвет — доля суточной цели.
+    Сетка собирается одним reshape без цикла по дням.
+
+    Args:
+        totals (np.ndarray): Суммы по дням, начиная со start.
+        start (date): Первый день периода.
+        goal_ml (int): Суточная цель потребления воды в мл.
+        lang (str): Код языка для подписей.
+
+    Returns:
+        str: Путь к сохранённому PNG-файлу.
+    """
+    started_at = time.perf_counter()
+    days = len(totals)
+
+    # Выравниваем начало по понедельнику, хвост последней недели — пустые клетки
+    lead = start.weekday()
+    weeks = -(-(lead + days) // 7)
+    cells = np.full(weeks * 7, np.nan)
+    cells[lead:lead + days] = totals / max(goal_ml, 1)
+    grid = np.ma.masked_invalid(cells.reshape(weeks, 7).T)
+
+    # Подписи месяцев над первой неделей каждого месяца
+    dates = np.datetime64(start, "D") + np.arange(days)
+    months = dates.astype("datetime64[M]")
+    month_starts = np.flatnonzero(np.concatenate(([True], months[1:] != months[:-1])))
+    month_weeks, first_index = np.unique((month_starts + lead) // 7, return_index=True)
+    # Неполный первый месяц подписываем, только если подпись не налезет на следующую
+    if len(month_weeks) > 1 and month_weeks[1] - month_weeks[0] < 3:
+        month_weeks, first_index = month_weeks[1:], first_index[1:]
+    month_labels = [str(months[index])[5:7] + "." + str(months[index])[2:4]
+                    for index in month_starts[first_index]]
+
+    cmap = matplotlib.colormaps["Blues"].copy()
+    cmap.set_bad("#F0F0F0")
+    fig, ax = plt.subplots(figsize=(max(4.0, weeks * 0.25 + 1.5), 2.8))
+    image = ax.imshow(grid, cmap=cmap, vmin=0, vmax=1.2, aspect="equal")
+    ax.set_yticks(range(7), get_loc_list("weekday", lang), fontsize=8)
+    ax.set_xticks(month_weeks, month_labels, fontsize=8)
+    ax.tick_params(length=0)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    colorbar = fig.colorbar(image, ax=ax, fraction=0.025, pad=0.02, ticks=[0, 0.5, 1.0])
+    colorbar.ax.set_yticklabels(["0%", "50%", "100%"], fontsize=8)
+    ax.set_title(get_text("history.chart", lang, days=days), fontsize=11)
+
     # Сохранение
     os.makedirs("temp", exist_ok=True)
-    filename = f"temp/chart_{hash(str(weekly_data)) % 1000000}.png"
-    plt.savefig(filename, dpi=150, bbox_inches='tight')
-    plt.close()  # Освобождаем память
+    filename = f"temp/history_{os.getpid()}_{time.monotonic_ns()}.png"
+    fig.savefig(filename, dpi=120, bbox_inches="tight")
+    plt.close(fig)
 
+    CHART_RENDER_SECONDS.observe(time.perf_counter() - started_at, "history")
     return filename
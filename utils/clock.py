@@ -0,0 +1,159 @@
+"""
+Модуль источника времени.
+
+Напоминания и планировщик берут текущее время и ждут через объект часов,
+а не через datetime.now() и asyncio.sleep() напрямую. В работе используются
+SystemClock (настоящее время), в симуляции — SimulatedClock: виртуальное
+время, которое двигает сам тест, поэтому сутки работы сотен тысяч
+напоминаний проигрываются за минуты и без реальных ожиданий.
+"""
+
+import asyncio
+import heapq
+import itertools
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set, Tuple
+
+_wakeup_deadline: ContextVar[Optional[datetime]] = ContextVar("wakeup_deadline", default=None)
+"""Момент, к которому текущая задача должна была проснуться (только SimulatedClock)."""
+
+
+class Clock(ABC):
+    """Интерфейс часов: текущее время UTC и ожидание."""
+
+    @abstractmethod
+    def now(self) -> datetime:
+        """Возвращает текущее время (UTC, timezone-aware)."""
+
+    @abstractmethod
+    async def sleep(self, seconds: float) -> None:
+        """Ждёт указанное количество секунд."""
+
+
+class SystemClock(Clock):
+    """Настоящее время и asyncio.sleep."""
+
+    def now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    async def sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+
+class SimulatedClock(Clock):
+    """
+    Виртуальные часы для симуляции.
+
+    Время стоит на месте, пока его не сдвинут run_until() или advance().
+    При сдвиге спящие задачи будятся строго по порядку сроков, и следующий
+    срок обрабатывается только когда разбуженные задачи снова уснули или
+    завершились — включая настоящие ожидания (например, запросы к БД).
+
+    Args:
+        start (datetime): Начальный момент виртуального времени (UTC).
+    """
+
+    def __init__(self, start: datetime):
+        self._start = start if start.tzinfo else start.replace(tzinfo=timezone.utc)
+        self._elapsed = 0.0
+        self._sleepers: List[Tuple[float, int, asyncio.Future, asyncio.Task]] = []
+        self._counter = itertools.count()
+        self._running: Set[asyncio.Task] = set()
+        self._watched: Set[asyncio.Task] = set()
+        self._idle = asyncio.Event()
+        self.wakeups = 0
+
+    def now(self) -> datetime:
+        return self._start + timedelta(seconds=self._elapsed)
+
+    @staticmethod
+    def wakeup_deadline() -> Optional[datetime]:
+        """Срок, к которому текущая задача должна была проснуться последний раз."""
+        return _wakeup_deadline.get()
+
+    def pending(self) -> int:
+        """Количество записей в очереди спящих (включая отменённые)."""
+        return len(self._sleepers)
+
+    async def sleep(self, seconds: float) -> None:
+        task = asyncio.current_task()
+        self._mark_blocked(task)
+        deadline = self._elapsed + max(seconds, 0.0)
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (deadline, next(self._counter), future, task))
+        await future
+        _wakeup_deadline.set(self._start + timedelta(seconds=deadline))
+
+    async def advance(self, seconds: float) -> None:
+        """Сдвигает время вперёд на указанное количество секунд."""
+        await self.run_until(self.now() + timedelta(seconds=seconds))
+
+    async def run_until(self, moment: datetime) -> None:
+        """
+        Проигрывает все события до указанного момента включительно.
+
+        Args:
+            moment (datetime): Момент виртуального времени (UTC).
+        """
+        target = (moment - self._start).total_seconds()
+        while True:
+            await self._settle()
+            while self._sleepers and self._sleepers[0][2].done():
+                heapq.heappop(self._sleepers)  # отменённые ожидания
+            if not self._sleepers or self._sleepers[0][0] > target:
+                break
+            self._elapsed = max(self._elapsed, self._sleepers[0][0])
+            while self._sleepers and self._sleepers[0][0] <= self._elapsed:
+                _, _, future, task = heapq.heappop(self._sleepers)
+                if future.done():
+                    continue
+                future.set_result(None)
+                self.wakeups += 1
+                self._running.add(task)
+                if task not in self._watched:
+                    self._watched.add(task)
+                    task.add_done_callback(self._mark_blocked)
+        self._elapsed = max(self._elapsed, target)
+        await self._settle()
+
+    def _mark_blocked(self, task: asyncio.Task) -> None:
+        """Задача уснула по виртуальным часам или завершилась."""
+        self._running.discard(task)
+        if task.done():
+            self._watched.discard(task)
+        if not self._running:
+            self._idle.set()
+
+    async def _settle(self) -> None:
+        """Ждёт, пока все разбуженные задачи снова уснут или завершатся."""
+        while True:
+            if self._running:
+                self._idle.clear()
+                await self._idle.wait()
+            # Даём только что созданным задачам дойти до первого sleep()
+            for _ in range(3):
+                await asyncio.sleep(0)
+            if not self._running:
+                return
+
+
+_clock: Clock = SystemClock()
+"""Часы приложения."""
+
+
+def get_clock() -> Clock:
+    """Возвращает текущие часы приложения."""
+    return _clock
+
+
+def set_clock(clock: Clock) -> None:
+    """
+    Подменяет часы приложения (для симуляции).
+
+    Args:
+        clock (Clock): Новые часы.
+    """
+    global _clock
+    _clock = clock
@@ -0,0 +1,119 @@
+"""
+Модуль расчёта истории потребления воды.
+
+Получает суммы по дням одним сгруппированным запросом (get_daily_totals)
+и считает всю статистику векторно в NumPy: скользящее среднее, долю дней
+с выполненной целью, средние по дням недели. Цикл по дням в Python
+не нужен, поэтому отчёт за год считается за доли миллисекунды.
+"""
+
+from datetime import date, timedelta
+from typing import Any, Dict, Sequence
+
+import numpy as np
+
+HISTORY_PERIODS = (30, 90, 365)
+"""Допустимые периоды отчёта, дни."""
+
+ROLLING_WINDOW = 7
+"""Окно скользящего среднего, дни."""
+
+
+def daily_totals_array(rows: Sequence[Sequence[Any]], start: date, days: int) -> np.ndarray:
+    """
+    Раскладывает строки запроса в массив по дням; дни без записей — нули.
+
+    Args:
+        rows: Строки (date "YYYY-MM-DD", total) из get_daily_totals.
+        start (date): Первый день периода.
+        days (int): Длина периода, дни.
+
+    Returns:
+        np.ndarray: Массив int64 длиной days, индекс — смещение от start.
+    """
+    totals = np.zeros(days, dtype=np.int64)
+    if not rows:
+        return totals
+    dates = np.array([row[0] for row in rows], dtype="datetime64[D]")
+    amounts = np.fromiter((row[1] or 0 for row in rows), dtype=np.int64, count=len(rows))
+    offsets = (dates - np.datetime64(start, "D")).astype(np.int64)
+    inside = (offsets >= 0) & (offsets < days)
+    totals[offsets[inside]] = amounts[inside]
+    return totals
+
+
+def rolling_mean(totals: np.ndarray, window: int = ROLLING_WINDOW) -> np.ndarray:
+    """
+    Скользящее среднее через накопленную сумму.
+
+    Args:
+        totals (np.ndarray): Суммы по дням.
+        window (int): Окно, дни.
+
+    Returns:
+        np.ndarray: Массив длиной len(totals) - window + 1; элемент i —
+        среднее за дни i..i+window-1.
+    """
+    window = max(1, min(window, len(totals)))
+    cumulative = np.concatenate(([0], np.cumsum(totals, dtype=np.int64)))
+    return (cumulative[window:] - cumulative[:-window]) / window
+
+
+def build_history(rows: Sequence[Sequence[Any]], goal_ml: int, days: int, today: date) -> Dict[str, Any]:
+    """
+    Считает статистику истории потребления.
+
+    Доля дней с целью и средние по дням недели считаются с первого дня,
+    когда пользователь отметил воду, чтобы новичок не получал 3% за год.
+
+    Args:
+        rows: Строки (date "YYYY-MM-DD", total) из get_daily_totals.
+        goal_ml (int): Суточная цель, мл.
+        days (int): Длина периода, дни (включая сегодня).
+        today (date): Последний день периода.
+
+    Returns:
+        dict: start, totals, rolling, tracked_days (0 — данных нет), total,
+        average, rolling_now, trend, goal_days, goal_percent, best_date,
+        best_amount, best_weekday/worst_weekday (0 — понедельник)
+        и их средние best_weekday_avg/worst_weekday_avg.
+    """
+    start = today - timedelta(days=days - 1)
+    totals = daily_totals_array(rows, start, days)
+    rolling = rolling_mean(totals)
+    history: Dict[str, Any] = {"start": start, "totals": totals, "rolling": rolling, "tracked_days": 0}
+
+    active = np.flatnonzero(totals)
+    if not active.size:
+        return history
+    first = int(active[0])
+    tracked = totals[first:]
+
+    weekdays = (np.arange(first, days) + start.weekday()) % 7
+    weekday_counts = np.bincount(weekdays, minlength=7)
+    weekday_avg = np.bincount(weekdays, weights=tracked, minlength=7) / np.maximum(weekday_counts, 1)
+    # Дни недели, которых ещё не было в отслеживаемом отрезке, не участвуют в выборе
+    seen = weekday_counts > 0
+    best_weekday = int(np.argmax(np.where(seen, weekday_avg, -np.inf)))
+    worst_weekday = int(np.argmin(np.where(seen, weekday_avg, np.inf)))
+
+    best = int(np.argmax(totals))
+    goal_hits = int(np.count_nonzero(tracked >= goal_ml))
+    previous = rolling[-1 - ROLLING_WINDOW] if len(rolling) > ROLLING_WINDOW else rolling[0]
+
+    history.update(
+        tracked_days=len(tracked),
+        total=int(tracked.sum()),
+        average=round(float(tracked.mean())),
+        rolling_now=round(float(rolling[-1])),
+        trend=round(float(rolling[-1] - previous)),
+        goal_days=goal_hits,
+        goal_percent=round(goal_hits / len(tracked) * 100),
+        best_date=start + timedelta(days=best),
+        best_amount=int(totals[best]),
+        best_weekday=best_weekday,
+        best_weekday_avg=round(float(weekday_avg[best_weekday])),
+        worst_weekday=worst_weekday,
+        worst_weekday_avg=round(float(weekday_avg[worst_weekday])),
+    )
+    return history
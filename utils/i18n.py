@@ -9,6 +9,7 @@ import json
 import os
 from typing import Dict
 
+from database.profiles import Language, UserProfile
 from database.queries import get_user
 
 # Поддерживаемые языки (должны совпадать с именами файлов в locales/)
@@ -21,6 +22,14 @@ SUPPORTED_LANGUAGES = {
 }
 """Список поддерживаемых языков (коды ISO 639-1)."""
 
+# Профили хранят язык членом Language: код, которого нет в перечислении,
+# прочитался бы из БД как None
+if {language.code for language in Language} != set(SUPPORTED_LANGUAGES):
+    raise RuntimeError(
+        f"database.profiles.Language {sorted(language.code for language in Language)} "
+        f"не совпадает с SUPPORTED_LANGUAGES {sorted(SUPPORTED_LANGUAGES)}"
+    )
+
 _locales: Dict[str, Dict[str, str]] = {}
 """Кэш загруженных переводов по языкам."""
 
@@ -124,7 +133,7 @@ def load_locales():
 #             with open(f"locales/{filename}", encoding="utf-8") as f:
 #                 _locales[lang] = json.load(f)
 
-async def get_user_language(user: dict | None, user_id: int, telegram_lang: str = "ru") -> str:
+async def get_user_language(user: UserProfile | None, user_id: int, telegram_lang: str = "ru") -> str:
     """
     Определяет финальный язык интерфейса с учётом приоритетов.
 
@@ -181,6 +190,9 @@ def get_text(key: str, lang: str = "ru", **kwargs) -> str:
             _reload_locale_if_changed(lang)
             locale = _locales.get(lang, {})
             text = locale.get(key, text)
+        if key not in locale:
+            # Заглушку не форматируем: "{key}" выглядит как подстановка и вызовет KeyError
+            return text
 
     return text.format(**kwargs)
 
@@ -0,0 +1,171 @@
+"""
+Модуль простых метрик в формате Prometheus.
+
+Содержит счётчики, гистограммы и вычисляемые метрики без внешних зависимостей.
+Обновление метрики — несколько арифметических операций и bisect, поэтому
+инструментирование горячих путей практически ничего не стоит.
+Все метрики регистрируются в общем реестре и выводятся функцией render().
+"""
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+"""Границы корзин гистограмм по умолчанию (секунды)."""
+
+_registry: List["_Metric"] = []
+"""Все зарегистрированные метрики в порядке создания."""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric(ABC):
+    """Базовый класс метрики."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    @abstractmethod
+    def collect(self) -> List[str]:
+        """Возвращает строки значений метрики."""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}", *self.collect()]
+
+
+class Counter(_Metric):
+    """
+    Монотонно растущий счётчик.
+
+    Пример:
+        >>> DB_QUERIES = Counter("db_queries_total", "Запросы к БД", ["operation"])
+        >>> DB_QUERIES.inc("SELECT")
+    """
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        """Увеличивает счётчик для набора значений меток."""
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        """Возвращает текущее значение счётчика для набора значений меток."""
+        return self._values.get(labelvalues, 0)
+
+    def collect(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Histogram(_Metric):
+    """
+    Гистограмма распределения значений (обычно длительностей в секундах).
+
+    Пример:
+        >>> with CHART_RENDER_SECONDS.time():
+        ...     render()
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # Для каждого набора меток: [счётчики корзин..., +Inf], сумма
+        self._values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        """Добавляет наблюдение для набора значений меток."""
+        entry = self._values.get(labelvalues)
+        if entry is None:
+            entry = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    @contextmanager
+    def time(self, *labelvalues: str):
+        """Измеряет длительность блока кода."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def collect(self) -> List[str]:
+        lines = []
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """
+    Метрика, значение которой вычисляется в момент чтения.
+
+    Функция возвращает число либо словарь {кортеж значений меток: число}.
+    Подходит для размеров очередей и счётчиков, которые уже ведут сами компоненты.
+
+    Args:
+        metric_type (str): 'gauge' или 'counter'.
+    """
+
+    def __init__(self, name: str, documentation: str, fn: Callable[[], float | Dict[Tuple[str, ...], float]],
+                 labelnames: Sequence[str] = (), metric_type: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.fn = fn
+        self.type = metric_type
+
+    def collect(self) -> List[str]:
+        value = self.fn()
+        if not isinstance(value, dict):
+            value = {(): value}
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(number)}"
+            for labels, number in value.items()
+        ]
+
+
+def render() -> str:
+    """
+    Возвращает все метрики в текстовом формате Prometheus.
+
+    Returns:
+        str: Текст для ответа на GET /metrics.
+    """
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,66 @@
+"""
+Модуль работы с часовыми поясами пользователей.
+
+Кэширует объекты часовых поясов по смещению от UTC и определяет,
+какие смещения сейчас попадают в дневное окно напоминаний (9:00–21:00).
+"""
+from datetime import datetime, time, tzinfo
+from functools import lru_cache
+from typing import Iterable
+
+import pytz
+
+REMINDER_WINDOW_START = time(9, 0)
+"""Начало дневного окна, в которое допускается отправка напоминаний."""
+
+REMINDER_WINDOW_END = time(21, 0)
+"""Конец дневного окна напоминаний (включительно)."""
+
+
+@lru_cache(maxsize=None)
+def get_user_timezone(tz_offset: int) -> tzinfo:
+    """
+    Возвращает объект часового пояса для смещения в минутах.
+
+    Количество различных смещений невелико (несколько десятков),
+    поэтому объекты кэшируются без ограничения размера.
+
+    Args:
+        tz_offset (int): Смещение часового пояса в минутах от UTC.
+
+    Returns:
+        tzinfo: Часовой пояс с фиксированным смещением.
+    """
+    return pytz.FixedOffset(tz_offset or 0)
+
+
+def is_within_reminder_window(tz_offset: int, now_utc: datetime) -> bool:
+    """
+    Проверяет, находится ли локальное время пользователя в окне 9:00–21:00.
+
+    Args:
+        tz_offset (int): Смещение часового пояса в минутах от UTC.
+        now_utc (datetime): Текущее время в UTC (timezone-aware).
+
+    Returns:
+        bool: True, если напоминание можно отправить прямо сейчас.
+    """
+    local_time = now_utc.astimezone(get_user_timezone(tz_offset)).time()
+    return REMINDER_WINDOW_START <= local_time <= REMINDER_WINDOW_END
+
+
+def offsets_in_reminder_window(offsets: Iterable[int], now_utc: datetime) -> list[int]:
+    """
+    Отбирает смещения, для которых сейчас дневное окно напоминаний.
+
+    Args:
+        offsets (Iterable[int]): Смещения часовых поясов в минутах от UTC.
+        now_utc (datetime): Текущее время в UTC (timezone-aware).
+
+    Returns:
+        list[int]: Смещения, попадающие в окно 9:00–21:00.
+    """
+    return [
+        offset for offset in offsets
+        if offset is not None and is_within_reminder_window(offset, now_utc)
+    ]